@@ -0,0 +1,78 @@
+"""Benchmarks the global cooldown store against discord.py's CooldownMapping.
+
+Run from the repository root: python -m benchmarks.cooldown [members]
+"""
+
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from utils.cooldown import CooldownStore
+
+MAPPING_SAMPLE = 10_000
+
+
+def make_messages(count):
+    guilds = [SimpleNamespace(id=800000000000000000 + i) for i in range(50)]
+    return [
+        SimpleNamespace(guild=guilds[i % len(guilds)], author=SimpleNamespace(id=400000000000000000 + i))
+        for i in range(count)
+    ]
+
+
+def bench_store(messages):
+    store = CooldownStore(5, 6.0)
+    tracemalloc.start()
+    start = time.perf_counter()
+    for message in messages:
+        store.update_rate_limit(store.member_key(message))
+    elapsed = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    evicted = store.sweep(time.monotonic() + 7.0)
+    sweep = time.perf_counter() - start
+    return elapsed, memory, sweep, evicted
+
+
+def bench_mapping(messages):
+    try:
+        from discord.ext import commands
+    except ImportError:
+        return None
+
+    # CooldownMapping scans its whole cache on every lookup, so it is quadratic over a run
+    messages = messages[:MAPPING_SAMPLE]
+    mapping = commands.CooldownMapping.from_cooldown(5, 6.0, commands.BucketType.member)
+    tracemalloc.start()
+    start = time.perf_counter()
+    for message in messages:
+        mapping.get_bucket(message).update_rate_limit()
+    elapsed = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, memory, len(messages)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    messages = make_messages(count)
+    print(f"{count} distinct members")
+
+    elapsed, memory, sweep, evicted = bench_store(messages)
+    print(f"CooldownStore:    {elapsed / count * 1e6:8.3f} us/check  {memory / 2**20:8.2f} MiB  "
+          f"sweep {sweep * 1e3:.2f} ms ({evicted} evicted)")
+
+    result = bench_mapping(messages)
+    if result is None:
+        print("CooldownMapping:  skipped (discord.py not installed)")
+    else:
+        elapsed, memory, sample = result
+        print(f"CooldownMapping:  {elapsed / sample * 1e6:8.3f} us/check  {memory / 2**20:8.2f} MiB  "
+              f"(first {sample} members only)")
+
+
+if __name__ == '__main__':
+    main()
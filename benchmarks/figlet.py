@@ -0,0 +1,40 @@
+"""Times utils.figlet on every bundled font.
+
+Reports how long parsing the fonts takes, then per font the render time of a few
+texts, uncached and from the render cache.
+Run from the repository root: python -m benchmarks.figlet [rounds]
+"""
+
+import sys
+import time
+
+from utils.figlet import FigletRenderer
+
+TEXTS = ('hi', 'Hello, World!', 'SneakyNinja', 'The quick brown fox jumps')
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    start = time.perf_counter()
+    renderer = FigletRenderer()
+    print(f'parsed {len(renderer.fonts)} fonts in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+    print(f"{'font':<10} {'uncached':>12} {'cached':>12}   us per render, texts of {len(''.join(TEXTS)) // len(TEXTS)} chars on average")
+    for name, font in renderer.fonts.items():
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for text in TEXTS:
+                font.render(text)
+        uncached = (time.perf_counter() - start) / (rounds * len(TEXTS)) * 1e6
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for text in TEXTS:
+                renderer.render(text, name)
+        cached = (time.perf_counter() - start) / (rounds * len(TEXTS)) * 1e6
+        print(f'{name:<10} {uncached:12.1f} {cached:12.2f}')
+
+
+if __name__ == '__main__':
+    main()
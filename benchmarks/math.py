@@ -0,0 +1,71 @@
+"""Times the math engine on typical expressions of every math subcommand.
+
+Measures utils.maths.solve in this process, then the same expressions through the
+'cpu' process pool, uncached and memoized by the response cache like the commands.
+Run from the repository root: python -m benchmarks.math [rounds]
+"""
+
+import asyncio
+import sys
+import time
+
+from utils.cache import ResponseCache
+from utils.executors import ExecutorRegistry
+from utils.maths import canonical, solve
+
+EXPRESSIONS = {
+    'factor': ['x^2 - 1', 'x^3 - 6x^2 + 11x - 6', 'x^4 - 16', '2x^2 + 7x + 3'],
+    'derive': ['x^2 sin(x)', 'e^(2x) cos(x)', 'ln(x^2 + 1)', 'sqrt(1 - x^2)'],
+    'integrate': ['x^2', 'x e^x', 'sin(x)^2', '1/(1 + x^2)'],
+    'zeroes': ['x^2 - 4', 'x^3 - x', 'x^2 + 2x + 5', '2x - 7'],
+    'simplify': ['sin(x)^2 + cos(x)^2', '(x^2 - 1)/(x - 1)', 'exp(ln(x))', '(x + 1)^2 - x^2'],
+    'evaluate': ['sqrt(2) pi', '2^64 / 3', 'e^pi - pi', 'sin(1)^2 + 1/7'],
+}
+
+
+def bench_local(rounds):
+    solve('factor', canonical('x'))  # sympy's import isn't what's measured
+    print('in process, ms per expression')
+    for operation, expressions in EXPRESSIONS.items():
+        expressions = [canonical(expression) for expression in expressions]
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for expression in expressions:
+                ok, result = solve(operation, expression)
+                assert ok, result
+        elapsed = time.perf_counter() - start
+        print(f'  {operation:<10} {elapsed / (rounds * len(expressions)) * 1000:8.2f}')
+
+
+async def bench_pool(rounds):
+    executors = ExecutorRegistry({'cpu': {'queue': 1000}})
+    cache = ResponseCache()
+    jobs = [
+        (operation, canonical(expression))
+        for operation, expressions in EXPRESSIONS.items() for expression in expressions
+    ]
+    # warm every worker up, their first solve imports sympy
+    await asyncio.gather(*(executors.run('cpu', solve, 'factor', 'x') for _ in range(executors['cpu'].workers * 2)))
+
+    async def run(memoized):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            if memoized:
+                coros = (cache.get('math', job, lambda job=job: executors.run('cpu', solve, *job)) for job in jobs)
+            else:
+                coros = (executors.run('cpu', solve, *job) for job in jobs)
+            await asyncio.gather(*coros)
+        return (time.perf_counter() - start) / (rounds * len(jobs)) * 1000
+
+    try:
+        print(f"process pool of {executors['cpu'].workers}, ms per expression")
+        print(f'  uncached   {await run(False):8.2f}')
+        print(f'  memoized   {await run(True):8.2f}')
+    finally:
+        executors.shutdown()
+
+
+if __name__ == '__main__':
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    bench_local(rounds)
+    asyncio.get_event_loop().run_until_complete(bench_pool(rounds))
@@ -0,0 +1,174 @@
+"""Compares the members each member cache policy keeps, and the memory they hold.
+
+Runs discord.py's ConnectionState with each policy's cache_options and a MemberCache,
+feeds it the gateway events of a simulated day (guilds becoming available, member
+joins, voice channel joins and leaves, messages, commands needing member lists) and
+measures what is still cached afterwards. Only the websocket is simulated, chunk
+requests are answered with the guild's members.
+Run from the repository root: python -m benchmarks.members [members] [active cap]
+"""
+
+import asyncio
+import gc
+import random
+import sys
+import tracemalloc
+
+import discord
+
+from utils.members import POLICIES, MemberCache, cache_options
+
+INTENTS = discord.Intents(guilds=True, members=True, messages=True, voice_states=True)
+BOT_ID = 10**16
+# shares of the members in each guild, a few big guilds and many small ones
+GUILD_SHARES = [0.4, 0.2, 0.08, 0.08, 0.08] + [0.16 / 15] * 15
+VOICE_SHARE, JOIN_SHARE, AUTHOR_SHARE, MESSAGES_PER_MEMBER = 0.01, 0.01, 0.3, 0.5
+# guilds a command needed the full member list of
+LISTED_GUILDS = 3
+# what bot.py has MemberCache listen to under the active policy
+ACTIVE_EVENTS = ('message', 'member_join', 'guild_join', 'guild_available')
+
+
+def user_data(user_id):
+    return {'id': str(user_id), 'username': f'user{user_id}', 'discriminator': '0001', 'avatar': None}
+
+
+def member_data(user_id, **extra):
+    return {
+        'user': user_data(user_id), 'roles': [], 'joined_at': '2021-01-01T00:00:00+00:00',
+        'nick': None, 'deaf': False, 'mute': False, **extra,
+    }
+
+
+def voice_data(guild_id, user_id, channel_id):
+    return {
+        'guild_id': str(guild_id), 'channel_id': channel_id and str(channel_id), 'user_id': str(user_id),
+        'session_id': 'session', 'deaf': False, 'mute': False, 'self_deaf': False, 'self_mute': False,
+        'self_video': False, 'suppress': False, 'member': member_data(user_id),
+    }
+
+
+class _Guild:
+    """A simulated guild: its IDs, members and who is in voice."""
+
+    def __init__(self, index, size):
+        self.id = 10**17 + index
+        self.text_id, self.voice_id = self.id + 10**15, self.id + 2 * 10**15
+        self.members = [10**17 + index * 10**7 + i for i in range(size)]
+        self.voice = set(self.members[:int(size * VOICE_SHARE)])
+
+    def create_data(self):
+        # like discord, only small guilds come with their member list, big ones with the bot and voice members
+        large = len(self.members) >= 250
+        members = [BOT_ID, *self.voice] if large else [BOT_ID, *self.members]
+        return {
+            'id': str(self.id), 'name': f'guild {self.id}', 'owner_id': str(self.members[0]),
+            'member_count': len(self.members) + 1, 'large': large,
+            'roles': [{'id': str(self.id), 'name': '@everyone', 'permissions': '0', 'position': 0}],
+            'channels': [
+                {'id': str(self.text_id), 'type': 0, 'name': 'general', 'position': 0, 'permission_overwrites': []},
+                {'id': str(self.voice_id), 'type': 2, 'name': 'voice', 'position': 1, 'permission_overwrites': []},
+            ],
+            'members': [member_data(member) for member in members],
+            'voice_states': [voice_data(self.id, member, self.voice_id) for member in self.voice],
+        }
+
+
+def events(guilds, rng):
+    """The gateway events of the simulated day, as (event, data) pairs, commands as ('LIST', guild)."""
+    total = sum(len(guild.members) for guild in guilds)
+    for guild in guilds:
+        yield 'GUILD_CREATE', guild.create_data()
+
+    authors = []
+    for guild in guilds:
+        authors += [(guild, member) for member in rng.sample(guild.members, int(len(guild.members) * AUTHOR_SHARE))]
+    rng.shuffle(authors)
+    joins = int(total * JOIN_SHARE)
+    steps = int(total * MESSAGES_PER_MEMBER)
+    for step in range(steps):
+        # a few authors write most messages
+        guild, author = authors[min(int(rng.paretovariate(1.2)) - 1, len(authors) - 1) if rng.random() < 0.5
+                                else rng.randrange(len(authors))]
+        yield 'MESSAGE_CREATE', {
+            'id': str(10**18 + step), 'channel_id': str(guild.text_id), 'guild_id': str(guild.id),
+            'author': user_data(author), 'member': {'roles': [], 'joined_at': '2021-01-01T00:00:00+00:00'},
+            'content': 'hello', 'timestamp': '2021-01-01T00:00:00+00:00', 'edited_timestamp': None,
+            'tts': False, 'mention_everyone': False, 'mentions': [], 'mention_roles': [],
+            'attachments': [], 'embeds': [], 'pinned': False, 'type': 0,
+        }
+        if step % (steps // joins) == 0:
+            guild = rng.choice(guilds)
+            member = guild.id * 10 + len(guild.members)
+            guild.members.append(member)
+            yield 'GUILD_MEMBER_ADD', {'guild_id': str(guild.id), **member_data(member)}
+        if step % 50 == 0:
+            # someone leaves voice, someone else joins it
+            guild = rng.choice(guilds)
+            if guild.voice:
+                leaving = guild.voice.pop()
+                yield 'VOICE_STATE_UPDATE', voice_data(guild.id, leaving, None)
+                joining = rng.choice(guild.members)
+                guild.voice.add(joining)
+                yield 'VOICE_STATE_UPDATE', voice_data(guild.id, joining, guild.voice_id)
+        if step % (steps // LISTED_GUILDS) == 0:
+            yield 'LIST', guilds[step // (steps // LISTED_GUILDS) % len(guilds)]
+
+
+async def simulate(policy, total, max_size, seed=0):
+    rng = random.Random(seed)
+    guilds = [_Guild(index, int(total * share)) for index, share in enumerate(GUILD_SHARES)]
+    loop = asyncio.get_running_loop()
+    dispatched = []
+
+    tracemalloc.start()
+    state = discord.state.ConnectionState(
+        dispatch=lambda event, *args: dispatched.append((event, args)), handlers={}, hooks={},
+        syncer=None, http=None, loop=loop, intents=INTENTS, **cache_options(policy, INTENTS),
+    )
+    state.user = discord.ClientUser(state=state, data=user_data(BOT_ID))
+    bot = type('Bot', (), {'user': state.user, 'get_guild': state._get_guild})()
+    member_cache = MemberCache(bot, policy, max_size=max_size)
+    simulated = {guild.id: guild for guild in guilds}
+
+    async def chunker(guild_id, query='', limit=0, presences=False, *, nonce=None):
+        # the gateway answers after the request is sent
+        members = [member_data(member) for member in simulated[guild_id].members]
+        loop.call_soon(state.parse_guild_members_chunk, {
+            'guild_id': str(guild_id), 'members': members, 'nonce': nonce, 'chunk_index': 0, 'chunk_count': 1,
+        })
+
+    state.chunker = chunker
+    for event, data in events(guilds, rng):
+        if event == 'LIST':
+            await member_cache.members(state._get_guild(data.id))
+        else:
+            getattr(state, f'parse_{event.lower()}')(data)
+        for name, args in dispatched:
+            if policy == 'active' and name in ACTIVE_EVENTS:
+                await getattr(member_cache, f'on_{name}')(*args)
+        dispatched.clear()
+
+    del data, dispatched
+    gc.collect()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    cached = sum(len(guild._members) for guild in state.guilds)
+    snapshots = sum(len(members) for _, members in member_cache._snapshots.values())
+    return cached, snapshots, member_cache.evictions, memory
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    max_size = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    print(f"{total} members over {len(GUILD_SHARES)} guilds, {VOICE_SHARE:.0%} in voice, "
+          f"{AUTHOR_SHARE:.0%} writing {int(total * MESSAGES_PER_MEMBER)} messages, "
+          f"{JOIN_SHARE:.0%} joining, {LISTED_GUILDS} guilds listed, active cap {max_size}")
+    print(f"{'policy':<8}{'cached':>10}{'snapshots':>11}{'evicted':>9}{'MiB':>8}")
+    for policy in POLICIES:
+        cached, snapshots, evictions, memory = asyncio.run(simulate(policy, total, max_size))
+        print(f"{policy:<8}{cached:>10}{snapshots:>11}{evictions:>9}{memory / 2**20:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Compares the purge command's compiled message check with the lambda chain it replaced.
+
+Filters a synthetic channel of messages with several flag combinations, including
+--contains with many words, where utils.matching switches to its automaton.
+Run from the repository root: python -m benchmarks.purge [messages]
+"""
+
+import asyncio
+import random
+import re
+import string
+import sys
+import time
+from types import SimpleNamespace
+
+from utils.converters import MessageFlagParser
+
+WORDS = [''.join(random.Random(i).choices(string.ascii_lowercase, k=6)) for i in range(2000)]
+
+
+class _Message:
+    """The attributes of discord.Message the purge flags read."""
+
+    __slots__ = ('author', 'content', 'mention_everyone', 'embeds', 'reactions')
+
+    def __init__(self, author, content, mention_everyone, embeds, reactions):
+        self.author = author
+        self.content = content
+        self.mention_everyone = mention_everyone
+        self.embeds = embeds
+        self.reactions = reactions
+
+    @property
+    def raw_mentions(self):
+        return [int(x) for x in re.findall(r'<@!?([0-9]+)>', self.content)]
+
+
+def channel(count, seed=0):
+    rng = random.Random(seed)
+    authors = [SimpleNamespace(id=10**17 + i, bot=i % 10 == 0) for i in range(50)]
+    messages = []
+    for _ in range(count):
+        words = rng.choices(WORDS[:500], k=rng.randint(3, 30))
+        if rng.random() < 0.1:
+            words.append(f'<@{10**17 + rng.randrange(50)}>')
+        messages.append(_Message(
+            rng.choice(authors), ' '.join(words), rng.random() < 0.01,
+            [None] if rng.random() < 0.05 else [], [None] * rng.choice((0, 0, 0, 1, 3)),
+        ))
+    return messages
+
+
+class _Bot:
+    guilds = []
+
+    async def fetch_user(self, user_id):
+        return SimpleNamespace(id=int(user_id), bot=False)
+
+
+def lambda_chain(args, users):
+    """The check msg_purge built before the flags were compiled."""
+    predicates = [lambda m: True]
+    if args.user:
+        predicates.append(lambda m: m.author in users)
+    if args.contains:
+        predicates.append(lambda m: any(contain in m.content for contain in args.contains))
+    if args.bot:
+        predicates.append(lambda m: m.author.bot)
+    if args.everyone:
+        predicates.append(lambda m: m.mention_everyone)
+    if args.embed:
+        predicates.append(lambda m: len(m.embeds) > 0)
+    if args.reaction_over:
+        predicates.append(lambda m: len(m.reactions) > args.reaction_over)
+    if args.mention_over:
+        predicates.append(lambda m: len(m.raw_mentions) > args.mention_over)
+    if args.regex:
+        if args.regex_ignorecase:
+            predicates.append(lambda m: re.search(args.regex, m.content, re.IGNORECASE))
+        else:
+            predicates.append(lambda m: re.search(args.regex, m.content))
+    return lambda m: all(p(m) for p in predicates)
+
+
+CASES = {
+    'bot': '--bot',
+    'user': '--user 100000000000000003 100000000000000007',
+    'contains 1': f'--contains {WORDS[7]}',
+    'contains 5': f"--contains {' '.join(WORDS[496:501])}",
+    'contains 200': f"--contains {' '.join(WORDS[499:699])}",
+    'contains 1000': f"--contains {' '.join(WORDS[499:1499])}",
+    'mention-over': '--mention-over 1',
+    'regex': r'--regex ^\w+\s\w+$',
+    'combined': f'--bot --reaction-over 1 --contains {WORDS[3]} {WORDS[9]}',
+}
+
+
+async def run(count):
+    messages = channel(count)
+    ctx = SimpleNamespace(bot=_Bot(), guild=None)
+    print(f"{count} messages, ms per pass over the channel")
+    print(f"{'flags':<15}{'lambdas':>10}{'compiled':>10}{'matched':>9}")
+    for name, flags in CASES.items():
+        parser = MessageFlagParser(ctx, flags)
+        users = [await ctx.bot.fetch_user(user) for user in parser.args.user or ()]
+        old, new = lambda_chain(parser.args, users), await parser.compile()
+
+        timings = []
+        for check in (old, new):
+            start = time.perf_counter()
+            matched = sum(1 for message in messages if check(message))
+            timings.append((time.perf_counter() - start) * 1000)
+        assert matched == sum(1 for message in messages if old(message)), name
+        print(f"{name:<15}{timings[0]:>10.1f}{timings[1]:>10.1f}{matched:>9}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    asyncio.run(run(count))
+
+
+if __name__ == '__main__':
+    main()
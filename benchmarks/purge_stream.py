@@ -0,0 +1,159 @@
+"""Compares utils.purge's pipelined purge with a fetch-then-delete loop on a simulated channel.
+
+Every route (history pages, bulk deletes, single deletes) serves one request at a time
+and takes a fixed time per request, like a channel's rate limits would allow, scaled
+down by SCALE. The lower bound is the busiest route's total time. Then purges a server
+of CHANNELS channels one after the other and with MultiPurge, under a shared limit of
+GLOBAL_RATE requests per second.
+Run from the repository root: python -m benchmarks.purge_stream [messages] [old share]
+"""
+
+import asyncio
+import math
+import sys
+import time
+
+import discord
+
+from utils.purge import MultiPurge, Purge, RateLimiter, bulk_cutoff
+
+SCALE = 1 / 50
+# seconds per request of each route, before scaling
+HISTORY, BULK, SINGLE = 1.0, 1.0, 0.25
+CHANNELS, CHANNEL_MESSAGES, GLOBAL_RATE = 40, 300, 40
+
+
+class _Route:
+    def __init__(self, seconds):
+        self.seconds = seconds * SCALE
+        self.lock = asyncio.Lock()
+        self.requests = 0
+
+    async def request(self):
+        async with self.lock:
+            self.requests += 1
+            await asyncio.sleep(self.seconds)
+
+
+class _Message:
+    __slots__ = ('id', 'channel')
+
+    def __init__(self, id, channel):
+        self.id = id
+        self.channel = channel
+
+    async def delete(self):
+        await self.channel.single.request()
+
+
+class _History:
+    def __init__(self, channel, limit, before):
+        self.channel = channel
+        self.remaining = limit
+        self.before = before.id if before else math.inf
+        self.page = []
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.next()
+        except discord.NoMoreItems:
+            raise StopAsyncIteration
+
+    async def next(self):
+        if not self.page and self.remaining > 0:
+            await self.channel.history_route.request()
+            ids = [id for id in self.channel.ids if id < self.before][:min(100, self.remaining)]
+            self.page = [_Message(id, self.channel) for id in ids]
+            self.remaining = self.remaining - len(ids) if ids else 0
+            if ids:
+                self.before = ids[-1]
+        if not self.page:
+            raise discord.NoMoreItems()
+        return self.page.pop(0)
+
+
+class _Channel:
+    def __init__(self, count, old_share):
+        recent, old = bulk_cutoff() + (10**6 << 22), bulk_cutoff() - (10**6 << 22)
+        old_count = int(count * old_share)
+        # newest first, like the messages endpoint
+        self.ids = [recent + i for i in range(count - old_count, 0, -1)] + [old - i for i in range(old_count)]
+        self.history_route, self.bulk, self.single = _Route(HISTORY), _Route(BULK), _Route(SINGLE)
+
+    def history(self, limit, before=None, oldest_first=False):
+        return _History(self, limit, before)
+
+    async def delete_messages(self, messages):
+        await self.bulk.request()
+
+
+async def sequential(channel, limit, check):
+    """The loop of discord.py's TextChannel.purge, without its fixed second of sleep per bulk delete."""
+    batch, cutoff = [], bulk_cutoff()
+    iterator = channel.history(limit=limit)
+    while True:
+        try:
+            message = await iterator.next()
+        except discord.NoMoreItems:
+            break
+        if len(batch) == 100:
+            await channel.delete_messages(batch)
+            batch = []
+        if check(message):
+            if message.id < cutoff:
+                for pending in batch:
+                    await pending.delete()
+                batch = []
+                await message.delete()
+            else:
+                batch.append(message)
+    if len(batch) > 1:
+        await channel.delete_messages(batch)
+    elif batch:
+        await batch[0].delete()
+
+
+async def run(count, old_share):
+    check = lambda m: m.id % 2 == 0
+    print(f"{count} messages, {old_share:.0%} older than two weeks, every other one purged")
+    print(f"routes take {HISTORY}s per history page, {BULK}s per bulk delete, {SINGLE}s per single delete")
+
+    timings = {}
+    for name in ('sequential', 'pipelined'):
+        channel = _Channel(count, old_share)
+        start = time.perf_counter()
+        if name == 'sequential':
+            await sequential(channel, count, check)
+        else:
+            await Purge(channel, limit=count, check=check).run()
+        timings[name] = (time.perf_counter() - start) / SCALE
+        routes = (channel.history_route, channel.bulk, channel.single)
+        bound = max(route.requests * route.seconds for route in routes) / SCALE
+        print(f"{name:<12}{timings[name]:>8.1f}s  {' / '.join(str(route.requests) for route in routes)} requests, "
+              f"lower bound {bound:.1f}s")
+
+    print(f"\n{CHANNELS} channels of {CHANNEL_MESSAGES} messages, {old_share:.0%} old, {GLOBAL_RATE} requests per second")
+    check = lambda m: m.id % 3 == 0
+    for name in ('one by one', 'MultiPurge'):
+        channels = [_Channel(CHANNEL_MESSAGES, old_share) for _ in range(CHANNELS)]
+        options = dict(limit=CHANNEL_MESSAGES, check=check, limiter=RateLimiter(GLOBAL_RATE / SCALE))
+        start = time.perf_counter()
+        if name == 'one by one':
+            for channel in channels:
+                await Purge(channel, **options).run()
+        else:
+            await MultiPurge(channels, concurrency=8, **options).run()
+        print(f"{name:<12}{(time.perf_counter() - start) / SCALE:>8.1f}s")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    old_share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    asyncio.run(run(count, old_share))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Benchmarks utils.wiki.WikiClient against the old blocking ``wikipedia`` library path.
+
+Both run against a local stub MediaWiki server that adds a fixed delay to every
+request, standing in for the network round-trip. The old path needs the
+``wikipedia`` package, which isn't a bot dependency anymore.
+
+Run from the repository root: python -m benchmarks.wiki [lookups] [delay ms]
+"""
+
+import asyncio
+import sys
+import time
+
+from aiohttp import web
+
+from utils.http import HTTPClient
+from utils.wiki import WikiClient
+
+PAGE_ID = '1'
+
+
+def stub_response(params):
+    """Answers the handful of query shapes used by both clients."""
+    topic = params.get('gsrsearch') or params.get('srsearch') or params.get('titles', 'Topic')
+    url = f'https://en.wikipedia.org/wiki/{topic.replace(" ", "_")}'
+    extract = f'{topic} is a topic. ' * 40
+
+    if params.get('generator') == 'search':
+        pages = [{
+            'pageid': index + 1, 'ns': 0, 'title': f'{topic}{" " * index}', 'index': index + 1,
+            'extract': extract, 'fullurl': url, 'thumbnail': {'source': f'{url}.jpg', 'width': 500, 'height': 400},
+        } for index in range(6)]
+        return {'batchcomplete': True, 'query': {'pages': pages}}
+    if params.get('list') == 'search':
+        return {'query': {'searchinfo': {}, 'search': [{'ns': 0, 'title': topic}]}}
+    if params.get('generator') == 'images':
+        pages = {str(-i): {'title': f'File:{i}.jpg', 'imageinfo': [{'url': f'{url}/{i}.jpg'}]} for i in range(1, 15)}
+        return {'query': {'pages': pages}}
+    if params.get('prop') == 'extracts':
+        return {'query': {'pages': {PAGE_ID: {'pageid': 1, 'ns': 0, 'title': topic, 'extract': extract}}}}
+    # prop=info|pageprops, the page load
+    return {'query': {'pages': {PAGE_ID: {'pageid': 1, 'ns': 0, 'title': topic, 'fullurl': url, 'pageprops': {}}}}}
+
+
+async def start_stub(delay):
+    async def handler(request):
+        await asyncio.sleep(delay)
+        return web.json_response(stub_response(request.query))
+
+    app = web.Application()
+    app.router.add_get('/w/api.php', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f'http://127.0.0.1:{port}/w/api.php'
+
+
+def old_lookup(topic):
+    import wikipedia
+
+    # the same work the old command did: page, then its summary and filtered images
+    page = wikipedia.page(topic)
+    images = [i for i in page.images if i.endswith((".jpg", ".JPG", ".png", ".PNG"))]
+    return page.title, page.url, page.summary, images[:1]
+
+
+async def bench_old(loop, topics, concurrent):
+    try:
+        import wikipedia
+    except ImportError:
+        return None
+
+    start = time.perf_counter()
+    if concurrent:
+        await asyncio.gather(*(loop.run_in_executor(None, old_lookup, topic) for topic in topics))
+    else:
+        for topic in topics:
+            await loop.run_in_executor(None, old_lookup, topic)
+    return time.perf_counter() - start
+
+
+async def bench_new(client, topics, concurrent):
+    start = time.perf_counter()
+    if concurrent:
+        await client.lookup_many(topics)
+    else:
+        for topic in topics:
+            await client.lookup(topic)
+    return time.perf_counter() - start
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    delay = (float(sys.argv[2]) if len(sys.argv) > 2 else 30.0) / 1000
+    loop = asyncio.get_event_loop()
+    runner, api_url = await start_stub(delay)
+
+    try:
+        import wikipedia
+        wikipedia.wikipedia.API_URL = api_url
+    except ImportError:
+        pass
+
+    http_client = HTTPClient(loop)
+    client = WikiClient(http_client, api_url=api_url)
+    print(f"{count} lookups, {delay * 1000:.0f}ms per stub request")
+    try:
+        for concurrent in (False, True):
+            # distinct topics, so the library's memoized search can't help it
+            topics = [f'Topic {concurrent} {i}' for i in range(count)]
+            mode = 'concurrent' if concurrent else 'sequential'
+            old = await bench_old(loop, topics, concurrent)
+            new = await bench_new(client, topics, concurrent)
+            old_text = 'skipped (wikipedia not installed)' if old is None else f'{old / count * 1000:8.1f} ms/lookup'
+            print(f"{mode:<11} wikipedia: {old_text}   WikiClient: {new / count * 1000:8.1f} ms/lookup")
+    finally:
+        await http_client.close()
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main())
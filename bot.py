@@ -1,12 +1,27 @@
+import asyncio
 import datetime
+import sys
+import time
 import traceback
 
-import aiohttp
 import discord
 from discord.ext import commands
 
 import config
 from utils import context
+from utils.bulk import BulkJobs
+from utils.cache import ResponseCache
+from utils.cooldown import CooldownStore
+from utils.executors import ExecutorRegistry
+from utils.extensions import LazyExtension, load_timed, format_report
+from utils.help import HelpIndex
+from utils.http import HTTPClient
+from utils.ipc import IPCClient
+from utils.members import MemberCache, cache_options
+from utils.metrics import Metrics
+from utils.prefixes import PrefixCache
+from utils.reloader import HotReloader
+from utils.reporter import ErrorReporter
 
 initial_extensions = (
     'cogs.info',
@@ -18,20 +33,48 @@ initial_extensions = (
     'cogs.utilities',
 )
 
-class SneakyNinja(commands.Bot):
-    def __init__(self):
+class SneakyNinja(commands.AutoShardedBot):
+    # (fresh, then stale-while-revalidate) seconds of each response cache namespace
+    CACHE_TTLS = {
+        'wikipedia': (3600.0, 86400.0),
+        'translate': (86400.0, 86400.0),
+        'math': (86400.0, 0.0),
+    }
+
+    def __init__(self, *, cluster_id=None, ipc_port=None, **options):
+        self.prefixes = PrefixCache(config.prefix)
+        intents = discord.Intents(
+            guilds=True, members=True, messages=True,
+            voice_states=True, emojis=True, invites=True
+        )
+        member_cache = getattr(config, 'member_cache', 'all')
         super().__init__(
-            command_prefix=commands.when_mentioned_or(config.prefix), owner_ids=config.owner_ids,
+            command_prefix=self.prefixes, owner_ids=config.owner_ids,
             description="Greetings, I can provide various info and of course, help you run server",
             activity=discord.Activity(name=f'{config.prefix}help', type=discord.ActivityType.listening),
-            intents=discord.Intents(
-                guilds=True, members=True, messages=True,
-                voice_states=True, emojis=True, invites=True
-            )
+            intents=intents,
+            **cache_options(member_cache, intents),
+            **options
         )
         
         # utils
-        self.session = aiohttp.ClientSession(loop=self.loop)
+        self.http_client = HTTPClient(self.loop, getattr(config, 'http_upstreams', None))
+        self.session = self.http_client.session_for(config.webhook_url)
+        self.response_cache = ResponseCache(
+            max_size=getattr(config, 'response_cache_size', 2048),
+            ttls={**self.CACHE_TTLS, **getattr(config, 'response_cache_ttls', {})},
+        )
+        # blocking and cpu bound work goes through these instead of the loop's default executor
+        self.executors = ExecutorRegistry(getattr(config, 'executors', None))
+        self.cluster_id = cluster_id
+        # guilds aren't chunked at startup, commands needing every member go through member_cache.members
+        self.member_cache = MemberCache(self, member_cache, max_size=getattr(config, 'member_cache_size', 50000))
+        if member_cache == 'active':
+            self.add_listener(self.member_cache.on_message, 'on_message')
+            self.add_listener(self.member_cache.on_member_join, 'on_member_join')
+            self.add_listener(self.member_cache.on_guild_join, 'on_guild_join')
+            self.add_listener(self.member_cache.on_guild_available, 'on_guild_available')
+        self.ipc = IPCClient(self, cluster_id, ipc_port) if ipc_port else None
         self.webhook = discord.Webhook.from_url(
             config.webhook_url,
             adapter=discord.AsyncWebhookAdapter(session=self.session)
@@ -42,39 +85,159 @@ class SneakyNinja(commands.Bot):
         self.colour = discord.Colour(0x04f2a6)
         self.time_format = "%d %B, %Y; %I:%M %p"
 
-        # a global cooldown mapping, to avoid command spams 
-        self._global_cooldown = commands.CooldownMapping.from_cooldown(5, 6.0, commands.BucketType.member)
-        self.add_check(self.global_cooldown_check)
+        # a global cooldown store, to avoid command spams
+        self._global_cooldown = CooldownStore(5, 6.0)
+        self._global_cooldown_template = commands.Cooldown(5, 6.0, commands.BucketType.member)
+        # once per invocation, Command.can_run would charge it again for every command checked
+        self.add_check(self.global_cooldown_check, call_once=True)
+
+        # per command metrics, the before invoke hook marks the end of checks and conversion
+        self.metrics = Metrics()
+        self.metrics.collectors.append(self._global_cooldown_metrics)
+        self.metrics.collectors.append(self.http_client.metrics)
+        self.metrics.collectors.append(self.response_cache.metrics)
+        self.metrics.collectors.append(self.executors.metrics)
+        self.before_invoke(self._mark_checked)
+
+        # bulk member edits, resumed after a restart from the bulk_jobs table
+        self.bulk_jobs = BulkJobs(self, workers=getattr(config, 'bulk_workers', 8))
+        self.metrics.collectors.append(self.bulk_jobs.metrics)
+
+        # unexpected errors are sent to the webhook in batches, see SneakyCore
+        self.error_reporter = ErrorReporter(self)
 
-        self.load_extension('cogs.core')  # cogs.core's exception shouldn't be ignored
+        # extensions listed in config.lazy_extensions only register stub commands here
+        # and are imported and loaded the first time one of their commands is used
+        self.startup_report = {}
+        self._lazy_extensions = {}
+        # help embeds and command search, re-rendered per extension as they're (un)loaded
+        self.help_index = HelpIndex(self)
+        lazy_extensions = getattr(config, 'lazy_extensions', ())
+
+        self.startup_report['cogs.core'] = load_timed(self, 'cogs.core')  # cogs.core's exception shouldn't be ignored
         for extension in initial_extensions:
             try:
-                self.load_extension(extension)
+                if extension in lazy_extensions:
+                    lazy = self._lazy_extensions[extension] = LazyExtension(self, extension)
+                    lazy.install()
+                else:
+                    self.startup_report[extension] = load_timed(self, extension)
             except Exception as error:
                 print(f'Failed to load {extension}')
                 traceback.print_exception(type(error), error, error.__traceback__)
+        self.help_index.refresh()
+        print(format_report(self.startup_report.values()))
+
+        # reloads changed cogs and utils modules, automatically with config.hot_reload
+        self.reloader = HotReloader(self, interval=getattr(config, 'hot_reload_interval', 1.0))
+
+
+    def load_extension(self, name):
+        # stubs of a lazy extension would clash with its real commands
+        lazy = self._lazy_extensions.pop(name, None)
+        if lazy:
+            lazy.uninstall()
+        try:
+            super().load_extension(name)
+        except Exception:
+            if lazy:
+                lazy.install()
+                self._lazy_extensions[name] = lazy
+            raise
+        self.help_index.refresh(name)
+
+    def unload_extension(self, name):
+        super().unload_extension(name)
+        self.help_index.refresh(name)
 
+    def restore_extension(self, name, lib):
+        """Sets up an already imported extension module again, like reload_extension does when it fails."""
+        lib.setup(self)
+        self._BotBase__extensions[name] = lib
+        sys.modules[name] = lib
+        self.help_index.refresh(name)
 
     async def on_ready(self):
         print(f"Logged in:\n{self.user.name} - {self.user.id}")
+        await self.bulk_jobs.resume()
 
-    async def get_context(self, message, *, cls=context.Context):
-        return await super().get_context(message, cls=cls)
+    async def get_context(self, message, *, cls=None):
+        # looked up per call, a hot reload of utils.context replaces the class
+        cls = cls or context.Context
+        start = time.perf_counter()
+        ctx = await super().get_context(message, cls=cls)
+        ctx.parsed_in = time.perf_counter() - start
+        return ctx
+
+    async def invoke(self, ctx):
+        if ctx.command is None:
+            return await super().invoke(ctx)
+
+        start = time.perf_counter()
+        await super().invoke(ctx)
+        self.metrics.record_invoke(ctx, start, time.perf_counter())
+
+    async def _mark_checked(self, ctx):
+        ctx.checked_at = time.perf_counter()
+
+    def _global_cooldown_metrics(self):
+        stats = self._global_cooldown.stats()
+        yield '# TYPE sneakyninja_global_cooldown_buckets gauge'
+        yield f"sneakyninja_global_cooldown_buckets {stats['buckets']}"
+        yield '# TYPE sneakyninja_global_cooldown_evictions_total counter'
+        yield f"sneakyninja_global_cooldown_evictions_total {stats['evictions']}"
+        yield '# TYPE sneakyninja_global_cooldown_rejections_total counter'
+        yield f"sneakyninja_global_cooldown_rejections_total {stats['rejections']}"
+
+    async def start(self, *args, **kwargs):
+        if self.ipc:
+            await self.ipc.connect()
+        await self.prefixes.start(self.pool)
+        if getattr(config, 'hot_reload', False):
+            self.reloader.start()
+        await super().start(*args, **kwargs)
 
     async def close(self):
+        # jobs are cancelled while the connection and the pool they use are still up
+        self.reloader.stop()
+        self.bulk_jobs.stop()
         await super().close()
-        await self.session.close()
+        if self.ipc:
+            await self.ipc.close()
+        await self.prefixes.close()
+        await self.http_client.close()
+        self.executors.shutdown()
         await self.pool.close()
 
+    def local_stats(self):
+        """Statistics of this process only."""
+        return {
+            'guilds': len(self.guilds),
+            'members': sum(g.member_count for g in self.guilds),
+            'users': len(self.users),
+            'shards': len(self.shards),
+            'latency': self.latency,
+        }
+
+    async def get_stats(self):
+        """Statistics of the whole bot, summed over every cluster when running clustered."""
+        if self.ipc is None:
+            return self.local_stats()
+        try:
+            return await self.ipc.cluster_stats()
+        except (asyncio.TimeoutError, ConnectionError):
+            return self.local_stats()
+
     async def global_cooldown_check(self, ctx):
         """Global Command Cooldown"""
 
         # this is the global cooldown implementaion
         # but cogs and commands may have their own local cooldown
-        bucket = self._global_cooldown.get_bucket(ctx.message)
-        retry_after = bucket.update_rate_limit()
+        cooldown = self._global_cooldown
+        retry_after = cooldown.update_rate_limit(cooldown.member_key(ctx.message))
         if retry_after:
-            raise commands.CommandOnCooldown(bucket, retry_after)
+            self.metrics.record_cooldown(ctx)
+            raise commands.CommandOnCooldown(self._global_cooldown_template, retry_after)
         return True
 
     def timenow(self):
@@ -91,28 +254,39 @@ class SneakyNinja(commands.Bot):
 
         await self.webhook.send(*args, **kwargs, username=username, avatar_url=avatar_url)
 
-if __name__ == '__main__':
-    import asyncio
+def run(**options):
+    """Sets up logging and the database pool, then runs the bot. Options are passed to SneakyNinja."""
     import asyncpg
-    import logging
     import json
     from pathlib import Path
 
+    from utils.logs import setup_logging
+
     p = Path('.') / 'logs'
     if not p.exists():
         p.mkdir()
 
-    discord_logger = logging.getLogger('discord')
-    discord_logger.setLevel(logging.DEBUG)
-    discord_handler = logging.FileHandler(filename='logs/discord.log', encoding='utf-8', mode='w')
-    discord_handler.setFormatter(logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s'))
-    discord_logger.addHandler(discord_handler)
+    cluster_id = options.get('cluster_id')
+    log_pipeline = setup_logging(
+        suffix='' if cluster_id is None else f'-{cluster_id}',
+        max_bytes=getattr(config, 'log_max_bytes', 32 * 2**20),
+        backups=getattr(config, 'log_backups', 5),
+        when=getattr(config, 'log_rotate_when', None),
+        debug_rate=getattr(config, 'log_debug_rate', 100),
+    )
 
     async def init(conn):
         await conn.set_type_codec('jsonb', encoder=json.dumps, decoder=json.loads, schema='pg_catalog', format='text')
     loop = asyncio.get_event_loop()
     pool = loop.run_until_complete(asyncpg.create_pool(config.postgresql, init=init))
 
-    bot = SneakyNinja()
+    bot = SneakyNinja(**options)
     bot.pool = pool
-    bot.run(config.token)
\ No newline at end of file
+    bot.metrics.collectors.append(log_pipeline.metrics)
+    try:
+        bot.run(config.token)
+    finally:
+        log_pipeline.stop()
+
+if __name__ == '__main__':
+    run()
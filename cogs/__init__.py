@@ -3,10 +3,6 @@
 import logging
 
 # To log in the cogs: import logging and log = logging.getLogger(__name__)
+# handlers are attached by utils.logs.setup_logging, off the event loop thread
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
-
-handler = logging.FileHandler(filename='logs/sneakycogs.log', encoding='utf-8')
-handler.setFormatter(logging.Formatter('|{asctime}|{levelname}|{name}: {message}', '%Y-%m-%d %I:%M:%S %p', style='{'))
-
-log.addHandler(handler)
\ No newline at end of file
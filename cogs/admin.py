@@ -1,10 +1,17 @@
 import discord
 from discord.ext import commands
 
+import copy
+import io
+import sys
 import textwrap
+import time
 import traceback
 
 from utils.converters import PyCodeBlock
+from utils.extensions import format_report
+from utils.profiling import is_running, profile_invocation
+from utils.reloader import ReloadError
 
 class Admin(commands.Cog, command_attrs=dict(hidden=True)):
     """Owner only cog for dynamic bot management."""
@@ -39,13 +46,168 @@ class Admin(commands.Cog, command_attrs=dict(hidden=True)):
             await ctx.send(e)
 
     @commands.command()
-    async def reload(self, ctx, *, extension):
-        """Reloads an extension."""
+    async def reload(self, ctx, *, module=None):
+        """Reloads a module and every module depending on it, or all changed modules.
+
+        Extensions and utils modules are reloaded in dependency order, and rolled back if one fails.
+        Modules the bot itself holds instances of, like utils.http or utils.executors, and every
+        module they depend on, can't be reloaded: the bot would keep running their old code.
+        Those need a restart.
+        """
+        reloader = self.bot.reloader
+        names = [module] if module else reloader.changed()
+        if module and module not in sys.modules:
+            return await ctx.send(f"{module} isn't loaded.")
+        if not names:
+            return await ctx.send("Nothing changed.")
+
         try:
-            self.bot.reload_extension(extension)
-            await ctx.message.add_reaction(self._emoji['success'])
-        except commands.ExtensionError as e:
-            await ctx.send(e)
+            timings = reloader.reload(names)
+        except ReloadError as e:
+            return await ctx.send(f"```\n{e}```")
+        lines = [f"{name:<24}{seconds * 1000:>8.1f}ms" for name, seconds in timings]
+        await ctx.send("```\n{}```".format('\n'.join(lines) or 'Nothing to reload.'))
+
+    @commands.command()
+    async def startup(self, ctx):
+        """Shows how long each extension took to load."""
+        report = format_report(self.bot.startup_report.values())
+        await ctx.send(f"```\n{report}```")
+
+    @commands.command()
+    async def metrics(self, ctx, *, command=None):
+        """Shows command invocations and latencies, or a command's latency per phase."""
+        metrics = self.bot.metrics
+        if command:
+            stats = metrics.commands.get(command)
+            if stats is None:
+                return await ctx.send("No invocations recorded for this command.")
+            lines = [f"{command}: {stats.invocations} calls, {stats.errors} errors, {stats.cooldowns} cooldowns"]
+            for phase in stats.PHASES:
+                hist = getattr(stats, phase)
+                lines.append(
+                    f"{phase:<9}p50 {hist.percentile(.5) * 1000:>8.1f}ms  p95 {hist.percentile(.95) * 1000:>8.1f}ms  "
+                    f"p99 {hist.percentile(.99) * 1000:>8.1f}ms"
+                )
+            return await ctx.send("```\n{}```".format('\n'.join(lines)))
+
+        uptime = time.time() - metrics.started
+        total = sum(stats.invocations for stats in metrics.commands.values())
+        lines = [f"{total} invocations in {uptime / 60:.0f} minutes ({total / uptime * 60:.1f}/min)", ""]
+        lines.append(f"{'command':<20}{'calls':>7}{'err':>5}{'cd':>5}{'p50':>9}{'p95':>9}{'p99':>9}")
+        top = sorted(metrics.commands.items(), key=lambda item: item[1].invocations, reverse=True)[:20]
+        for name, stats in top:
+            hist = stats.callback
+            lines.append(
+                f"{name[:19]:<20}{stats.invocations:>7}{stats.errors:>5}{stats.cooldowns:>5}"
+                f"{hist.percentile(.5) * 1000:>7.0f}ms{hist.percentile(.95) * 1000:>7.0f}ms"
+                f"{hist.percentile(.99) * 1000:>7.0f}ms"
+            )
+        await ctx.send("```\n{}```".format('\n'.join(lines)))
+
+    @commands.command()
+    async def errors(self, ctx, fingerprint=None):
+        """Lists recently reported errors, or shows the full traceback of one."""
+        reporter = self.bot.error_reporter
+        if fingerprint is None:
+            seen = {}
+            for entry in reversed(reporter.recent):
+                seen.setdefault(entry.fingerprint, entry)
+            if not seen:
+                return await ctx.send("No errors reported.")
+            lines = [
+                f"{fp} {reporter.totals[fp]:>5}x {entry.title} ({entry.timestamp.strftime(ctx.tformat)})"
+                for fp, entry in seen.items()
+            ]
+            return await ctx.send("```\n{}```".format('\n'.join(lines)[:1990]))
+
+        entry = reporter.lookup(fingerprint)
+        if entry is None:
+            return await ctx.send("No stored error with this fingerprint.")
+        text = f"{entry.title}\n{entry.context}\n\n{entry.traceback}"
+        if len(text) > 1980:
+            return await ctx.send(file=discord.File(io.BytesIO(text.encode()), filename=f'{entry.fingerprint}.txt'))
+        await ctx.send(f"```py\n{text}```")
+
+    @commands.group(invoke_without_command=True)
+    async def cache(self, ctx):
+        """Shows the response cache's size and hit rates."""
+        response_cache = self.bot.response_cache
+        lines = [f"{len(response_cache)}/{response_cache.max_size} entries", ""]
+        lines.append(f"{'namespace':<12}{'hits':>8}{'stale':>8}{'misses':>8}{'hit rate':>10}")
+        for namespace, stats in response_cache.stats.items():
+            total = stats.hits + stats.stale_hits + stats.misses
+            rate = (stats.hits + stats.stale_hits) / total if total else 0
+            lines.append(f"{namespace:<12}{stats.hits:>8}{stats.stale_hits:>8}{stats.misses:>8}{rate:>10.0%}")
+        await ctx.send("```\n{}```".format('\n'.join(lines)))
+
+    @cache.command(name='flush')
+    async def cache_flush(self, ctx, namespace=None):
+        """Drops every cached response, or only a namespace's."""
+        count = self.bot.response_cache.flush(namespace)
+        await ctx.send(f"Dropped {count} entries.")
+
+    @commands.command()
+    async def breakers(self, ctx):
+        """Shows the circuit breaker state of every upstream."""
+        upstreams = self.bot.http_client.upstreams
+        if not upstreams:
+            return await ctx.send("No upstream was used yet.")
+        lines = [f"{'host':<28}{'state':>10}{'errors':>8}{'p95':>9}{'trips':>7}{'hedged':>8}"]
+        for host, upstream in upstreams.items():
+            breaker = upstream.breaker
+            lines.append(
+                f"{host[:27]:<28}{breaker.state:>10}{breaker.failure_rate:>8.0%}"
+                f"{upstream.latency.percentile(.95) * 1000:>7.0f}ms{breaker.trips:>7}{upstream.hedged:>8}"
+            )
+        await ctx.send("```\n{}```".format('\n'.join(lines)))
+
+    @commands.command()
+    async def profile(self, ctx, *, command_line):
+        """Invokes a command under the profiler, e.g. profile --stacks wiki python.
+
+        Options before the command: --top N rows of the table, --sort a pstats sort key,
+        --stacks to also get collapsed stacks for a flamegraph.
+        """
+        words = command_line.split(' ')
+        top, sort, sample = 30, 'cumulative', False
+        while words and words[0].startswith('--'):
+            option = words.pop(0)
+            if option == '--stacks':
+                sample = True
+            elif option in ('--top', '--sort') and words:
+                value = words.pop(0)
+                if option == '--top':
+                    if not value.isdigit():
+                        return await ctx.send("--top needs a number.")
+                    top = int(value)
+                else:
+                    sort = value
+            else:
+                return await ctx.send(f"Unknown option {option}.")
+
+        # the command goes through the same parsing and checks as a normal message
+        message = copy.copy(ctx.message)
+        message.content = f"{ctx.prefix}{' '.join(words)}"
+        new_ctx = await self.bot.get_context(message)
+        if new_ctx.command is None:
+            return await ctx.send("No such command.")
+        # the inner profile would wait forever on the outer one
+        if new_ctx.command is ctx.command:
+            return await ctx.send("Can't profile the profile command.")
+        if is_running():
+            return await ctx.send("A profile is already running.")
+
+        result = await profile_invocation(self.bot, new_ctx, sample=sample)
+        try:
+            table = result.table(top, sort)
+        except KeyError:
+            return await ctx.send(f"Unknown sort key {sort}.")
+
+        files = [discord.File(io.BytesIO(table.encode()), filename='profile.txt')]
+        if result.stacks is not None:
+            files.append(discord.File(io.BytesIO(result.stacks.encode()), filename='stacks.folded'))
+        await ctx.send(f"```\n{new_ctx.command.qualified_name}: {result.summary()}```", files=files)
 
     @commands.command(aliases=['py'])
     async def pyrun(self, ctx, *, code: PyCodeBlock):
@@ -1,7 +1,13 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 
-import traceback
+import logging
+
+import config
+from utils.executors import ExecutorBusy
+from utils.http import UpstreamError
+
+log = logging.getLogger(__name__)
 
 class SneakyHelp(commands.HelpCommand):
     """SneakyNinja's help command implementation.""" 
@@ -12,65 +18,57 @@ class SneakyHelp(commands.HelpCommand):
             "category, use {0}{1} [category].".format(self.clean_prefix, self.invoked_with)
         )
     
-    def get_sneaky_command_signature(self, command):
-        return '{0.qualified_name} {0.signature}'.format(command)
+    def _send_payload(self, payload, fields=()):
+        # payloads are shared, so the embed gets its own field list
+        em = discord.Embed.from_dict({**payload, 'fields': [*fields, *payload['fields']]})
+        em.set_footer(text=self.get_ending_note())
+        return self.get_destination().send(embed=em)
 
     async def send_bot_help(self, mapping):
-        ctx = self.context
-        em = discord.Embed(title='Sneaky Help', colour=ctx.bot.colour)
-
-        description = ctx.bot.description
-        if description:
-            em.description = description
-
-        for cog, commands in mapping.items():
-            name = 'No Category' if cog is None else cog.qualified_name
-            filteredcmds = await self.filter_commands(commands, sort=True)
-            if filteredcmds:
-                value = ', '.join(f"*`{cmd.name}`*" for cmd in filteredcmds)
-                
-                em.add_field(name=name, value=value)
-        em.set_footer(text=self.get_ending_note())
-        await self.get_destination().send(embed=em)
+        await self._send_payload(self.context.bot.help_index.overview)
 
     async def send_cog_help(self, cog):
-        em = discord.Embed(title=cog.qualified_name, colour=self.context.bot.colour)
-        if cog.description:
-            em.description = cog.description
-
-        filteredcmds = await self.filter_commands(cog.get_commands(), sort=True)
-        for cmd in filteredcmds:
-            doc = f'*`{cmd.short_doc}`*' if cmd.short_doc else '`...`'
-            em.add_field(name=self.get_sneaky_command_signature(cmd), value=doc)
-
-        em.set_footer(text=self.get_ending_note())
-        await self.get_destination().send(embed=em)
+        index = self.context.bot.help_index
+        payload = index.cogs.get(cog.qualified_name)
+        if payload is None:
+            # no visible commands
+            payload = {'title': cog.qualified_name, 'description': cog.description, 'fields': []}
+        await self._send_payload(payload)
 
     async def send_group_help(self, group):
-        em = discord.Embed(title=group.qualified_name, colour=self.context.bot.colour)
-        if group.help:
-            em.description = group.help
-        
-        filteredcmds = await self.filter_commands(group.commands, sort=True)
-        if filteredcmds:
-            for cmd in filteredcmds:
-                doc = f'*`{cmd.short_doc}`*' if cmd.short_doc else '`...`'
-                em.add_field(name=self.get_sneaky_command_signature(cmd), value=doc)
-
-        em.set_footer(text=self.get_ending_note())
-        await self.get_destination().send(embed=em)
+        await self.send_command_help(group)
 
     async def send_command_help(self, command):
-        em = discord.Embed(title=command.qualified_name, colour=self.context.bot.colour)
-        em.add_field(name='usage', value=self.get_command_signature(command))
-        if command.short_doc:
-            em.description = command.short_doc
-            commandhelp = command.help[len(command.short_doc):]
-            if commandhelp:
-                em.add_field(name='help', value=commandhelp, inline=False)
+        index = self.context.bot.help_index
+        name = command.qualified_name
+        payload, usage = index.commands.get(name), index.usages.get(name)
+        if payload is None:
+            # hidden commands aren't indexed, they're only shown when asked for by name
+            payload, usage = index.render(command)
+
+        fields = ()
+        if usage is not None:
+            fields = ({'name': 'usage', 'value': f'{self.clean_prefix}{usage}', 'inline': True},)
+        await self._send_payload(payload, fields)
+
+    def _suggestions(self, string, parent=None):
+        index = self.context.bot.help_index
+        return '\n'.join(
+            f"`{name}` {index.short_docs[name] or ''}" for name in index.search(string, parent=parent)
+        )
 
-        em.set_footer(text=self.get_ending_note())
-        await self.get_destination().send(embed=em)
+    def command_not_found(self, string):
+        suggestions = self._suggestions(string)
+        if suggestions:
+            return f'No command called "{string}" found. Did you mean:\n{suggestions}'
+        return super().command_not_found(string)
+
+    def subcommand_not_found(self, command, string):
+        if isinstance(command, commands.Group):
+            suggestions = self._suggestions(string, parent=command.qualified_name)
+            if suggestions:
+                return f'Command "{command.qualified_name}" has no subcommand named {string}. Did you mean:\n{suggestions}'
+        return super().subcommand_not_found(command, string)
 
 
 class SneakyCore(commands.Cog):
@@ -78,18 +76,46 @@ class SneakyCore(commands.Cog):
     
     This cog is reponsible for:-
         1. Custom HelpCommand
-        2. Error Handling
+        2. Error Handling and reporting
+        3. Exporting metrics
     """
 
     def __init__(self, bot):
         self.bot = bot
         bot.help_command = SneakyHelp(show_hidden=False, verify_checks=False, command_attrs={'hidden': True})
         bot.help_command.cog = self
+        self.metrics_file = getattr(config, 'metrics_file', 'logs/metrics.prom')
+        self.export_metrics.start()
+        self.flush_errors.start()
+
+    def cog_unload(self):
+        self.export_metrics.cancel()
+        self.flush_errors.cancel()
+
+    @tasks.loop(seconds=getattr(config, 'error_flush_interval', 30.0))
+    async def flush_errors(self):
+        await self.bot.error_reporter.flush()
+
+    @flush_errors.before_loop
+    async def before_flush_errors(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(seconds=getattr(config, 'metrics_interval', 60.0))
+    async def export_metrics(self):
+        # rendering is cheap, only the file write goes off the loop
+        text = self.bot.metrics.render()
+        try:
+            await self.bot.executors.run('io', self.bot.metrics.write, self.metrics_file, text)
+        except ExecutorBusy:
+            # an unhandled error would stop the loop, the next tick writes fresher metrics anyway
+            log.warning('Skipped exporting metrics, the io executor is busy')
 
     @commands.Cog.listener()
     async def on_command_error(self, ctx, error):
         """Global Error Handler"""
 
+        ctx.bot.metrics.record_error(ctx)
+
         # unwrapping commands.CommandInvokeError
         error = getattr(error, 'original', error)
         ignored = (
@@ -105,9 +131,15 @@ class SneakyCore(commands.Cog):
             discord.NotFound,
             discord.Forbidden,
             discord.HTTPException,
+            UpstreamError,
+            ExecutorBusy,
         )
 
         if isinstance(error, ignored):
+            if isinstance(error, commands.CommandNotFound):
+                suggestion = ctx.bot.help_index.search(ctx.invoked_with, parent='', limit=1, threshold=0.5)
+                if suggestion:
+                    await ctx.send(f"No command called `{ctx.invoked_with}`, did you mean `{ctx.prefix}{suggestion[0]}`?")
             return
         elif type(error) in parent_ignored:
             # only parent should be ignored, not its subclasses
@@ -123,21 +155,7 @@ class SneakyCore(commands.Cog):
                 return await ctx.reinvoke()                
             await ctx.send(error)
         else:
-            tb = "".join(traceback.format_exception(type(error), error, error.__traceback__))
-            embed = discord.Embed(
-                title=f"Ignoring Exception in `{ctx.cog.qualified_name}`.`{ctx.command}`...",
-                description=f"```py\n{tb}```",
-                colour=discord.Colour.red(),
-                timestamp=ctx.timenow(),
-            )
-            embed.set_author(name=ctx.author, icon_url=ctx.author.avatar_url)
-            embed.set_footer(text=ctx.guild, icon_url=ctx.guild.icon_url)
-
-            embed.add_field(name='Author', value=f"{ctx.author}\n[{ctx.author.id}]")
-            embed.add_field(name='Guild', value=f"{ctx.guild}\n[{ctx.guild.id}]")
-            embed.add_field(name='Channel', value=f"{ctx.channel}\n[{ctx.channel.id}]")
-
-            await ctx.webhook_log(embed=embed, username_plus=" [Error]")
+            self.bot.error_reporter.report(ctx, error)
 
 
 def setup(bot):
@@ -2,12 +2,65 @@ import discord
 from discord.ext import commands
 
 import random
+import re
+
+import config
+from utils.feeds import FeedCache
+from utils.figlet import FigletRenderer
+from utils.prefetch import PrefetchBuffer, metrics as prefetch_metrics
 
 class Fun(commands.Cog):
     """Fun commands."""
 
+    # size: results kept ready, concurrency: parallel refill fetches, interval: seconds between refill rounds
+    PREFETCH_DEFAULTS = {'size': 10, 'concurrency': 2, 'interval': 1.0}
+    MAX_SUBREDDITS = 5
+
     def __init__(self, bot):
         self.bot = bot
+
+        # results of the random content commands are interchangeable, so they're fetched ahead of time
+        prefetch_config = getattr(config, 'prefetch', {})
+        self.buffers = {
+            name: PrefetchBuffer(name, fetch, **{**self.PREFETCH_DEFAULTS, **prefetch_config.get(name, {})})
+            for name, fetch in (
+                ('cats', self._fetch_cat), ('coffee', self._fetch_coffee),
+                ('facts', self._fetch_fact), ('quote', self._fetch_quote),
+            )
+        }
+        for buffer in self.buffers.values():
+            buffer.start()
+        bot.metrics.collectors.append(self.prefetch_metrics)
+
+        self.figlet = FigletRenderer()
+        self.feeds = FeedCache(bot.http_client, freshness=getattr(config, 'reddit_freshness', 120.0))
+        bot.metrics.collectors.append(self.feeds.metrics)
+
+    def cog_unload(self):
+        self.bot.metrics.collectors.remove(self.feeds.metrics)
+        self.bot.metrics.collectors.remove(self.prefetch_metrics)
+        for buffer in self.buffers.values():
+            buffer.stop()
+
+    def prefetch_metrics(self):
+        return prefetch_metrics(self.buffers.values())
+
+    async def _fetch_cat(self):
+        resp = await self.bot.http_client.fetch('GET', 'https://api.thecatapi.com/v1/images/search', hedge=True)
+        return resp.data[0]['url'] if resp.status == 200 else None
+
+    async def _fetch_coffee(self):
+        resp = await self.bot.http_client.fetch('GET', "https://coffee.alexflipnote.dev/random.json", hedge=True)
+        return resp.data['file'] if resp.status == 200 else None
+
+    async def _fetch_fact(self):
+        resp = await self.bot.http_client.fetch('GET', "https://nekos.life/api/v2/fact", hedge=True)
+        return resp.data['fact'] if resp.status == 200 else None
+
+    async def _fetch_quote(self):
+        payload = {'method': 'getQuote', 'format': 'json', 'lang': 'en'}
+        resp = await self.bot.http_client.fetch('POST', "http://api.forismatic.com/api/1.0/", data=payload)
+        return resp.data if resp.status == 200 else None
     
     @commands.command()
     async def choose(self, ctx, *choices: commands.clean_content):
@@ -28,109 +81,108 @@ class Fun(commands.Cog):
     @commands.command(aliases=['cat', 'neko'])
     async def cats(self, ctx):
         """Get a random cat pic. =^-^="""
-        async with ctx.session.get('https://api.thecatapi.com/v1/images/search') as resp:
-            if resp.status == 200:
-                respjs = await resp.json()
-                e = discord.Embed(title='Look a lovely cat!', colour=ctx.author.colour or self.bot.colour)
-                e.set_image(url=respjs[0]['url'])
-                e.set_footer(text=f"Requested by {ctx.author}", icon_url=ctx.author.avatar_url)
-                return await ctx.send(embed=e)
-            return await ctx.send("The cat escaped.")
+        url = await self.buffers['cats'].get()
+        if url:
+            e = discord.Embed(title='Look a lovely cat!', colour=ctx.author.colour or self.bot.colour)
+            e.set_image(url=url)
+            e.set_footer(text=f"Requested by {ctx.author}", icon_url=ctx.author.avatar_url)
+            return await ctx.send(embed=e)
+        return await ctx.send("The cat escaped.")
 
     @commands.command()
     async def reddit(self, ctx, subreddit):
-        """Get 5 hot reddit posts from a subreddit."""
-
-        url = f"https://www.reddit.com/r/{subreddit.split('/')[-1]}/hot.json"
-        params = {'limit': '5'}
-        async with ctx.session.get(url, params=params) as resp:
-            if resp.status == 200:
-                respjs = await resp.json()
-                posts = respjs['data']['children']
-                if not posts:
-                    return await ctx.send("Not a valid subreddit or doesn't have any posts.")
-
-                e = discord.Embed(colour=discord.Colour.red())
-                e.set_author(name=subreddit, url=url, icon_url='https://i.redd.it/rq36kl1xjxr01.png')
-                e.set_footer(text=f"Requested by {ctx.author}", icon_url=ctx.author.avatar_url)
-
-                e = {
-                    'color': 0xe74c3c,
-                    'author': dict(name=subreddit, url=url, icon_url='https://i.redd.it/rq36kl1xjxr01.png'),
-                    'footer': dict(text=f"Requested by {ctx.author}", icon_url=str(ctx.author.avatar_url)),
-                    'fields': []
-                }
+        """Get 5 hot reddit posts from a subreddit, or from several like python+rust."""
+
+        names = [name for name in subreddit.split('/')[-1].lower().split('+') if name]
+        if not names:
+            return await ctx.send("Not a valid subreddit.")
+        if len(names) > self.MAX_SUBREDDITS:
+            return await ctx.send(f"At most {self.MAX_SUBREDDITS} subreddits at once, please.")
+        url = f"https://www.reddit.com/r/{'+'.join(names)}"
+
+        posts = await self.feeds.merged(names)
+        if posts is not None:
+            if not posts:
+                return await ctx.send("Not a valid subreddit or doesn't have any posts.")
+
+            e = {
+                'color': 0xe74c3c,
+                'author': dict(name=subreddit, url=url, icon_url='https://i.redd.it/rq36kl1xjxr01.png'),
+                'footer': dict(text=f"Requested by {ctx.author}", icon_url=str(ctx.author.avatar_url)),
+                'fields': []
+            }
+        
+            sticky = {'name': 'Sticky', 'value': '', 'inline': False}
+            normal = {'name': 'Posts', 'value': '', 'inline': False}
+            for post in posts:
+                # nsfw = 'nsfw' if data['over_18'] else '', # will implement this later
+                flair = f'[{post.flair}]' if post.flair else ''
+                source = f'r/{post.subreddit} ' if len(names) > 1 else ''
+                line = f"{source}[{post.title}]({post.url}) {flair}" + "\n"
+
+                field = sticky if post.stickied else normal
+                # an embed field holds 1024 characters at most
+                if len(field['value']) + len(line) <= 1024:
+                    field['value'] += line
             
-                sticky = {'name': 'Sticky', 'value': '', 'inline': False}
-                normal = {'name': 'Posts', 'value': '', 'inline': False}
-                for post in posts:
-                    data = post['data']
-                    title, url, stickied = data['title'], data['url'], data['stickied']
-                    # nsfw = 'nsfw' if data['over_18'] else '', # will implement this later
-                    flair = data['link_flair_text'] 
-                    flair = f'[{flair}]' if flair else ''
-
-                    if stickied:
-                        sticky['value'] += f"[{title}]({url}) {flair}" + "\n"
-                    else:
-                        normal['value'] += f"[{title}]({url}) {flair}" + "\n"
-                
-                if sticky['value']:
-                    e['fields'].append(sticky)
-                if normal['value']:
-                    e['fields'].append(normal)
-
-                return await ctx.send(embed=discord.Embed.from_dict(e))
-            await ctx.send("Sorry, couldn't get the subreddit posts.")
+            if sticky['value']:
+                e['fields'].append(sticky)
+            if normal['value']:
+                e['fields'].append(normal)
+
+            return await ctx.send(embed=discord.Embed.from_dict(e))
+        await ctx.send("Sorry, couldn't get the subreddit posts.")
 
     @commands.command()
     async def coffee(self, ctx):
-        async with ctx.session.get("https://coffee.alexflipnote.dev/random.json") as resp:
-            if resp.status == 200:
-                respjs = await resp.json()
-                e = discord.Embed(title='A coffee for you!', colour=ctx.author.colour or self.bot.colour)
-                e.set_image(url=respjs['file'])
-                e.set_footer(text=f"Requested by {ctx.author}", icon_url=ctx.author.avatar_url)
-                return await ctx.send(embed=e)
-            return await ctx.send("No Coffee today.")
+        url = await self.buffers['coffee'].get()
+        if url:
+            e = discord.Embed(title='A coffee for you!', colour=ctx.author.colour or self.bot.colour)
+            e.set_image(url=url)
+            e.set_footer(text=f"Requested by {ctx.author}", icon_url=ctx.author.avatar_url)
+            return await ctx.send(embed=e)
+        return await ctx.send("No Coffee today.")
 
     @commands.command()
     async def facts(self, ctx):
-        async with ctx.session.get("https://nekos.life/api/v2/fact") as resp:
-            if resp.status == 200:
-                respjs = await resp.json()
-                e = discord.Embed(
-                    title='Facts', description=respjs['fact'],
-                    colour=ctx.author.colour or self.bot.colour
-                )
-                e.set_footer(text=f"Requested by {ctx.author}", icon_url=ctx.author.avatar_url)
-                return await ctx.send(embed=e)
-            return await ctx.send("No facts today.")
+        fact = await self.buffers['facts'].get()
+        if fact:
+            e = discord.Embed(
+                title='Facts', description=fact,
+                colour=ctx.author.colour or self.bot.colour
+            )
+            e.set_footer(text=f"Requested by {ctx.author}", icon_url=ctx.author.avatar_url)
+            return await ctx.send(embed=e)
+        return await ctx.send("No facts today.")
 
     @commands.command()
     async def asciify(self, ctx, *, text):
-        url, params = "https://artii.herokuapp.com/make", {'text': text}
-        async with ctx.session.get(url, params=params) as resp:
-            if resp.status == 200:
-                resp_txt = await resp.text()
-                return await ctx.send(f"```{resp_txt}```")
-            return await ctx.send("Sorry, couldn't get the ASCII.")
+        """Turns text into ASCII art. Pick a font with --font, e.g. asciify --font slant hello."""
+        font = None
+        match = re.match(r'(?:--font|-f)\s+(\S+)\s+', text)
+        if match:
+            font, text = match.group(1).lower(), text[match.end():]
+            if font not in self.figlet.fonts:
+                return await ctx.send(f"No such font, pick one of {', '.join(self.figlet.fonts)}.")
+
+        art = self.figlet.render(text, font)
+        if len(art) > 1990:
+            return await ctx.send("Sorry, that's too long to fit in a message.")
+        await ctx.send(f"```{art}```")
 
     @commands.command()
     async def quote(self, ctx):
-        payload = {'method': 'getQuote', 'format': 'json', 'lang': 'en'}
-        async with ctx.session.post("http://api.forismatic.com/api/1.0/", data=payload) as resp:
-            if resp.status == 200:
-                respjs = await resp.json()
-                e = discord.Embed(
-                    title='Random Quote',
-                    url=respjs['quoteLink'],
-                    description=respjs['quoteText'],
-                    colour=ctx.author.colour or self.bot.colour,
-                )
-                e.set_footer(text=f"ー {respjs['quoteAuthor'] or 'unknown'} | Requested by {ctx.author}")
-                return await ctx.send(embed=e)
-            return await ctx.send("Sorry, couldn't get any quotes.")
+        respjs = await self.buffers['quote'].get()
+        if respjs:
+            e = discord.Embed(
+                title='Random Quote',
+                url=respjs['quoteLink'],
+                description=respjs['quoteText'],
+                colour=ctx.author.colour or self.bot.colour,
+            )
+            e.set_footer(text=f"ー {respjs['quoteAuthor'] or 'unknown'} | Requested by {ctx.author}")
+            return await ctx.send(embed=e)
+        return await ctx.send("Sorry, couldn't get any quotes.")
 
 
 def setup(bot):
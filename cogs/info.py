@@ -2,6 +2,7 @@ import discord
 from discord.ext import commands
 
 import sys
+from collections import Counter
 
 from utils.converters import MemberOrFetchedUser
 
@@ -46,7 +47,9 @@ class Info(commands.Cog):
         # dpy logo source: discord.py guild -
         # https://discordapp.com/channels/336642139381301249/336642776609456130/581468466469404683
 
-        member_count, unique_member_count = sum(g.member_count for g in self.bot.guilds), len(self.bot.users)
+        # summed over every cluster, so unique users are only unique per cluster
+        stats = await self.bot.get_stats()
+        member_count, unique_member_count, guild_count = stats['members'], stats['users'], stats['guilds']
 
         e = discord.Embed(
             title=bot_user.name, description=self.bot.description,
@@ -56,7 +59,7 @@ class Info(commands.Cog):
         e.set_thumbnail(url=bot_user.avatar_url_as(static_format='png'))
         e.add_field(
             name="Statistics",
-            value=f"members: {member_count}\nunique: {unique_member_count}\nguilds: {len(self.bot.guilds)}"
+            value=f"members: {member_count}\nunique: {unique_member_count}\nguilds: {guild_count}"
         )
         e.add_field(
             name="Created",
@@ -101,7 +104,8 @@ class Info(commands.Cog):
         """Shows information regarding the server."""
 
         guild = ctx.guild
-        bot_count = len([m for m in ctx.guild.members if m.bot])
+        members = await self.bot.member_cache.members(guild)
+        bot_count = sum(m.bot for m in members)
         tc, vc, cat = len(guild.text_channels), len(guild.voice_channels), len(guild.categories) 
 
         e = discord.Embed(colour=self.bot.colour, description=guild.description)
@@ -117,15 +121,17 @@ class Info(commands.Cog):
         e.set_footer(text=f"Owned by {str(guild.owner)}", icon_url=guild.owner.avatar_url)
         await ctx.send(embed=e)
 
-    @commands.group(aliases=['role'], invoke_without_command=True)
+    @commands.group(invoke_without_command=True)
     async def roles(self, ctx):
         """Shows all server role and some info about them."""
 
         # TODO: Paginate this command maybe in case of too many roles.
         roles = reversed(ctx.guild.roles)  # highest role first
+        members = await self.bot.member_cache.members(ctx.guild)
+        role_counts = Counter(role.id for member in members for role in member.roles)
         name_count, colour, mentionable = [], [], []
         for role in roles:
-            name_count.append(f'{role.mention} ({len(role.members)})')
+            name_count.append(f'{role.mention} ({role_counts[role.id]})')
             colour.append(str(role.colour))
             mentionable.append(str(role.mentionable))
 
@@ -144,9 +150,10 @@ class Info(commands.Cog):
         Providing no argument shows own top role info.
         """
 
-        role = role or ctx.author.top_role        
+        role = role or ctx.author.top_role
+        members = await self.bot.member_cache.members(ctx.guild)
         e = discord.Embed(
-            description=f"{role.mention} - {len(role.members)}",
+            description=f"{role.mention} - {sum(role in m.roles for m in members)}",
             colour=role.colour, timestamp=role.created_at
         )
         e.set_author(name=ctx.guild.name, icon_url=ctx.guild.icon_url)
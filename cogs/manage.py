@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
 
+import config
 from utils.converters import EmbedFlagParser
 
 
@@ -79,6 +80,58 @@ class Manage(commands.Cog):
 
         await ctx.send(embed=e)
 
+    @commands.group(invoke_without_command=True)
+    async def prefix(self, ctx):
+        """Shows the server's command prefixes."""
+        prefixes = ', '.join(f'`{p}`' for p in self.bot.prefixes.get(ctx.guild.id))
+        await ctx.send(f"Prefixes here: {prefixes} (mentioning me works too)")
+
+    @prefix.command(name='add')
+    @commands.has_guild_permissions(manage_guild=True)
+    async def prefix_add(self, ctx, *, prefix):
+        """Adds a command prefix for this server.
+
+        The user must have Manage Server permission.
+        """
+        prefixes = list(self.bot.prefixes.get(ctx.guild.id))
+        if len(prefix) > 15:
+            raise commands.BadArgument("A prefix can be 15 characters long at most.")
+        if prefix in prefixes:
+            raise commands.BadArgument("That's already a prefix here.")
+        if len(prefixes) >= 10:
+            raise commands.BadArgument("10 prefixes at most.")
+
+        await self.bot.prefixes.set(ctx.guild.id, prefixes + [prefix])
+        await ctx.send(f"Added `{prefix}`.")
+
+    @prefix.command(name='remove')
+    @commands.has_guild_permissions(manage_guild=True)
+    async def prefix_remove(self, ctx, *, prefix):
+        """Removes a command prefix of this server, but not its last one.
+
+        The user must have Manage Server permission.
+        """
+        prefixes = list(self.bot.prefixes.get(ctx.guild.id))
+        if prefix not in prefixes:
+            raise commands.BadArgument("That's not a prefix here.")
+        if len(prefixes) == 1:
+            # no prefixes at all means the default one
+            raise commands.BadArgument(f"That's the only prefix here, use `{ctx.prefix}prefix reset` for the default.")
+        prefixes.remove(prefix)
+
+        await self.bot.prefixes.set(ctx.guild.id, prefixes)
+        await ctx.send(f"Removed `{prefix}`.")
+
+    @prefix.command(name='reset')
+    @commands.has_guild_permissions(manage_guild=True)
+    async def prefix_reset(self, ctx):
+        """Resets the command prefixes of this server to the default.
+
+        The user must have Manage Server permission.
+        """
+        await self.bot.prefixes.set(ctx.guild.id, [])
+        await ctx.send(f"Prefix reset to `{config.prefix}`.")
+
 
 def setup(bot):
     bot.add_cog(Manage(bot))
@@ -1,10 +1,13 @@
 import discord
 from discord.ext import commands
 
-import re
 from typing import Union, Optional
 
-from utils.converters import MemberOrFetchedUser, MessageFlagParser
+import config
+from utils.converters import MemberFilter, MemberOrFetchedUser, MessageFlagParser
+from utils.purge import MultiPurge, Purge, RateLimiter
+
+VoiceTarget = Union[discord.Member, discord.VoiceChannel, discord.StageChannel]
 
 
 class Mod(commands.Cog):
@@ -12,6 +15,9 @@ class Mod(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
+        # shared by every purge, under discord's global limit of 50 requests per second
+        self.purge_limiter = RateLimiter(getattr(config, 'purge_rate', 40))
+        self.purge_concurrency = getattr(config, 'purge_concurrency', 8)
 
     async def cog_check(self, ctx):
         return ctx.guild is not None
@@ -77,18 +83,15 @@ class Mod(commands.Cog):
         await ctx.guild.unban(member)
         await ctx.send(f"Forgotten and exiled, {member}.")
 
-    async def _voice_patch(self, targets, **kwargs):
-        """Voice patches provided target and returns the total member count of the target(s)"""
-        member_count = 0
+    async def _voice_patch(self, ctx, targets, label, **kwargs):
+        """Voice patches the members of the target(s) in a bulk job, which reports its progress."""
+        member_ids = []
         for target in targets:
             if isinstance(target, discord.Member):
-                await target.edit(**kwargs)
-                member_count += 1
-            elif isinstance(target, discord.VoiceChannel):
-                member_count += len(target.members)
-                for member in target.members:
-                    await member.edit(**kwargs)
-        return member_count    
+                member_ids.append(target.id)
+            else:
+                member_ids.extend(member.id for member in target.members)
+        return await self.bot.bulk_jobs.submit(ctx, 'voice', kwargs, member_ids, label)
 
     @commands.group(name='voice', aliases=['vc'], invoke_without_command=False)
     @commands.cooldown(1, 10.0, commands.BucketType.guild)
@@ -99,46 +102,82 @@ class Mod(commands.Cog):
     @_voice.command(name='mute')
     @commands.has_guild_permissions(mute_members=True)
     @commands.bot_has_guild_permissions(mute_members=True)
-    async def _voice_mute(self, ctx, targets: commands.Greedy[Union[discord.Member, discord.VoiceChannel]]):
+    async def _voice_mute(self, ctx, targets: commands.Greedy[VoiceTarget]):
         """Voice mutes multiple members.
         
         Both the user and the bot must have Mute Members permission.
         """
-        count = await self._voice_patch(targets, mute=True)
-        await ctx.send(f"The less men think, the more they talk. Muted: {count}")
+        await self._voice_patch(ctx, targets, "The less men think, the more they talk. Muted", mute=True)
     
     @_voice.command(name='unmute')
     @commands.has_guild_permissions(mute_members=True)
     @commands.bot_has_guild_permissions(mute_members=True)
-    async def _voice_unmute(self, ctx, targets: commands.Greedy[Union[discord.Member, discord.VoiceChannel]]):
+    async def _voice_unmute(self, ctx, targets: commands.Greedy[VoiceTarget]):
         """Voice unmutes multiple members.
         
         Both the user and the bot must have mute members permission.
         """
-        count = await self._voice_patch(targets, mute=False)
-        await ctx.send(f"Unmuted: {count}")
+        await self._voice_patch(ctx, targets, "Unmuted", mute=False)
     
     @_voice.command(name='deaf')
     @commands.has_guild_permissions(deafen_members=True)
     @commands.bot_has_guild_permissions(deafen_members=True)
-    async def _voice_deaf(self, ctx, targets: commands.Greedy[Union[discord.Member, discord.VoiceChannel]]):
+    async def _voice_deaf(self, ctx, targets: commands.Greedy[VoiceTarget]):
         """Voice deafens multiple members.
         
         Both the user and the bot must have deafen_members permission.
         """
-        count = await self._voice_patch(targets, deafen=True)
-        await ctx.send(f"Deafened: {count}")
+        await self._voice_patch(ctx, targets, "Deafened", deafen=True)
 
     @_voice.command(name='undeaf')
     @commands.has_guild_permissions(deafen_members=True)
     @commands.bot_has_guild_permissions(deafen_members=True)
-    async def _voice_undeaf(self, ctx, targets: commands.Greedy[Union[discord.Member, discord.VoiceChannel]]):
+    async def _voice_undeaf(self, ctx, targets: commands.Greedy[VoiceTarget]):
         """Voice undeafens multiple members.
         
         Both the user and the bot must have deafen_members permission.
         """
-        count = await self._voice_patch(targets, deafen=False)
-        await ctx.send(f"undeafened: {count}")
+        await self._voice_patch(ctx, targets, "Undeafened", deafen=False)
+
+    @commands.group(name='role', invoke_without_command=False)
+    @commands.cooldown(1, 10.0, commands.BucketType.guild)
+    async def _role(self, ctx):
+        """Role moderation related commands."""
+        pass
+
+    @_role.command(name='add')
+    @commands.has_guild_permissions(manage_roles=True)
+    @commands.bot_has_guild_permissions(manage_roles=True)
+    async def _role_add(self, ctx, role: discord.Role, *, members: MemberFilter):
+        """Gives a role to every member matching the filter.
+
+        The filter is `all`, `humans`, `bots`, a role, a voice or a stage channel.
+        Both the user and the bot must have Manage Roles permission and a higher role.
+        """
+        await self._role_patch(ctx, role, members, add=True)
+
+    @_role.command(name='remove')
+    @commands.has_guild_permissions(manage_roles=True)
+    @commands.bot_has_guild_permissions(manage_roles=True)
+    async def _role_remove(self, ctx, role: discord.Role, *, members: MemberFilter):
+        """Takes a role from every member matching the filter.
+
+        The filter is `all`, `humans`, `bots`, a role, a voice or a stage channel.
+        Both the user and the bot must have Manage Roles permission and a higher role.
+        """
+        await self._role_patch(ctx, role, members, add=False)
+
+    async def _role_patch(self, ctx, role, matches, add):
+        if role.is_default() or role.managed or role >= ctx.me.top_role:
+            return await ctx.send("I can't manage that role.")
+        if role >= ctx.author.top_role and ctx.author != ctx.guild.owner:
+            return await ctx.send("You can't manage that role.")
+
+        members = await self.bot.member_cache.members(ctx.guild)
+        # members already (not) having it are left out
+        member_ids = [member.id for member in members if matches(member) and member._roles.has(role.id) != add]
+        action, label = ('role_add', f"Added {role.name} to") if add else ('role_remove', f"Removed {role.name} from")
+        await self.bot.bulk_jobs.submit(ctx, action, {'role_id': role.id}, member_ids, label)
 
     @commands.command(name='purge')
     @commands.has_guild_permissions(manage_messages=True)
@@ -157,43 +196,33 @@ class Mod(commands.Cog):
         `-mo`, `--mention-over` - has mentions over provided integer.
         `-r`, `--regex` - matches the regex pattern.
         `-ric`, `--regex-ignorecase` - can be used with `-r` to ignorecase.
+        `--before`, `--after` - only searches messages before or after this message ID.
+        `--channels` - purges these channels instead of this one.
+        `--all-channels` - purges every channel both the user and the bot can.
+        The limit applies to each channel, it's the number of newest messages searched.
         """
-
-        if limit > 1000:
-            return await ctx.send("1000 messages at most.")
-
-        predicates = [lambda m: True]
-
+        check, before, after, channels = None, None, None, None
         if flags:
-            args = flags.args
-            if args.user:
-                user = [await MemberOrFetchedUser().convert(ctx, user) for user in args.user]
-                predicates.append(lambda m: m.author in user)
-            if args.contains:
-                predicates.append(lambda m: any(contain in m.content for contain in args.contains))
-            if args.bot:
-                predicates.append(lambda m: m.author.bot)
-            if args.everyone:
-                predicates.append(lambda m: m.mention_everyone)
-            if args.embed:
-                predicates.append(lambda m: bool(m.embeds))
-            if args.reaction_over:
-                predicates.append(lambda m: len(m.reactions) > args.reaction_over)
-            if args.mention_over:
-                predicates.append(lambda m: len(m.raw_mentions) > args.mention_over)
-            if args.regex:
-                if args.regex_ignorecase:
-                    pattern = re.compile(args.regex, re.IGNORECASE)
-                else:
-                    pattern = re.compile(args.regex)
-                predicates.append(lambda m: bool(pattern.search(m.content)))
-
-        def check(msg):
-            return all(predicate(msg) for predicate in predicates)
+            check = await flags.compile()
+            before, after = flags.args.before, flags.args.after
+            channels = await flags.channels()
 
         await ctx.message.delete()
-        deleted = await ctx.channel.purge(limit=limit, check=check)
-        await ctx.send(f"{len(deleted)} Messages? Wiped out their existence.", delete_after=3)
+        progress = await ctx.send("Purging...")
+        options = dict(
+            limit=limit, check=check, limiter=self.purge_limiter,
+            # the progress message's ID bounds the other channels' history in time too
+            before=discord.Object(before) if before else progress,
+            after=discord.Object(after) if after else None,
+        )
+        if channels is None:
+            purge = Purge(ctx.channel, **options)
+            await purge.run(lambda purge: progress.edit(content=str(purge)))
+            await progress.edit(content=f"{purge.deleted} Messages? Wiped out their existence.", delete_after=3)
+        else:
+            purge = MultiPurge(channels, concurrency=self.purge_concurrency, **options)
+            await purge.run(lambda purge: progress.edit(content=str(purge)))
+            await progress.edit(content=purge.summary())
 
 
 def setup(bot):
@@ -3,15 +3,24 @@ from discord.ext import commands
 
 import textwrap
 
-import wikipedia
-import googletrans
+import config
+from utils.cache import normalize
+from utils.maths import MathError, canonical, solve
+from utils.translate import LANGUAGES, Translator
+from utils.wiki import WikiClient
+
 
 class Utilities(commands.Cog):
     """Utility commands."""
 
     def __init__(self, bot):
         self.bot = bot
-        self.translator = googletrans.Translator()
+        self.translator = Translator(bot.http_client, bot.response_cache)
+        self.wiki = WikiClient(bot.http_client)
+        bot.metrics.collectors.append(self.translator.metrics)
+
+    def cog_unload(self):
+        self.bot.metrics.collectors.remove(self.translator.metrics)
 
     @commands.command(name='wikipedia', aliases=['wiki'])
     async def wikisummary(self, ctx, *, topic):
@@ -22,21 +31,21 @@ class Utilities(commands.Cog):
         em.set_footer(text=f"Requested by {ctx.author}", icon_url=ctx.author.avatar_url)
 
         try:
-            page = await self.bot.loop.run_in_executor(None, wikipedia.page, topic)
-        except wikipedia.DisambiguationError as e:
-            em.title = "Disambiguation"
-            em.description = "\n".join(e.options[:5])
-            return await ctx.send(embed=em)
+            page = await self.bot.response_cache.get('wikipedia', normalize(topic), lambda: self.wiki.lookup(topic))
         except Exception as e:
             return await ctx.send(e)
 
-        placeholder = f"... [Continue]({page.url})"
-        summary = textwrap.shorten(page.summary, width=1024, placeholder=placeholder)
-        images = list(filter(lambda i: i.endswith((".jpg", ".JPG", ".png", ".PNG")), page.images))
-        em.title, em.url = page.title, page.url
+        if 'options' in page:
+            em.title = "Disambiguation"
+            em.description = "\n".join(page['options'][:5])
+            return await ctx.send(embed=em)
+
+        placeholder = f"... [Continue]({page['url']})"
+        summary = textwrap.shorten(page['summary'], width=1024, placeholder=placeholder)
+        em.title, em.url = page['title'], page['url']
         em.add_field(name="Summary", value=summary)
-        if images:
-            em.set_thumbnail(url=images[0])
+        if page['image']:
+            em.set_thumbnail(url=page['image'])
         await ctx.send(embed=em)
 
     async def _generate_translated_embed(self, ctx, translated):
@@ -48,8 +57,8 @@ class Utilities(commands.Cog):
         e.set_author(name="Translator", icon_url=icon_url)
         e.set_footer(text=f"Requested by {ctx.author}", icon_url=ctx.author.avatar_url)
 
-        src = googletrans.LANGUAGES.get(translated.src, 'Auto-Detected').title()
-        dest = googletrans.LANGUAGES.get(translated.dest, 'English').title()
+        src = LANGUAGES.get(translated.src, 'Auto-Detected').title()
+        dest = LANGUAGES.get(translated.dest, 'English').title()
         e.add_field(name=f"From {src}", value=translated.origin)
         e.add_field(name=f"To {dest}", value=translated.text)
 
@@ -59,7 +68,7 @@ class Utilities(commands.Cog):
     async def translate(self, ctx, *, text: commands.clean_content):
         """Auto-detects and translates the provided text to English."""
         try:
-            translated = await self.bot.loop.run_in_executor(None, self.translator.translate, text)
+            translated = await self.translator.translate(text, 'en')
         except Exception as e:
             return await ctx.send(e)
 
@@ -70,7 +79,7 @@ class Utilities(commands.Cog):
     async def translateto(self, ctx, dest, *, text):
         """Auto-detects and translates the provided text to another Language."""
         try:
-            translated = await self.bot.loop.run_in_executor(None, self.translator.translate, text, dest)
+            translated = await self.translator.translate(text, dest)
         except ValueError:
             return await ctx.send("Not a valid destination language.")
         except Exception as e:
@@ -85,18 +94,27 @@ class Utilities(commands.Cog):
         pass
 
     async def _math_calculate(self, ctx, operation, expression):
-        url = f"https://newton.now.sh/api/v2/{operation}/{expression}"
-        async with ctx.session.get(url) as resp:
-            if resp.status == 200:
-                respjs = await resp.json()
-                e = discord.Embed(
-                    title=f'{operation.title()} `{expression}`',
-                    description=f"```{respjs['result']}```",
-                    colour=discord.Colour.blurple(),
-                )
-                e.set_footer(text=f"Requested by {ctx.author}")
-                return await ctx.send(embed=e)
-            return await ctx.send("Unable to perform calculation.")
+        try:
+            expression = canonical(expression)
+        except MathError as e:
+            return await ctx.send(e)
+
+        # solved in the cpu process pool, under limits so that no expression can hog a worker
+        limits = getattr(config, 'math_cpu_seconds', 2.0), getattr(config, 'math_memory', 256 * 2**20)
+        ok, result = await self.bot.response_cache.get(
+            'math', (operation, expression),
+            lambda: self.bot.executors.run('cpu', solve, operation, expression, *limits)
+        )
+        if not ok:
+            return await ctx.send(result)
+
+        e = discord.Embed(
+            title=f'{operation.title()} `{expression}`',
+            description=f"```{textwrap.shorten(result, width=2000, placeholder=' ...')}```",
+            colour=discord.Colour.blurple(),
+        )
+        e.set_footer(text=f"Requested by {ctx.author}")
+        await ctx.send(embed=e)
 
     @_math.command(name='factor')
     async def _math_factor(self, ctx, *, expression):
@@ -118,6 +136,16 @@ class Utilities(commands.Cog):
         """Calculates the values for which an expression yields zero."""
         await self._math_calculate(ctx, 'zeroes', expression)
 
+    @_math.command(name='simplify')
+    async def _math_simplify(self, ctx, *, expression):
+        """Simplifies an expression."""
+        await self._math_calculate(ctx, 'simplify', expression)
+
+    @_math.command(name='evaluate', aliases=['eval'])
+    async def _math_evaluate(self, ctx, *, expression):
+        """Calculates the numeric value of an expression without variables."""
+        await self._math_calculate(ctx, 'evaluate', expression)
+
 
 def setup(bot):
     bot.add_cog(Utilities(bot))
@@ -1,4 +1,6 @@
 import asyncio
+import time
+
 import config
 
 
@@ -9,6 +11,31 @@ async def sql_setup():
         """CREATE TABLE IF NOT EXISTS cog_config(
             id serial NOT NULL PRIMARY KEY, name text NOT NULL UNIQUE, data jsonb NOT NULL
         );""",
+        """CREATE TABLE IF NOT EXISTS guild_prefixes(
+            guild_id bigint NOT NULL PRIMARY KEY, prefixes text[] NOT NULL
+        );""",
+        # bot processes cache the prefixes and LISTEN on this channel for changes
+        """CREATE OR REPLACE FUNCTION notify_guild_prefixes() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('guild_prefixes', OLD.guild_id::text);
+            ELSE
+                PERFORM pg_notify('guild_prefixes', NEW.guild_id::text);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;""",
+        """DROP TRIGGER IF EXISTS guild_prefixes_notify ON guild_prefixes;""",
+        """CREATE TRIGGER guild_prefixes_notify AFTER INSERT OR UPDATE OR DELETE ON guild_prefixes
+            FOR EACH ROW EXECUTE PROCEDURE notify_guild_prefixes();""",
+        # bulk member actions, pending is what's left as of the job's last checkpoint
+        """CREATE TABLE IF NOT EXISTS bulk_jobs(
+            id serial NOT NULL PRIMARY KEY, guild_id bigint NOT NULL, channel_id bigint NOT NULL,
+            message_id bigint NOT NULL, author_id bigint NOT NULL, action text NOT NULL, payload jsonb NOT NULL,
+            label text NOT NULL, pending bigint[] NOT NULL, total integer NOT NULL,
+            done integer NOT NULL DEFAULT 0, failed integer NOT NULL DEFAULT 0, finished boolean NOT NULL DEFAULT false
+        );""",
+        """CREATE INDEX IF NOT EXISTS bulk_jobs_unfinished ON bulk_jobs (guild_id) WHERE NOT finished;""",
     ]
     conn = await asyncpg.connect(config.postgresql)
     async with conn.transaction():
@@ -18,17 +45,101 @@ async def sql_setup():
             print(await conn.execute(schema))
 
 
+async def fetch_shard_count():
+    """Discord's recommended shard count for the bot."""
+    import aiohttp
+
+    headers = {'Authorization': f'Bot {config.token}'}
+    async with aiohttp.ClientSession() as session:
+        async with session.get('https://discord.com/api/v8/gateway/bot', headers=headers) as resp:
+            resp.raise_for_status()
+            return (await resp.json())['shards']
+
+
+def shard_ranges(shard_count, clusters):
+    """Splits shard ids into ``clusters`` contiguous ranges of (almost) equal size."""
+    size, extra = divmod(shard_count, clusters)
+    ranges, start = [], 0
+    for cluster_id in range(clusters):
+        end = start + size + (cluster_id < extra)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def _run_cluster(cluster_id, shard_ids, shard_count, ipc_port):
+    import bot
+
+    bot.run(cluster_id=cluster_id, shard_ids=shard_ids, shard_count=shard_count, ipc_port=ipc_port)
+
+
+async def run_cluster(clusters, shard_count=None, health_interval=30.0):
+    """Runs the bot in ``clusters`` processes and restarts any that die."""
+    import multiprocessing
+    from utils.ipc import IPCServer
+
+    shard_count = max(shard_count or await fetch_shard_count(), clusters)
+    assignments = shard_ranges(shard_count, clusters)
+    server = await IPCServer().start()
+    mp = multiprocessing.get_context('spawn')  # a fresh interpreter and event loop per cluster
+    processes = {}
+
+    def launch(cluster_id):
+        process = mp.Process(
+            target=_run_cluster, name=f'sneakyninja-cluster-{cluster_id}',
+            args=(cluster_id, assignments[cluster_id], shard_count, server.port)
+        )
+        process.start()
+        processes[cluster_id] = process
+        print(f"cluster {cluster_id}: pid {process.pid}, shards {assignments[cluster_id]}")
+
+    try:
+        for cluster_id in range(clusters):
+            launch(cluster_id)
+            # one IDENTIFY per 5 seconds, so don't let the clusters' shards race each other
+            await asyncio.sleep(5.0 * len(assignments[cluster_id]))
+
+        while True:
+            await asyncio.sleep(health_interval)
+            now = time.monotonic()
+            for cluster_id, process in processes.items():
+                state = server.clusters.get(cluster_id)
+                if not process.is_alive():
+                    print(f"cluster {cluster_id}: exited with code {process.exitcode}, restarting")
+                    server.clusters.pop(cluster_id, None)
+                    launch(cluster_id)
+                elif state is None:
+                    print(f"cluster {cluster_id}: starting")
+                else:
+                    stats = state['stats']
+                    print(
+                        f"cluster {cluster_id}: pid {state['pid']}, last heartbeat {now - state['last_seen']:.0f}s ago, "
+                        f"guilds {stats['guilds']}, latency {stats['latency'] * 1000:.0f}ms"
+                    )
+            print(f"total: {server.totals()}")
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join()
+        await server.close()
+
+
 if __name__ == '__main__':
     import argparse
 
     parser = argparse.ArgumentParser(description='Utility commands for sneakyninja management.')
     parser.add_argument('--setup-db', action='store_true', help='Setup SQL tables')
+    parser.add_argument('--cluster', type=int, metavar='N', help='Run the bot in N sharded processes')
+    parser.add_argument('--shards', type=int, metavar='M', help='Total shard count for --cluster (default: recommended)')
 
     args = parser.parse_args()
     # asyncio.run => 'RuntimeError: Event loop is closed'
     async_run = asyncio.get_event_loop().run_until_complete
-    
+
     if args.setup_db:
         async_run(sql_setup())
+    elif args.cluster:
+        async_run(run_cluster(args.cluster, args.shards))
     else:
-        parser.print_help()
\ No newline at end of file
+        parser.print_help()
@@ -0,0 +1,45 @@
+import asyncio
+import os
+import sys
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+try:
+    import config  # noqa: F401
+except ImportError:
+    # just enough of a config for the bot to be constructed, it never logs in
+    config = types.ModuleType('config')
+    config.token = 'token'
+    config.owner_ids = {1}
+    config.prefix = '!'
+    config.postgresql = 'postgresql://localhost/sneakyninja'
+    config.webhook_url = 'https://discord.com/api/webhooks/123456789012345678/' + 'a' * 68
+    sys.modules['config'] = config
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def bot(loop):
+    from bot import SneakyNinja
+
+    bot = SneakyNinja()
+    # cancelled before the loop first runs them, the prefetch buffers would call the real upstreams
+    for buffer in bot.get_cog('Fun').buffers.values():
+        buffer.stop()
+    yield bot
+    # stops the cogs' background fetches
+    for extension in list(bot.extensions):
+        bot.unload_extension(extension)
+    loop.run_until_complete(bot.http_client.close())
+    loop.run_until_complete(asyncio.sleep(0.01))
@@ -0,0 +1,54 @@
+import sys
+from types import SimpleNamespace
+
+import pytest
+from discord.ext import commands
+
+from utils.extensions import LazyExtension
+
+EXTENSION = '''
+from discord.ext import commands
+
+calls = []
+
+
+class Lazy(commands.Cog):
+    @commands.command()
+    async def echo(self, ctx, word):
+        calls.append(word)
+
+
+def setup(bot):
+    bot.add_cog(Lazy())
+'''
+
+
+def test_lazy_extension_runs_the_real_command_once(bot, loop, tmp_path, monkeypatch):
+    tmp_path.joinpath('lazy_echo.py').write_text(EXTENSION)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    LazyExtension(bot, 'lazy_echo').install()
+    stub = bot.get_command('echo')
+
+    bot._connection.user = SimpleNamespace(id=1)
+    author = SimpleNamespace(id=2, bot=False)
+    message = SimpleNamespace(content='!echo hello', author=author, guild=None, _state=bot._connection)
+    loop.run_until_complete(bot.invoke(loop.run_until_complete(bot.get_context(message))))
+
+    assert bot.get_command('echo') is not stub
+    assert sys.modules['lazy_echo'].calls == ['hello']
+    assert bot.metrics.commands['echo'].invocations == 1
+    # one of the global cooldown's five uses
+    assert bot._global_cooldown._buckets[bot._global_cooldown.member_key(message)].tokens == 4
+
+
+def test_lazy_extension_keeps_its_stubs_when_loading_fails(bot, loop, tmp_path, monkeypatch):
+    tmp_path.joinpath('lazy_broken.py').write_text(EXTENSION.replace('bot.add_cog(Lazy())', 'raise RuntimeError'))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    lazy = LazyExtension(bot, 'lazy_broken')
+    lazy.install()
+    stub = bot.get_command('echo')
+
+    for _ in range(2):
+        with pytest.raises(commands.ExtensionFailed):
+            loop.run_until_complete(lazy._load_and_invoke(SimpleNamespace(message=None)))
+        assert bot.get_command('echo') is stub
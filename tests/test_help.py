@@ -0,0 +1,14 @@
+def test_hidden_commands_render_on_demand(bot):
+    index = bot.help_index
+    command = bot.get_command('reload')
+    assert command.hidden and 'reload' not in index.commands
+
+    payload, usage = index.render(command)
+    assert payload['title'] == 'reload'
+    assert usage.startswith('reload')
+
+
+def test_visible_commands_render_like_the_index(bot):
+    index = bot.help_index
+    command = bot.get_command('roles')
+    assert index.render(command)[0] == index.commands['roles']
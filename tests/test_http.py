@@ -0,0 +1,30 @@
+import asyncio
+
+from utils.http import UpstreamError
+
+
+def test_hedged_fetch_prefers_a_success_finishing_with_a_failure(bot, loop):
+    client = bot.http_client
+    url = 'https://example.com/random'
+    latency = client.upstream(url).latency
+    for _ in range(client.HEDGE_MIN_SAMPLES):
+        latency.observe(0.001)
+
+    async def run():
+        # the hedge starts the second attempt, then both finish in the same loop iteration
+        started = asyncio.Event()
+        attempts = []
+
+        async def request(upstream, method, url, read, kwargs):
+            attempts.append(None)
+            if len(attempts) == 2:
+                started.set()
+                return 'data'
+            await started.wait()
+            raise UpstreamError(upstream.host, OSError())
+
+        client._request = request
+        return await client.fetch('GET', url, hedge=True)
+
+    for _ in range(20):
+        assert loop.run_until_complete(run()) == 'data'
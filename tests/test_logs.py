@@ -0,0 +1,40 @@
+import io
+import logging
+import logging.handlers
+import queue
+import threading
+
+from utils.logs import DroppingQueueHandler
+
+
+def test_records_are_formatted_by_the_listener_thread():
+    threads = []
+
+    class Argument:
+        def __str__(self):
+            threads.append(threading.current_thread())
+            return 'formatted'
+
+    stream = io.StringIO()
+    handler = DroppingQueueHandler(queue.Queue(10))
+    listener = logging.handlers.QueueListener(handler.queue, logging.StreamHandler(stream))
+    logger = logging.getLogger('test_logs')
+    logger.propagate = False
+    logger.addHandler(handler)
+    listener.start()
+    try:
+        logger.warning('%s record', Argument())
+    finally:
+        listener.stop()
+        logger.removeHandler(handler)
+
+    assert stream.getvalue() == 'formatted record\n'
+    assert len(threads) == 1 and threads[0] is not threading.current_thread()
+
+
+def test_records_are_dropped_when_the_queue_is_full():
+    handler = DroppingQueueHandler(queue.Queue(1))
+    for _ in range(3):
+        handler.handle(logging.makeLogRecord({'msg': 'hello'}))
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 2
@@ -0,0 +1,18 @@
+import pytest
+
+from utils.maths import MathError, canonical, solve
+
+
+@pytest.mark.parametrize('expression', ['x.__class__', 'Integer.func', 'e.n', 'x.y', 'sin(x).func', '2.5.n', '1..2'])
+def test_attribute_access_is_rejected(expression):
+    with pytest.raises(MathError):
+        canonical(expression)
+
+
+@pytest.mark.parametrize('expression, result', [('2.5x', '2.5*x'), ('.5 + x', 'x + 0.5'), ('3. * x', '3.0*x')])
+def test_decimals_are_allowed(expression, result):
+    assert solve('simplify', canonical(expression)) == (True, result)
+
+
+def test_names_split_into_functions_and_variables():
+    assert canonical('2xe^sinx') == '2x e^sin x'
@@ -0,0 +1,17 @@
+from utils.prefetch import PrefetchBuffer, metrics
+
+
+async def _fetch():
+    return None
+
+
+def test_metrics_types_each_metric_once_before_its_series():
+    typed = []
+    for line in metrics([PrefetchBuffer('cats', _fetch), PrefetchBuffer('facts', _fetch)]):
+        if line.startswith('# TYPE'):
+            typed.append(line.split()[2])
+        else:
+            # histogram series are the family's name with a _bucket, _sum or _count suffix
+            assert line.split('{')[0].startswith(typed[-1])
+
+    assert len(typed) == len(set(typed)) == 4
@@ -0,0 +1,72 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from utils.purge import MultiPurge, Purge, bulk_cutoff
+
+
+class _History:
+    def __init__(self, ids, limit):
+        self.ids = ids[:limit]
+
+    async def next(self):
+        if not self.ids:
+            raise discord.NoMoreItems()
+        return _Message(self.ids.pop(0))
+
+
+class _Message:
+    def __init__(self, id):
+        self.id = id
+
+    async def delete(self):
+        deleted.append(self.id)
+
+
+class _Channel:
+    def __init__(self, recent, old):
+        cutoff = bulk_cutoff()
+        # newest first, like the messages endpoint
+        self.ids = [cutoff + (10**6 << 22) + i for i in range(recent, 0, -1)]
+        self.ids += [cutoff - (10**6 << 22) - i for i in range(old)]
+
+    def history(self, limit, before=None, oldest_first=False):
+        return _History([id for id in self.ids if before is None or id < before.id], limit)
+
+    async def delete_messages(self, messages):
+        deleted.extend(message.id for message in messages)
+
+
+deleted = []
+
+
+def purge(channel, limit):
+    deleted.clear()
+    asyncio.run(Purge(channel, limit=limit, linger=0.01).run())
+    return sorted(deleted, reverse=True)
+
+
+def test_small_purge_stays_on_the_newest_messages():
+    channel = _Channel(500, 500)
+    assert purge(channel, 50) == channel.ids[:50]
+
+
+def test_purge_searches_the_newest_messages_across_the_cutoff():
+    channel = _Channel(3000, 3000)
+    assert purge(channel, 1000) == channel.ids[:1000]
+    assert purge(channel, 3500) == channel.ids[:3500]
+    assert purge(channel, 7000) == channel.ids
+
+
+def test_summary_counts_channels_with_nothing_to_purge():
+    channels = [_Channel(0, 0) for _ in range(3)]
+    for index, channel in enumerate(channels):
+        channel.mention = f'#{index}'
+    multi = MultiPurge(channels, limit=10)
+    multi.purges[0].matched = multi.purges[0].deleted = 5
+    # a channel that failed after matching is neither purged nor untouched
+    multi.purges[1].matched = 2
+    multi.errors[channels[1]] = SimpleNamespace(text='Missing Access', status=403)
+    assert multi.summary().splitlines()[1:] == ['#1: failed, Missing Access', '#0: 5 deleted, 0 scanned',
+                                                '1 channels had nothing to purge.']
@@ -0,0 +1,30 @@
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from utils.reloader import ReloadError
+
+
+def test_reloading_context_changes_context_class(bot, loop):
+    bot._connection.user = SimpleNamespace(id=1)
+    message = SimpleNamespace(content='hello', author=SimpleNamespace(id=2), guild=None, _state=bot._connection)
+
+    before = loop.run_until_complete(bot.get_context(message))
+    bot.reloader.reload(['utils.context'])
+    after = loop.run_until_complete(bot.get_context(message))
+
+    assert type(after) is not type(before)
+    assert type(after) is sys.modules['utils.context'].Context
+
+
+def test_reload_refuses_modules_the_bot_holds_instances_of(bot):
+    import utils.http
+    error_class = utils.http.UpstreamError
+
+    with pytest.raises(ReloadError) as info:
+        bot.reloader.reload(['utils.http'])
+
+    assert info.value.module == 'utils.http'
+    assert utils.http.UpstreamError is error_class
+    assert 'utils.context' not in bot.reloader.pinned()
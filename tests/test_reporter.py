@@ -0,0 +1,30 @@
+import json
+import os
+
+import utils.reporter
+from utils.reporter import ErrorReporter
+
+
+def _first_command():
+    try:
+        json.loads('{')
+    except ValueError as e:
+        return e
+
+
+def _second_command():
+    try:
+        json.loads('{')
+    except ValueError as e:
+        return e
+
+
+def test_library_errors_are_fingerprinted_by_the_calling_code(monkeypatch):
+    # both raise at the same line of json, this file stands in for the bot's code
+    monkeypatch.setattr(utils.reporter, 'OWN_CODE', (os.path.abspath(__file__),))
+    assert ErrorReporter.fingerprint(_first_command()) == ErrorReporter.fingerprint(_first_command())
+    assert ErrorReporter.fingerprint(_first_command()) != ErrorReporter.fingerprint(_second_command())
+
+
+def test_errors_outside_the_bot_fall_back_to_the_last_frame():
+    assert ErrorReporter.fingerprint(_first_command()) == ErrorReporter.fingerprint(_second_command())
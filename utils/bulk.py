@@ -0,0 +1,170 @@
+"""Bulk member actions, persisted in Postgres so jobs a restart interrupts resume."""
+
+import asyncio
+import logging
+from collections import deque
+
+import discord
+from discord.ext import commands
+
+from utils.metrics import format_labels
+
+log = logging.getLogger(__name__)
+
+# Table Schema
+# ------------
+# bulk_jobs(id serial PRIMARY KEY, guild_id, channel_id, message_id, author_id, action text,
+#           payload jsonb, label text, pending bigint[], total, done, failed, finished boolean),
+# pending being the members not edited as of the last checkpoint (see manage.py)
+
+
+async def _voice(http, guild_id, member_id, payload, reason):
+    await http.edit_member(guild_id, member_id, reason=reason, **payload)
+
+
+async def _role_add(http, guild_id, member_id, payload, reason):
+    await http.add_role(guild_id, member_id, payload['role_id'], reason=reason)
+
+
+async def _role_remove(http, guild_id, member_id, payload, reason):
+    await http.remove_role(guild_id, member_id, payload['role_id'], reason=reason)
+
+
+# every action has to be safe to repeat, a resumed job redoes what its last checkpoint missed
+ACTIONS = {'voice': _voice, 'role_add': _role_add, 'role_remove': _role_remove}
+
+
+class Job:
+    __slots__ = (
+        'id', 'guild_id', 'channel_id', 'message_id', 'author_id', 'action', 'payload', 'label',
+        'pending', 'total', 'done', 'failed', 'finished',
+    )
+
+    def __init__(self, record):
+        for name in self.__slots__:
+            setattr(self, name, record[name])
+        self.pending = list(self.pending)
+
+    def __str__(self):
+        text = f"{self.label}: {self.done}/{self.total}"
+        if self.failed:
+            text += f", {self.failed} failed"
+        return text + ('.' if self.finished else '...')
+
+
+class BulkJobs:
+    """Runs bulk member actions with at most ``workers`` member edits in flight, over every job.
+
+    A job's progress is saved and shown in its message every ``checkpoint`` seconds, and
+    jobs a restart interrupted resume through :meth:`resume`. Edits are made with the
+    member's ID, so uncached members cost no fetch. discord.py serializes a guild's edits
+    on their rate limit bucket; the workers keep that bucket busy and let jobs of
+    several guilds run side by side.
+    """
+
+    def __init__(self, bot, *, workers=8, checkpoint=5.0):
+        self.bot = bot
+        self.workers = workers
+        self.checkpoint = checkpoint
+        self.edits = dict.fromkeys(('done', 'failed'), 0)
+        self._slots = asyncio.Semaphore(workers)
+        self._jobs = {}  # id: (job, task)
+
+    async def submit(self, ctx, action, payload, member_ids, label):
+        """Starts ``action`` on the members of ``member_ids``, reporting in ``ctx``'s channel."""
+        member_ids = list(dict.fromkeys(member_ids))
+        if not member_ids:
+            raise commands.BadArgument("No members to do that to.")
+        message = await ctx.send(f"{label}: 0/{len(member_ids)}...")
+        record = await self.bot.pool.fetchrow(
+            """INSERT INTO bulk_jobs(guild_id, channel_id, message_id, author_id, action, payload, label, pending, total)
+            VALUES($1, $2, $3, $4, $5, $6, $7, $8, $9) RETURNING *""",
+            ctx.guild.id, ctx.channel.id, message.id, ctx.author.id, action, payload, label, member_ids, len(member_ids)
+        )
+        return self._start(Job(record))
+
+    async def resume(self):
+        """Restarts the unfinished jobs of this process's guilds."""
+        records = await self.bot.pool.fetch(
+            """SELECT * FROM bulk_jobs WHERE NOT finished AND guild_id = ANY($1::bigint[])""",
+            [guild.id for guild in self.bot.guilds]
+        )
+        for record in records:
+            if record['id'] not in self._jobs:
+                job = self._start(Job(record))
+                log.info('Resuming bulk job %d, %d of %d members left', job.id, len(job.pending), job.total)
+
+    def stop(self):
+        for _, task in self._jobs.values():
+            task.cancel()
+
+    def _start(self, job):
+        task = asyncio.ensure_future(self._run(job))
+        self._jobs[job.id] = (job, task)
+        task.add_done_callback(lambda _: self._jobs.pop(job.id, None))
+        return job
+
+    async def _run(self, job):
+        action = ACTIONS[job.action]
+        http = self.bot.http
+        reason = f"Bulk job {job.id}, requested by {job.author_id}"
+        queue = deque(job.pending)
+        remaining = set(job.pending)  # in flight ones too, for the checkpoints
+
+        async def worker():
+            while queue:
+                member_id = queue.popleft()
+                async with self._slots:
+                    try:
+                        await action(http, job.guild_id, member_id, job.payload, reason)
+                    except discord.HTTPException as e:
+                        # left the guild, out of voice, above the bot...
+                        log.debug('Bulk job %d failed on member %d: %s', job.id, member_id, e)
+                        job.failed += 1
+                        self.edits['failed'] += 1
+                    else:
+                        job.done += 1
+                        self.edits['done'] += 1
+                remaining.discard(member_id)
+
+        checkpoints = asyncio.ensure_future(self._checkpoints(job, remaining))
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.workers, len(queue)))))
+        finally:
+            checkpoints.cancel()
+
+        job.pending = []
+        await self.bot.pool.execute(
+            """UPDATE bulk_jobs SET pending='{}', done=$2, failed=$3, finished=true WHERE id=$1""",
+            job.id, job.done, job.failed
+        )
+        job.finished = True
+        await self._report(job)
+
+    async def _checkpoints(self, job, remaining):
+        while True:
+            await asyncio.sleep(self.checkpoint)
+            try:
+                await self.bot.pool.execute(
+                    """UPDATE bulk_jobs SET pending=$2, done=$3, failed=$4 WHERE id=$1""",
+                    job.id, list(remaining), job.done, job.failed
+                )
+            except Exception:
+                log.warning('Checkpointing bulk job %d failed', job.id, exc_info=True)
+            await self._report(job)
+
+    async def _report(self, job):
+        channel = self.bot.get_channel(job.channel_id)
+        if channel is None:
+            return
+        try:
+            await channel.get_partial_message(job.message_id).edit(content=str(job))
+        except discord.HTTPException:
+            pass
+
+    def metrics(self):
+        yield '# TYPE sneakyninja_bulk_jobs_running gauge'
+        yield f'sneakyninja_bulk_jobs_running {len(self._jobs)}'
+        yield '# TYPE sneakyninja_bulk_edits_total counter'
+        for result, count in self.edits.items():
+            yield f'sneakyninja_bulk_edits_total{format_labels(result=result)} {count}'
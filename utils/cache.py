@@ -0,0 +1,128 @@
+"""Response cache for commands backed by external APIs."""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from utils.metrics import format_labels
+
+log = logging.getLogger(__name__)
+
+
+def normalize(text):
+    """Cache key form of free text: casefolded, with whitespace collapsed."""
+    return ' '.join(text.casefold().split())
+
+
+class _Entry:
+    __slots__ = ('value', 'fresh_until', 'stale_until')
+
+    def __init__(self, value, fresh_until, stale_until):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class CacheStats:
+    __slots__ = ('hits', 'stale_hits', 'misses')
+
+    def __init__(self):
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+
+class ResponseCache:
+    """Size bounded LRU cache with per-namespace TTLs and stale-while-revalidate.
+
+    Every namespace (usually a command) has a ``(ttl, stale)`` pair: an entry is served
+    as is for ``ttl`` seconds, then for ``stale`` more seconds it's still served at once
+    while a background task refreshes it. Concurrent misses on a key share one fetch.
+    """
+
+    DEFAULT_TTL = (300.0, 3600.0)
+
+    def __init__(self, max_size=2048, ttls=None):
+        self.max_size = max_size
+        self.ttls = ttls or {}
+        self.stats = {}
+        self._entries = OrderedDict()
+        self._inflight = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _stats(self, namespace):
+        stats = self.stats.get(namespace)
+        if stats is None:
+            stats = self.stats[namespace] = CacheStats()
+        return stats
+
+    async def get(self, namespace, key, fetch):
+        """Cached value of ``(namespace, key)``, awaiting ``fetch()`` on a miss.
+
+        ``fetch`` returning None means there's nothing to cache, e.g. an upstream error status.
+        """
+        stats = self._stats(namespace)
+        full_key = (namespace, key)
+        entry = self._entries.get(full_key)
+        if entry is not None:
+            now = time.monotonic()
+            if now < entry.fresh_until:
+                self._entries.move_to_end(full_key)
+                stats.hits += 1
+                return entry.value
+            if now < entry.stale_until:
+                self._entries.move_to_end(full_key)
+                stats.stale_hits += 1
+                if full_key not in self._inflight:
+                    task = self._inflight[full_key] = asyncio.ensure_future(self._refresh(full_key, fetch))
+                    task.add_done_callback(self._log_refresh_error)
+                return entry.value
+
+        stats.misses += 1
+        task = self._inflight.get(full_key)
+        if task is None:
+            task = self._inflight[full_key] = asyncio.ensure_future(self._refresh(full_key, fetch))
+        # shielded, so one cancelled waiter doesn't cancel the fetch for everyone else
+        return await asyncio.shield(task)
+
+    async def _refresh(self, full_key, fetch):
+        try:
+            value = await fetch()
+            if value is not None:
+                ttl, stale = self.ttls.get(full_key[0], self.DEFAULT_TTL)
+                now = time.monotonic()
+                self._entries[full_key] = _Entry(value, now + ttl, now + ttl + stale)
+                self._entries.move_to_end(full_key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+            return value
+        finally:
+            self._inflight.pop(full_key, None)
+
+    @staticmethod
+    def _log_refresh_error(task):
+        if not task.cancelled() and task.exception() is not None:
+            log.warning('Background cache refresh failed: %r', task.exception())
+
+    def flush(self, namespace=None):
+        """Drops every entry, or only a namespace's. Returns the dropped count."""
+        if namespace is None:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+        keys = [key for key in self._entries if key[0] == namespace]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def metrics(self):
+        yield '# TYPE sneakyninja_cache_entries gauge'
+        yield f'sneakyninja_cache_entries {len(self._entries)}'
+        yield '# TYPE sneakyninja_cache_requests_total counter'
+        for namespace, stats in self.stats.items():
+            for result in CacheStats.__slots__:
+                labels = format_labels(namespace=namespace, result=result)
+                yield f'sneakyninja_cache_requests_total{labels} {getattr(stats, result)}'
@@ -5,8 +5,13 @@ class Context(commands.Context):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.session = self.bot.session
+        self.http_client = self.bot.http_client
         self.tformat = self.bot.time_format
 
+        # timings recorded by the bot for its metrics
+        self.parsed_in = 0.0
+        self.checked_at = None
+
     def timenow(self):
         return self.bot.timenow()
 
@@ -1,8 +1,11 @@
-import argparse, shlex
+import argparse, re, shlex
 
 import discord
 from discord.ext import commands
 
+from utils.matching import contains_any
+
+
 class MemberOrFetchedUser(commands.Converter):
     async def convert(self, ctx, argument):
         """Converts to discord.Member. Tries to fetch the user if conversion fails."""
@@ -17,6 +20,33 @@ class MemberOrFetchedUser(commands.Converter):
                 raise commands.BadArgument("This user doesn't exist.") from None
 
 
+class MemberFilter(commands.Converter):
+    async def convert(self, ctx, argument):
+        """Converts to a member predicate: all, humans, bots, a role's members or a voice or stage channel's."""
+        keyword = argument.lower()
+        if keyword in ('all', 'everyone'):
+            return lambda member: True
+        if keyword == 'humans':
+            return lambda member: not member.bot
+        if keyword == 'bots':
+            return lambda member: member.bot
+
+        try:
+            role = await commands.RoleConverter().convert(ctx, argument)
+        except commands.RoleNotFound:
+            pass
+        else:
+            # Member.roles builds a sorted list on every access
+            return lambda member: member._roles.has(role.id)
+        for converter in (commands.VoiceChannelConverter, commands.StageChannelConverter):
+            try:
+                channel = await converter().convert(ctx, argument)
+            except commands.ChannelNotFound:
+                continue
+            return lambda member: member.voice is not None and member.voice.channel == channel
+        raise commands.BadArgument("Filter by all, humans, bots, a role, a voice or a stage channel.")
+
+
 class PyCodeBlock(commands.Converter):
     async def convert(self, ctx, argument):
         """Converts a python codeblock to normal python code structure."""
@@ -31,6 +61,14 @@ class Argument(argparse.ArgumentParser):
     def error(self, message):
         raise commands.BadArgument(message)
 
+def _can_purge(ctx, channel):
+    for member in (ctx.author, ctx.me):
+        permissions = channel.permissions_for(member)
+        if not (permissions.read_messages and permissions.read_message_history and permissions.manage_messages):
+            return False
+    return True
+
+
 class MessageFlagParser:
     """Flag parser for message related mod commands."""
 
@@ -59,6 +97,74 @@ class MessageFlagParser:
         parser.add_argument('-mo', '--mention-over', type=int)
         parser.add_argument('-r', '--regex')
         parser.add_argument('-ric', '--regex-ignorecase', action='store_true')
+        parser.add_argument('--before', type=int)
+        parser.add_argument('--after', type=int)
+        parser.add_argument('--channels', nargs='+')
+        parser.add_argument('--all-channels', action='store_true')
+
+    async def channels(self):
+        """The text channels of ``--channels`` or ``--all-channels``, None without either.
+
+        ``--all-channels`` leaves out channels the author or the bot can't purge,
+        ``--channels`` refuses them.
+        """
+        ctx = self.ctx
+        if self.args.all_channels:
+            channels = [channel for channel in ctx.guild.text_channels if _can_purge(ctx, channel)]
+            if not channels:
+                raise commands.BadArgument("No channel here I can purge.")
+            return channels
+        if not self.args.channels:
+            return None
+
+        channels = []
+        for argument in self.args.channels:
+            channel = await commands.TextChannelConverter().convert(ctx, argument)
+            if not _can_purge(ctx, channel):
+                raise commands.BadArgument(f"Can't purge {channel.mention}.")
+            if channel not in channels:
+                channels.append(channel)
+        return channels
+
+    async def compile(self):
+        """The flags as one message check, conditions ordered from the cheapest.
+
+        The check is a single generated expression, so a message costs no call per flag.
+        ``--before`` and ``--after`` bound the history searched, they aren't part of it.
+        """
+        args = self.args
+        namespace = {}
+        conditions = []
+        # plain attribute reads first
+        if args.bot:
+            conditions.append('m.author.bot')
+        if args.everyone:
+            conditions.append('m.mention_everyone')
+        if args.embed:
+            conditions.append('m.embeds')
+        if args.reaction_over is not None:
+            namespace['reaction_over'] = args.reaction_over
+            conditions.append('len(m.reactions) > reaction_over')
+        if args.user:
+            users = [await MemberOrFetchedUser().convert(self.ctx, user) for user in args.user]
+            namespace['user_ids'] = frozenset(user.id for user in users)
+            conditions.append('m.author.id in user_ids')
+        # then scans of the content, raw_mentions runs a regex over it
+        if args.mention_over is not None:
+            namespace['mention_over'] = args.mention_over
+            conditions.append('len(m.raw_mentions) > mention_over')
+        if args.contains:
+            namespace['contains'] = contains_any(args.contains)
+            conditions.append('contains(m.content)')
+        if args.regex:
+            try:
+                namespace['pattern'] = re.compile(args.regex, re.IGNORECASE if args.regex_ignorecase else 0)
+            except re.error as e:
+                raise commands.BadArgument(f"Invalid regex: {e}") from None
+            conditions.append('pattern.search(m.content)')
+
+        source = f"lambda m: bool({' and '.join(conditions) or 'True'})"
+        return eval(source, namespace)
 
 
 class EmbedFlagParser:
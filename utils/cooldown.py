@@ -0,0 +1,83 @@
+import time
+
+
+class _Bucket:
+    """A single fixed-window bucket, kept as small as possible."""
+
+    __slots__ = ('tokens', 'window')
+
+    def __init__(self, tokens, window):
+        self.tokens = tokens
+        self.window = window
+
+
+class CooldownStore:
+    """Rate limiter store used by the bot's global cooldown check.
+
+    Behaves like a ``commands.CooldownMapping`` with ``rate`` uses per ``per``
+    seconds, but buckets are keyed by plain integers and expired buckets are
+    evicted in a sweep every ``sweep_interval`` seconds instead of on every lookup.
+    """
+
+    def __init__(self, rate, per, *, sweep_interval=60.0, clock=time.monotonic):
+        self.rate = int(rate)
+        self.per = float(per)
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+        self._buckets = {}
+        self._last_sweep = clock()
+
+        # counters
+        self.evictions = 0
+        self.rejections = 0
+
+    def __len__(self):
+        return len(self._buckets)
+
+    @property
+    def bucket_count(self):
+        return len(self._buckets)
+
+    @staticmethod
+    def member_key(message):
+        """Key equivalent to ``commands.BucketType.member``."""
+        guild_id = message.guild.id if message.guild is not None else 0
+        # snowflakes fit in 64 bits, so packing both ids keeps the key a single int
+        return (guild_id << 64) | message.author.id
+
+    def update_rate_limit(self, key, current=None):
+        """Consumes a token from ``key``'s bucket.
+
+        Returns the seconds left until the bucket refills if it is exhausted, else None.
+        """
+        current = current or self._clock()
+        if current - self._last_sweep >= self.sweep_interval:
+            self.sweep(current)
+
+        bucket = self._buckets.get(key)
+        if bucket is None or current > bucket.window + self.per:
+            # new or expired window
+            self._buckets[key] = _Bucket(self.rate - 1, current)
+            return None
+
+        if bucket.tokens == 0:
+            self.rejections += 1
+            return self.per - (current - bucket.window)
+
+        bucket.tokens -= 1
+        return None
+
+    def sweep(self, current=None):
+        """Evicts every bucket whose window has expired. Returns the evicted count."""
+        current = current or self._clock()
+        per = self.per
+        expired = [key for key, bucket in self._buckets.items() if current > bucket.window + per]
+        for key in expired:
+            del self._buckets[key]
+
+        self._last_sweep = current
+        self.evictions += len(expired)
+        return len(expired)
+
+    def stats(self):
+        return {'buckets': len(self._buckets), 'evictions': self.evictions, 'rejections': self.rejections}
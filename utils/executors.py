@@ -0,0 +1,144 @@
+"""Named, bounded executors for blocking and CPU bound work."""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from discord.ext import commands
+
+from utils.metrics import Histogram, format_labels
+
+
+class ExecutorBusy(commands.CommandError):
+    """An executor's queue is full."""
+
+    def __init__(self, name):
+        self.name = name
+        super().__init__("Sorry, I'm too busy for that right now, try again in a bit.")
+
+
+def _timed(func, *args, **kwargs):
+    # runs in the worker; CLOCK_MONOTONIC is system wide, so the times compare across processes
+    start = time.monotonic()
+    result = func(*args, **kwargs)
+    return start, time.monotonic(), result
+
+
+class BoundedExecutor:
+    """A thread or process pool of ``workers`` that admits at most ``queue`` more jobs than it can run.
+
+    When it's full a job waits up to ``timeout`` seconds for a slot (forever if None,
+    not at all if 0) before ExecutorBusy is raised.
+    """
+
+    def __init__(self, name, *, kind='thread', workers=4, queue=16, timeout=None):
+        if kind not in ('thread', 'process'):
+            raise ValueError(f'unknown executor kind {kind!r}')
+        self.name = name
+        self.kind = kind
+        self.workers = workers
+        self.queue = queue
+        self.timeout = timeout
+
+        self.inflight = 0
+        self.rejected = 0
+        self.wait_time = Histogram()
+        self.run_time = Histogram()
+        self._slots = asyncio.Semaphore(workers + queue)
+        self._executor = None
+
+    @property
+    def executor(self):
+        # created on first use, a process pool is costly to start
+        if self._executor is None:
+            if self.kind == 'process':
+                # spawned, forking would copy the whole bot into every worker
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix=f'{self.name}-executor')
+        return self._executor
+
+    @property
+    def depth(self):
+        """Jobs admitted but not yet running."""
+        return max(self.inflight - self.workers, 0)
+
+    async def _acquire(self):
+        if not self._slots.locked():
+            return await self._slots.acquire()
+        if self.timeout == 0:
+            self.rejected += 1
+            raise ExecutorBusy(self.name)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ExecutorBusy(self.name) from None
+
+    async def run(self, func, *args, **kwargs):
+        """Runs ``func(*args, **kwargs)`` in the pool and returns its result."""
+        await self._acquire()
+        self.inflight += 1
+        submitted = time.monotonic()
+        try:
+            call = functools.partial(_timed, func, *args, **kwargs)
+            start, end, result = await asyncio.get_event_loop().run_in_executor(self.executor, call)
+        finally:
+            self.inflight -= 1
+            self._slots.release()
+        self.wait_time.observe(start - submitted)
+        self.run_time.observe(end - start)
+        return result
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+class ExecutorRegistry:
+    """The bot's executors by name, configured from ``DEFAULTS`` overridden by ``config``."""
+
+    DEFAULTS = {
+        # blocking io, e.g. file writes and imports
+        'io': {'kind': 'thread', 'workers': 8, 'queue': 64, 'timeout': 10.0},
+        # cpu bound work, callables and arguments must be picklable
+        'cpu': {'kind': 'process', 'workers': os.cpu_count() or 2, 'queue': 16, 'timeout': 0},
+    }
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.executors = {
+            name: BoundedExecutor(name, **{**self.DEFAULTS.get(name, {}), **config.get(name, {})})
+            for name in {**self.DEFAULTS, **config}
+        }
+
+    def __getitem__(self, name):
+        return self.executors[name]
+
+    async def run(self, name, func, *args, **kwargs):
+        """Runs ``func`` in the executor called ``name``."""
+        return await self.executors[name].run(func, *args, **kwargs)
+
+    def shutdown(self):
+        for executor in self.executors.values():
+            executor.shutdown()
+
+    def metrics(self):
+        yield '# TYPE sneakyninja_executor_inflight gauge'
+        for name, executor in self.executors.items():
+            yield f'sneakyninja_executor_inflight{format_labels(executor=name)} {executor.inflight}'
+        yield '# TYPE sneakyninja_executor_queue_depth gauge'
+        for name, executor in self.executors.items():
+            yield f'sneakyninja_executor_queue_depth{format_labels(executor=name)} {executor.depth}'
+        yield '# TYPE sneakyninja_executor_rejected_total counter'
+        for name, executor in self.executors.items():
+            yield f'sneakyninja_executor_rejected_total{format_labels(executor=name)} {executor.rejected}'
+        yield '# TYPE sneakyninja_executor_wait_seconds histogram'
+        for name, executor in self.executors.items():
+            yield from executor.wait_time.render('sneakyninja_executor_wait_seconds', executor=name)
+        yield '# TYPE sneakyninja_executor_run_seconds histogram'
+        for name, executor in self.executors.items():
+            yield from executor.run_time.render('sneakyninja_executor_run_seconds', executor=name)
@@ -0,0 +1,141 @@
+"""Extension loading with startup timing, and lazily loaded extensions."""
+
+import ast
+import asyncio
+import importlib
+import importlib.util
+import time
+import tracemalloc
+
+from discord.ext import commands
+
+
+class LoadRecord:
+    """Timing and memory cost of loading one extension."""
+
+    __slots__ = ('name', 'import_time', 'setup_time', 'memory', 'lazy')
+
+    def __init__(self, name, import_time, setup_time, memory, lazy=False):
+        self.name = name
+        self.import_time = import_time
+        self.setup_time = setup_time
+        self.memory = memory
+        self.lazy = lazy
+
+
+def load_timed(bot, name, *, lazy=False):
+    """Loads an extension like ``bot.load_extension`` and returns its :class:`LoadRecord`."""
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    try:
+        start = time.perf_counter()
+        # importing first pulls in (and caches) the extension's dependencies, so
+        # what load_extension spends after that is mostly the cog's setup
+        importlib.import_module(name)
+        imported = time.perf_counter()
+        bot.load_extension(name)
+        done = time.perf_counter()
+        memory = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    return LoadRecord(name, imported - start, done - imported, memory, lazy)
+
+
+def format_report(records):
+    lines = [f"{'extension':<20}{'import':>10}{'setup':>10}{'memory':>12}"]
+    for record in records:
+        name = f"{record.name}{'*' if record.lazy else ''}"
+        lines.append(
+            f"{name:<20}{record.import_time * 1000:>8.1f}ms{record.setup_time * 1000:>8.1f}ms"
+            f"{record.memory / 1024:>10.0f}KB"
+        )
+    total = sum(r.import_time + r.setup_time for r in records)
+    lines.append(f"total: {total * 1000:.1f}ms (* loaded on first use)")
+    return '\n'.join(lines)
+
+
+def command_names(name):
+    """Top level command names and aliases of an extension, read from its source without importing it."""
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise commands.ExtensionNotFound(name)
+    with open(spec.origin, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), spec.origin)
+
+    names = []
+    for cls in (node for node in tree.body if isinstance(node, ast.ClassDef)):
+        for func in cls.body:
+            if not isinstance(func, ast.AsyncFunctionDef):
+                continue
+            for deco in func.decorator_list:
+                # only @commands.command(...)/@commands.group(...), subcommands load with their parent
+                if not (isinstance(deco, ast.Call) and isinstance(deco.func, ast.Attribute)):
+                    continue
+                target = deco.func
+                if not (isinstance(target.value, ast.Name) and target.value.id == 'commands'
+                        and target.attr in ('command', 'group')):
+                    continue
+                kwargs = {kw.arg: kw.value for kw in deco.keywords}
+                command_name = ast.literal_eval(kwargs['name']) if 'name' in kwargs else func.name
+                aliases = ast.literal_eval(kwargs['aliases']) if 'aliases' in kwargs else []
+                names.append((command_name, list(aliases)))
+    return names
+
+
+class LazyExtension:
+    """Registers stub commands for an extension and loads the real one on first use.
+
+    The extension's module (and everything heavy it imports) is imported in a thread,
+    then it's loaded and the invocation continues with the real command.
+    """
+
+    def __init__(self, bot, name):
+        self.bot = bot
+        self.name = name
+        self._lock = asyncio.Lock()
+        self._stubs = [
+            commands.Command(
+                self._load_and_invoke, name=command_name, aliases=aliases,
+                help=f"Part of {name}, loaded on first use."
+            )
+            for command_name, aliases in command_names(name)
+        ]
+
+    def install(self):
+        for stub in self._stubs:
+            self.bot.add_command(stub)
+
+    def uninstall(self):
+        for stub in self._stubs:
+            if self.bot.all_commands.get(stub.name) is stub:
+                self.bot.remove_command(stub.name)
+
+    async def _load_and_invoke(self, ctx, *, _=None):
+        async with self._lock:
+            if self.name not in self.bot.extensions:
+                start = time.perf_counter()
+                await self.bot.executors.run('io', importlib.import_module, self.name)
+                import_time = time.perf_counter() - start
+
+                self.uninstall()
+                try:
+                    record = load_timed(self.bot, self.name, lazy=True)
+                except Exception:
+                    # the stubs stay, so the next use tries loading again
+                    self.install()
+                    raise
+                record.import_time += import_time
+                self.bot.startup_report[self.name] = record
+
+        # the stub's invocation carries on as the real command's, so its checks, events and
+        # metrics run once; only the arguments are parsed again, the stub took them all
+        parsed = await self.bot.get_context(ctx.message)
+        if parsed.command is None or parsed.command is ctx.command:
+            raise commands.CommandNotFound(f'Command "{ctx.invoked_with}" is not found')
+        ctx.command, ctx.view = parsed.command, parsed.view
+        await ctx.command.invoke(ctx)
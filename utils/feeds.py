@@ -0,0 +1,130 @@
+"""Cache of subreddit listings, revalidated with conditional requests."""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+
+from utils.http import UpstreamError
+from utils.metrics import format_labels
+
+log = logging.getLogger(__name__)
+
+
+class Post:
+    __slots__ = ('subreddit', 'title', 'url', 'flair', 'stickied')
+
+    def __init__(self, subreddit, title, url, flair, stickied):
+        self.subreddit = subreddit
+        self.title = title
+        self.url = url
+        self.flair = flair
+        self.stickied = stickied
+
+    @classmethod
+    def from_listing(cls, subreddit, child):
+        data = child['data']
+        return cls(subreddit, data['title'], data['url'], data['link_flair_text'], data['stickied'])
+
+
+class _Feed:
+    __slots__ = ('posts', 'etag', 'last_modified', 'checked_at')
+
+    def __init__(self, posts, etag, last_modified, checked_at):
+        self.posts = posts
+        self.etag = etag
+        self.last_modified = last_modified
+        self.checked_at = checked_at
+
+
+class FeedCache:
+    """Hot posts of subreddits, kept for ``freshness`` seconds and then revalidated.
+
+    A revalidation sends the listing's ETag and Last-Modified back, so an unchanged
+    listing costs a body-less 304. Concurrent requests for a subreddit share one fetch,
+    and a cached listing is served while reddit is unreachable.
+    """
+
+    def __init__(self, http_client, *, freshness=120.0, limit=5, max_size=512):
+        self.http_client = http_client
+        self.freshness = freshness
+        self.limit = limit
+        self.max_size = max_size
+        self.results = dict.fromkeys(('hit', 'not_modified', 'modified', 'stale', 'error'), 0)
+        self._feeds = OrderedDict()
+        self._inflight = {}
+
+    def __len__(self):
+        return len(self._feeds)
+
+    async def posts(self, subreddit):
+        """Hot posts of ``subreddit``, None if they couldn't be fetched."""
+        feed = self._feeds.get(subreddit)
+        if feed is not None and time.monotonic() - feed.checked_at < self.freshness:
+            self._feeds.move_to_end(subreddit)
+            self.results['hit'] += 1
+            return feed.posts
+
+        task = self._inflight.get(subreddit)
+        if task is None:
+            task = self._inflight[subreddit] = asyncio.ensure_future(self._revalidate(subreddit))
+        return await asyncio.shield(task)
+
+    async def merged(self, subreddits):
+        """Hot posts of several subreddits fetched concurrently, interleaved in each one's order.
+
+        Subreddits that couldn't be fetched are left out, None if none could.
+        """
+        listings = await asyncio.gather(*(self.posts(subreddit) for subreddit in subreddits))
+        listings = [posts for posts in listings if posts is not None]
+        if not listings:
+            return None
+        interleaved = itertools.chain.from_iterable(itertools.zip_longest(*listings))
+        return [post for post in interleaved if post is not None]
+
+    async def _revalidate(self, subreddit):
+        try:
+            feed = self._feeds.get(subreddit)
+            headers = {}
+            if feed is not None:
+                if feed.etag:
+                    headers['If-None-Match'] = feed.etag
+                if feed.last_modified:
+                    headers['If-Modified-Since'] = feed.last_modified
+
+            url = f'https://www.reddit.com/r/{subreddit}/hot.json'
+            try:
+                resp = await self.http_client.fetch('GET', url, params={'limit': str(self.limit)}, headers=headers)
+            except UpstreamError as e:
+                log.debug('Fetching r/%s failed: %r', subreddit, e)
+                resp = None
+
+            if resp is not None and resp.status == 304 and feed is not None:
+                self.results['not_modified'] += 1
+                feed.checked_at = time.monotonic()
+            elif resp is not None and resp.status == 200:
+                self.results['modified'] += 1
+                posts = [Post.from_listing(subreddit, child) for child in resp.data['data']['children']]
+                feed = _Feed(posts, resp.headers.get('ETag'), resp.headers.get('Last-Modified'), time.monotonic())
+                self._feeds[subreddit] = feed
+            elif feed is not None:
+                # reddit is down or erroring, an old listing beats none
+                self.results['stale'] += 1
+            else:
+                self.results['error'] += 1
+                return None
+
+            self._feeds.move_to_end(subreddit)
+            while len(self._feeds) > self.max_size:
+                self._feeds.popitem(last=False)
+            return feed.posts
+        finally:
+            self._inflight.pop(subreddit, None)
+
+    def metrics(self):
+        yield '# TYPE sneakyninja_feed_cache_entries gauge'
+        yield f'sneakyninja_feed_cache_entries {len(self._feeds)}'
+        yield '# TYPE sneakyninja_feed_cache_requests_total counter'
+        for result, count in self.results.items():
+            yield f'sneakyninja_feed_cache_requests_total{format_labels(result=result)} {count}'
@@ -0,0 +1,219 @@
+"""FIGlet text renderer, with the fonts bundled in utils/fonts.
+
+Implements horizontal fitting and smushing of the FIGfont 2 format, the same way
+the figlet program does it left to right.
+"""
+
+import os
+from collections import OrderedDict
+
+FONTS_DIR = os.path.join(os.path.dirname(__file__), 'fonts')
+
+# layout bits of a font header, see the FIGfont 2 spec
+SM_EQUAL = 1
+SM_LOWLINE = 2
+SM_HIERARCHY = 4
+SM_PAIR = 8
+SM_BIGX = 16
+SM_HARDBLANK = 32
+SM_KERN = 64
+SM_SMUSH = 128
+
+_HIERARCHY = ('|', '/\\', '[]', '{}', '()', '<>')
+_PAIRS = {'[]', '][', '{}', '}{', '()', ')('}
+_BIGX = {'/\\': '|', '\\/': 'Y', '><': 'X'}
+# characters 127 and up that every font has after ascii, in this order
+_DEUTSCH = (196, 214, 220, 228, 246, 252, 223)
+
+
+class FontError(Exception):
+    pass
+
+
+def _code(text):
+    if text.lower().startswith(('0x', '-0x')):
+        return int(text, 16)
+    if text.startswith(('0', '-0')) and text.strip('-0'):
+        return int(text, 8)
+    return int(text)
+
+
+class Glyph:
+    """A character's rows, padded to the same width, and how many blanks each row starts with."""
+
+    __slots__ = ('rows', 'width', 'lead')
+
+    def __init__(self, rows):
+        self.width = max(len(row) for row in rows)
+        self.rows = tuple(row.ljust(self.width) for row in rows)
+        self.lead = tuple(len(row) - len(row.lstrip(' ')) for row in self.rows)
+
+
+class Font:
+    """A parsed .flf font."""
+
+    def __init__(self, name, data):
+        self.name = name
+        lines = data.splitlines()
+        header = lines[0].split()
+        if not header or not header[0].startswith('flf2a'):
+            raise FontError(f'{name} is not a FIGfont')
+        self.hardblank = header[0][5]
+        self.height = int(header[1])
+        old_layout, comment_lines = int(header[4]), int(header[5])
+        if len(header) > 7:
+            self.layout = int(header[7])
+        elif old_layout == 0:
+            self.layout = SM_KERN
+        elif old_layout < 0:
+            self.layout = 0
+        else:
+            self.layout = (old_layout & 31) | SM_SMUSH
+
+        self.glyphs = {}
+        lines = lines[1 + comment_lines:]
+        codes = iter([*range(32, 127), *_DEUTSCH])
+        position = 0
+        while position + self.height <= len(lines):
+            code = next(codes, None)
+            if code is None:
+                # code tagged characters: a "code comment" line, then the rows
+                try:
+                    code = _code(lines[position].split()[0])
+                except (IndexError, ValueError):
+                    break
+                position += 1
+                if position + self.height > len(lines):
+                    break
+            rows = tuple(self._strip(line) for line in lines[position:position + self.height])
+            position += self.height
+            if code >= 0:
+                self.glyphs[code] = Glyph(rows)
+
+    @staticmethod
+    def _strip(line):
+        # rows end with one or more end marks, usually @
+        line = line.rstrip()
+        return line.rstrip(line[-1]) if line else line
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='latin-1') as f:
+            return cls(os.path.splitext(os.path.basename(path))[0], f.read())
+
+    def _smush(self, left, right, left_width, right_width):
+        """The character ``left`` and ``right`` smush into, None if they don't."""
+        if left == ' ':
+            return right
+        if right == ' ':
+            return left
+        layout = self.layout
+        if left_width < 2 or right_width < 2 or not layout & SM_SMUSH:
+            return None
+
+        hardblank = self.hardblank
+        if not layout & 63:
+            # universal smushing, the right character wins over anything but a hardblank
+            if left == hardblank:
+                return right
+            return left if right == hardblank else right
+        if layout & SM_HARDBLANK and left == hardblank == right:
+            return left
+        if left == hardblank or right == hardblank:
+            return None
+        if layout & SM_EQUAL and left == right:
+            return left
+        if layout & SM_LOWLINE:
+            if left == '_' and right in '|/\\[]{}()<>':
+                return right
+            if right == '_' and left in '|/\\[]{}()<>':
+                return left
+        if layout & SM_HIERARCHY:
+            for index, chars in enumerate(_HIERARCHY):
+                higher = ''.join(_HIERARCHY[index + 1:])
+                if left in chars and right in higher:
+                    return right
+                if right in chars and left in higher:
+                    return left
+        if layout & SM_PAIR and left + right in _PAIRS:
+            return '|'
+        if layout & SM_BIGX and left + right in _BIGX:
+            return _BIGX[left + right]
+        return None
+
+    def _overlap(self, rows, trail, glyph, previous_width):
+        """How many columns ``glyph`` can be moved into the output ``rows``."""
+        if not self.layout & (SM_KERN | SM_SMUSH):
+            return 0
+        overlap = glyph.width
+        length = len(rows[0])
+        for row, out_trail, lead, glyph_row in zip(rows, trail, glyph.lead, glyph.rows):
+            amount = out_trail + lead
+            if out_trail < length and lead < len(glyph_row):
+                # both rows have a character at the boundary, maybe they smush into one
+                if self._smush(row[length - out_trail - 1], glyph_row[lead], previous_width, glyph.width):
+                    amount += 1
+            overlap = min(overlap, amount)
+        return overlap
+
+    def render(self, text):
+        """``text`` as a list of rows, hardblanks turned into spaces and trailing blanks removed."""
+        rows = [''] * self.height
+        # blanks at the end of each output row, the whole row while it's empty
+        trail = [0] * self.height
+        previous_width = 0
+        for char in text:
+            glyph = self.glyphs.get(ord(char)) or self.glyphs.get(ord('?'))
+            if glyph is None:
+                continue
+            overlap = self._overlap(rows, trail, glyph, previous_width)
+            # moving further left than the output starts drops the glyph's leading blank columns
+            dropped = max(overlap - len(rows[0]), 0)
+            overlap -= dropped
+            for index, glyph_row in enumerate(glyph.rows):
+                row = rows[index]
+                glyph_row = glyph_row[dropped:]
+                start = len(row) - overlap
+                merged = []
+                for offset in range(overlap):
+                    left, right = row[start + offset], glyph_row[offset]
+                    merged.append(self._smush(left, right, previous_width, glyph.width) or left)
+                rows[index] = row[:start] + ''.join(merged) + glyph_row[overlap:]
+                stripped = rows[index].rstrip(' ')
+                trail[index] = len(rows[index]) - len(stripped)
+            previous_width = glyph.width
+        return [row.replace(self.hardblank, ' ').rstrip() for row in rows]
+
+
+class FigletRenderer:
+    """Every font of a directory, parsed once, and an LRU cache of rendered text."""
+
+    def __init__(self, fonts_dir=FONTS_DIR, *, default='standard', cache_size=1024):
+        self.fonts = {
+            os.path.splitext(filename)[0]: Font.load(os.path.join(fonts_dir, filename))
+            for filename in sorted(os.listdir(fonts_dir)) if filename.endswith('.flf')
+        }
+        self.default = default
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    def render(self, text, font=None):
+        """``text`` rendered in ``font`` as one string, KeyError if there's no such font."""
+        key = (font or self.default, text)
+        try:
+            result = self._cache[key]
+        except KeyError:
+            self.misses += 1
+            # each line of text is rendered on its own
+            result = '\n'.join(
+                '\n'.join(self.fonts[key[0]].render(line)) for line in text.splitlines() or ['']
+            )
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self.hits += 1
+            self._cache.move_to_end(key)
+        return result
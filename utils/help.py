@@ -0,0 +1,187 @@
+"""Help index: pre-rendered help embeds and a trigram index for fuzzy command search."""
+
+from collections import Counter, defaultdict
+
+NO_CATEGORY = 'No Category'
+
+
+def trigrams(text):
+    """Trigrams of every word of ``text``, padded so word starts weigh more, like pg_trgm."""
+    grams = set()
+    for word in text.casefold().split():
+        word = f'  {word} '
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+def _signature(command):
+    return f'{command.qualified_name} {command.signature}'
+
+
+def _doc(command):
+    return f'*`{command.short_doc}`*' if command.short_doc else '`...`'
+
+
+def _visible(commands):
+    return sorted((command for command in commands if not command.hidden), key=lambda command: command.name)
+
+
+def _payload(command, subcommands, colour):
+    name = command.qualified_name
+    if hasattr(command, 'commands'):
+        return {
+            'title': name, 'description': command.help or '', 'color': colour,
+            'fields': [{'name': _signature(sub), 'value': _doc(sub), 'inline': True} for sub in subcommands],
+        }
+    fields = []
+    if command.short_doc and command.help[len(command.short_doc):]:
+        fields.append({'name': 'help', 'value': command.help[len(command.short_doc):], 'inline': False})
+    return {'title': name, 'description': command.short_doc or '', 'color': colour, 'fields': fields}
+
+
+class HelpIndex:
+    """Help embeds of every visible command and cog, as ``discord.Embed.from_dict`` payloads.
+
+    Entries are kept per cog, so loading or unloading an extension only re-renders its
+    own cogs, see :meth:`refresh`. Payloads have no footer, the help command adds it.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.overview = {}
+        self.cogs = {}  # cog name: payload
+        self.commands = {}  # qualified name: payload
+        self.usages = {}  # qualified name: signature, without the prefix
+        self.short_docs = {}
+        self._fields = {}  # cog name: its field of the overview
+        self._cog_commands = defaultdict(set)
+        self._extension_cogs = defaultdict(set)
+
+        # trigrams of command names and aliases, and of their docs
+        self._term_postings = defaultdict(set)
+        self._term_sizes = {}
+        self._term_commands = defaultdict(set)
+        self._doc_postings = defaultdict(set)
+
+    def refresh(self, extension=None):
+        """Re-renders the cogs of ``extension`` and the commands without a cog."""
+        if extension is not None:
+            for cog_name in self._extension_cogs.pop(extension, ()):
+                self._remove(cog_name)
+            for cog_name, cog in self.bot.cogs.items():
+                module = type(cog).__module__
+                if module == extension or module.startswith(f'{extension}.'):
+                    self._extension_cogs[extension].add(cog_name)
+                    self._add(cog_name, cog.get_commands(), cog.description)
+
+        # lazily loaded extensions' stubs are added and removed without a cog
+        self._remove(NO_CATEGORY)
+        self._add(NO_CATEGORY, [command for command in self.bot.commands if command.cog is None], None)
+        self._render_overview()
+
+    def _add(self, cog_name, commands, description):
+        visible = _visible(commands)
+        if not visible:
+            return
+
+        colour = self.bot.colour.value
+        self._fields[cog_name] = {
+            'name': cog_name, 'value': ', '.join(f"*`{command.name}`*" for command in visible), 'inline': True,
+        }
+        self.cogs[cog_name] = {
+            'title': cog_name, 'description': description or '', 'color': colour,
+            'fields': [{'name': _signature(command), 'value': _doc(command), 'inline': True} for command in visible],
+        }
+
+        pending = list(visible)
+        while pending:
+            command = pending.pop()
+            name = command.qualified_name
+            self._cog_commands[cog_name].add(name)
+            self.short_docs[name] = command.short_doc
+            subcommands = _visible(getattr(command, 'commands', ()))
+            pending.extend(subcommands)
+
+            self.commands[name] = _payload(command, subcommands, colour)
+            if not hasattr(command, 'commands'):
+                self.usages[name] = _signature(command)
+
+            for term in (command.name, *command.aliases):
+                grams = trigrams(term)
+                self._term_sizes[term] = len(grams)
+                self._term_commands[term].add(name)
+                for gram in grams:
+                    self._term_postings[gram].add(term)
+            for gram in trigrams(command.help or ''):
+                self._doc_postings[gram].add(name)
+
+    def render(self, command):
+        """``(payload, usage)`` of a command that isn't indexed, a hidden one, rendered on demand.
+
+        Asked for by name, a hidden group lists its hidden subcommands too.
+        """
+        subcommands = getattr(command, 'commands', ())
+        subcommands = sorted(subcommands, key=lambda sub: sub.name) if command.hidden else _visible(subcommands)
+        usage = None if hasattr(command, 'commands') else _signature(command)
+        return _payload(command, subcommands, self.bot.colour.value), usage
+
+    def _remove(self, cog_name):
+        self.cogs.pop(cog_name, None)
+        self._fields.pop(cog_name, None)
+        names = self._cog_commands.pop(cog_name, set())
+        for name in names:
+            self.commands.pop(name, None)
+            self.usages.pop(name, None)
+            self.short_docs.pop(name, None)
+
+        for term, commands in list(self._term_commands.items()):
+            commands -= names
+            if not commands:
+                del self._term_commands[term]
+                del self._term_sizes[term]
+                for gram in trigrams(term):
+                    self._term_postings[gram].discard(term)
+        for postings in self._doc_postings.values():
+            postings -= names
+
+    def _render_overview(self):
+        fields = [self._fields[name] for name in (*self.bot.cogs, NO_CATEGORY) if name in self._fields]
+        self.overview = {
+            'title': 'Sneaky Help', 'description': self.bot.description or '',
+            'color': self.bot.colour.value, 'fields': fields,
+        }
+
+    def search(self, query, *, parent=None, limit=5, threshold=0.3):
+        """Qualified names of the commands best matching ``query``, best first.
+
+        Names and aliases are compared by trigram similarity, docs by the share of the
+        query's trigrams they have, at half weight. ``parent`` limits the search to a
+        group's subcommands, ``''`` to top level commands.
+        """
+        grams = trigrams(query)
+        if not grams:
+            return []
+
+        term_hits = Counter()
+        for gram in grams:
+            term_hits.update(self._term_postings.get(gram, ()))
+        scores = {}
+        for term, hits in term_hits.items():
+            score = 2 * hits / (len(grams) + self._term_sizes[term])
+            for name in self._term_commands[term]:
+                scores[name] = max(scores.get(name, 0.0), score)
+
+        doc_hits = Counter()
+        for gram in grams:
+            doc_hits.update(self._doc_postings.get(gram, ()))
+        for name, hits in doc_hits.items():
+            scores[name] = max(scores.get(name, 0.0), hits / len(grams) / 2)
+
+        if parent is not None:
+            prefix = f'{parent} ' if parent else ''
+            scores = {
+                name: score for name, score in scores.items()
+                if name.startswith(prefix) and ' ' not in name[len(prefix):]
+            }
+        ranked = sorted(((score, name) for name, score in scores.items() if score >= threshold), reverse=True)
+        return [name for _, name in ranked[:limit]]
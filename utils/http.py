@@ -0,0 +1,256 @@
+"""Outbound HTTP for the cogs, with a connection pool, timeouts and metrics per upstream host."""
+
+import asyncio
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import aiohttp
+from discord.ext import commands
+
+from utils.metrics import Histogram, format_labels
+
+
+class UpstreamError(commands.CommandError):
+    """An upstream timed out or couldn't be reached."""
+
+    def __init__(self, host, original, message=None):
+        self.host = host
+        self.original = original
+        super().__init__(message or f"Sorry, {host} isn't responding right now.")
+
+
+class CircuitOpen(UpstreamError):
+    """The upstream's circuit breaker is open, so the request wasn't even tried."""
+
+    def __init__(self, host):
+        super().__init__(host, None, f"Sorry, {host} is unavailable right now, try again later.")
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker driven by the error rate of the last ``window`` requests.
+
+    Requests slower than ``slow`` seconds count as failures. Once at least ``min_requests``
+    were seen and ``error_rate`` of them failed, the circuit opens and requests fail fast
+    for ``reset`` seconds, then a single probe request decides whether it closes again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, *, window=20, min_requests=5, error_rate=0.5, slow=8.0, reset=30.0):
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.slow = slow
+        self.reset = reset
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self._outcomes = deque(maxlen=window)
+        self._probing = False
+
+    @property
+    def failure_rate(self):
+        return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+
+    def allow(self):
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset:
+                return False
+            self.state = self.HALF_OPEN
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def release(self):
+        """Gives back a half-open probe that ended without an outcome."""
+        self._probing = False
+
+    def record(self, success, elapsed):
+        success = success and elapsed < self.slow
+        if self.state == self.HALF_OPEN:
+            self._probing = False
+            if success:
+                self.state = self.CLOSED
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+
+        self._outcomes.append(success)
+        if len(self._outcomes) >= self.min_requests and self.failure_rate >= self.error_rate:
+            self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+
+
+class Response:
+    """A fully read response. ``data`` is only read for 2xx statuses."""
+
+    __slots__ = ('status', 'headers', 'data')
+
+    def __init__(self, status, headers, data):
+        self.status = status
+        self.headers = headers
+        self.data = data
+
+
+class Upstream:
+    """One upstream host: its own session and connector, so one slow host can't starve the others."""
+
+    def __init__(self, host, *, loop, limit, connect, read, total, keepalive, dns_ttl, error_rate, slow, reset):
+        self.host = host
+        self.breaker = CircuitBreaker(error_rate=error_rate, slow=slow, reset=reset)
+        self.session = aiohttp.ClientSession(
+            loop=loop,
+            connector=aiohttp.TCPConnector(
+                loop=loop, limit=limit, limit_per_host=limit,
+                keepalive_timeout=keepalive, ttl_dns_cache=dns_ttl, use_dns_cache=True,
+            ),
+            timeout=aiohttp.ClientTimeout(total=total, sock_connect=connect, sock_read=read),
+        )
+        self.requests = 0
+        self.errors = 0
+        self.hedged = 0
+        self.latency = Histogram()
+
+
+class HTTPClient:
+    """Per-host pooled HTTP client.
+
+    Every host gets an :class:`Upstream` on first use, configured from ``DEFAULTS``
+    overridden by ``upstreams[host]``.
+    """
+
+    DEFAULTS = {
+        'limit': 10,  # connections
+        'connect': 5.0,  # seconds
+        'read': 10.0,
+        'total': 20.0,
+        'keepalive': 30.0,
+        'dns_ttl': 300,
+        'error_rate': 0.5,  # circuit breaker, see CircuitBreaker
+        'slow': 8.0,
+        'reset': 30.0,
+    }
+    # hedging needs enough samples for a meaningful p95, and never fires sooner than HEDGE_MIN_DELAY
+    HEDGE_MIN_SAMPLES = 20
+    HEDGE_MIN_DELAY = 0.05
+
+    def __init__(self, loop, upstreams=None):
+        self.loop = loop
+        self.config = upstreams or {}
+        self.upstreams = {}
+
+    def upstream(self, url):
+        host = urlsplit(url).hostname
+        upstream = self.upstreams.get(host)
+        if upstream is None:
+            options = {**self.DEFAULTS, **self.config.get(host, {})}
+            upstream = self.upstreams[host] = Upstream(host, loop=self.loop, **options)
+        return upstream
+
+    def session_for(self, url):
+        """The pooled session of ``url``'s host, for libraries that take a session."""
+        return self.upstream(url).session
+
+    async def fetch(self, method, url, *, read='json', hedge=False, **kwargs):
+        """Performs a request and reads its body as ``'json'``, ``'text'`` or not at all (None).
+
+        With ``hedge``, only meant for idempotent requests, a second identical request is
+        sent if the first takes longer than the upstream's p95 latency, and whichever
+        finishes first wins. Raises UpstreamError when the host times out or can't be
+        reached, CircuitOpen when its circuit breaker is open.
+        """
+        upstream = self.upstream(url)
+        latency = upstream.latency
+        if not hedge or latency.count < self.HEDGE_MIN_SAMPLES:
+            return await self._request(upstream, method, url, read, kwargs)
+
+        delay = max(latency.percentile(0.95), self.HEDGE_MIN_DELAY)
+        first = asyncio.ensure_future(self._request(upstream, method, url, read, kwargs))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        upstream.hedged += 1
+        second = asyncio.ensure_future(self._request(upstream, method, url, read, kwargs))
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # both can finish at once, a failed attempt only matters if the other one fails too
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                if not pending:
+                    return done.pop().result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _request(self, upstream, method, url, read, kwargs):
+        if not upstream.breaker.allow():
+            raise CircuitOpen(upstream.host)
+
+        upstream.requests += 1
+        start = time.perf_counter()
+        try:
+            async with upstream.session.request(method, url, **kwargs) as resp:
+                data = None
+                if 200 <= resp.status < 300:
+                    if read == 'json':
+                        # some upstreams send json with the wrong content type
+                        data = await resp.json(content_type=None)
+                    elif read == 'text':
+                        data = await resp.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            elapsed = time.perf_counter() - start
+            upstream.errors += 1
+            upstream.latency.observe(elapsed)
+            upstream.breaker.record(False, elapsed)
+            raise UpstreamError(upstream.host, e) from e
+        except Exception:
+            # e.g. a malformed body, the upstream is still misbehaving
+            upstream.errors += 1
+            upstream.breaker.record(False, time.perf_counter() - start)
+            raise
+        except asyncio.CancelledError:
+            # a hedged attempt that lost the race, its outcome says nothing about the upstream
+            upstream.breaker.release()
+            raise
+
+        elapsed = time.perf_counter() - start
+        upstream.latency.observe(elapsed)
+        ok = resp.status < 500
+        if not ok:
+            upstream.errors += 1
+        upstream.breaker.record(ok, elapsed)
+        return Response(resp.status, resp.headers, data)
+
+    async def close(self):
+        for upstream in self.upstreams.values():
+            await upstream.session.close()
+
+    def metrics(self):
+        yield '# TYPE sneakyninja_http_requests_total counter'
+        for host, upstream in self.upstreams.items():
+            yield f'sneakyninja_http_requests_total{format_labels(host=host)} {upstream.requests}'
+        yield '# TYPE sneakyninja_http_errors_total counter'
+        for host, upstream in self.upstreams.items():
+            yield f'sneakyninja_http_errors_total{format_labels(host=host)} {upstream.errors}'
+        yield '# TYPE sneakyninja_http_hedged_total counter'
+        for host, upstream in self.upstreams.items():
+            yield f'sneakyninja_http_hedged_total{format_labels(host=host)} {upstream.hedged}'
+        yield '# TYPE sneakyninja_http_circuit_open gauge'
+        for host, upstream in self.upstreams.items():
+            is_open = int(upstream.breaker.state != CircuitBreaker.CLOSED)
+            yield f'sneakyninja_http_circuit_open{format_labels(host=host)} {is_open}'
+        yield '# TYPE sneakyninja_http_request_duration_seconds histogram'
+        for host, upstream in self.upstreams.items():
+            yield from upstream.latency.render('sneakyninja_http_request_duration_seconds', host=host)
@@ -0,0 +1,138 @@
+"""Lightweight IPC between the cluster launcher and its bot processes.
+
+Messages are newline delimited JSON objects over a local TCP connection. Every
+cluster pushes a heartbeat with its own statistics and the launcher answers
+``stats`` requests with the totals over all clusters.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+
+log = logging.getLogger(__name__)
+
+STAT_KEYS = ('guilds', 'members', 'users', 'shards')
+
+
+def _encode(payload):
+    return json.dumps(payload, separators=(',', ':')).encode() + b'\n'
+
+
+class IPCServer:
+    """Runs in the launcher process and keeps the latest state of every cluster."""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.host = host
+        self.port = port
+        self.clusters = {}
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def totals(self):
+        totals = dict.fromkeys(STAT_KEYS, 0)
+        for cluster in self.clusters.values():
+            for key in STAT_KEYS:
+                totals[key] += cluster['stats'].get(key, 0)
+        totals['clusters'] = len(self.clusters)
+        return totals
+
+    async def _handle(self, reader, writer):
+        cluster_id = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                op = message.get('op')
+                if op == 'heartbeat':
+                    cluster_id = message['cluster']
+                    self.clusters[cluster_id] = {
+                        'stats': message['stats'],
+                        'pid': message.get('pid'),
+                        'last_seen': time.monotonic(),
+                    }
+                elif op == 'stats':
+                    writer.write(_encode({'nonce': message['nonce'], 'data': self.totals()}))
+                    await writer.drain()
+        except (ConnectionError, json.JSONDecodeError) as e:
+            log.warning('IPC connection of cluster %s dropped: %s', cluster_id, e)
+        finally:
+            writer.close()
+
+
+class IPCClient:
+    """Runs inside a bot process, connected to the launcher's :class:`IPCServer`."""
+
+    def __init__(self, bot, cluster_id, port, *, host='127.0.0.1', interval=15.0, timeout=5.0):
+        self.bot = bot
+        self.cluster_id = cluster_id
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.timeout = timeout
+        self._writer = None
+        self._nonce = 0
+        self._waiters = {}
+        self._tasks = []
+
+    async def connect(self):
+        reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._tasks = [
+            asyncio.ensure_future(self._read_loop(reader)),
+            asyncio.ensure_future(self._heartbeat_loop()),
+        ]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        if self._writer:
+            self._writer.close()
+
+    async def cluster_stats(self):
+        """Statistics summed over every cluster, as last reported by their heartbeats."""
+        self._nonce += 1
+        nonce = self._nonce
+        future = self._waiters[nonce] = asyncio.get_event_loop().create_future()
+        try:
+            await self._send({'op': 'stats', 'nonce': nonce})
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        finally:
+            self._waiters.pop(nonce, None)
+
+    async def _send(self, payload):
+        self._writer.write(_encode(payload))
+        await self._writer.drain()
+
+    async def _read_loop(self, reader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                log.warning('IPC connection to the launcher closed')
+                break
+            message = json.loads(line)
+            future = self._waiters.get(message.get('nonce'))
+            if future and not future.done():
+                future.set_result(message['data'])
+
+    async def _heartbeat_loop(self):
+        while True:
+            try:
+                await self._send({
+                    'op': 'heartbeat', 'cluster': self.cluster_id,
+                    'pid': os.getpid(), 'stats': self.bot.local_stats(),
+                })
+            except ConnectionError as e:
+                log.warning('IPC heartbeat failed: %s', e)
+            await asyncio.sleep(self.interval)
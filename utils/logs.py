@@ -0,0 +1,133 @@
+"""Queue based logging, so that the event loop never waits on a disk write.
+
+Loggers only put records on a bounded queue, and a background thread formats
+and writes them to rotating files. Records that don't fit in the queue are
+dropped and counted instead of blocking.
+"""
+
+import logging
+import logging.handlers
+import os
+import queue
+import time
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that counts and drops records when the queue is full.
+
+    Records are queued as they are, the listener thread's handlers merge their
+    arguments and format them, so the event loop only pays for creating them.
+    """
+
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # QueueHandler formats here so records can be pickled, this queue never leaves the process
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most ``rate`` records under ``level`` through per ``per`` seconds, for each logger.
+
+    It runs before the record is formatted, so suppressed gateway DEBUG records cost next to nothing.
+    """
+
+    def __init__(self, rate, per=1.0, level=logging.INFO):
+        super().__init__()
+        self.rate = rate
+        self.per = per
+        self.level = level
+        self.suppressed = 0
+        self._windows = {}
+
+    def filter(self, record):
+        if record.levelno >= self.level:
+            return True
+
+        now = time.monotonic()
+        window = self._windows.get(record.name)
+        if window is None or now - window[0] >= self.per:
+            self._windows[record.name] = [now, 1]
+            return True
+        if window[1] < self.rate:
+            window[1] += 1
+            return True
+
+        self.suppressed += 1
+        return False
+
+
+class LogPipeline:
+    """Owns the queue, its handler and the listener thread writing the log files."""
+
+    def __init__(self, handler, listener, rate_limit):
+        self.handler = handler
+        self.listener = listener
+        self.rate_limit = rate_limit
+
+    def stop(self):
+        self.listener.stop()
+
+    def metrics(self):
+        yield '# TYPE sneakyninja_log_queue_depth gauge'
+        yield f'sneakyninja_log_queue_depth {self.handler.queue.qsize()}'
+        yield '# TYPE sneakyninja_log_dropped_total counter'
+        yield f'sneakyninja_log_dropped_total {self.handler.dropped}'
+        yield '# TYPE sneakyninja_log_suppressed_total counter'
+        yield f'sneakyninja_log_suppressed_total {self.rate_limit.suppressed}'
+
+
+def _file_handler(filename, *, max_bytes, backups, when, formatter, loggers):
+    if when:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            filename, when=when, backupCount=backups, encoding='utf-8', delay=True
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            filename, maxBytes=max_bytes, backupCount=backups, encoding='utf-8', delay=True
+        )
+        # every run starts a fresh file, the previous run's log is kept as a backup
+        if backups and os.path.exists(filename) and os.path.getsize(filename):
+            handler.doRollover()
+    handler.setFormatter(formatter)
+    # one listener serves every file, so each file only takes records of its own loggers
+    handler.addFilter(lambda record: record.name.partition('.')[0] in loggers)
+    return handler
+
+
+def setup_logging(*, suffix='', max_bytes=32 * 2**20, backups=5, when=None, queue_size=10000, debug_rate=100):
+    """Routes the ``discord``, ``cogs`` and ``utils`` loggers through a background thread.
+
+    Files rotate at ``max_bytes``, or on a ``when`` interval (see TimedRotatingFileHandler) if given.
+    Each logger can emit at most ``debug_rate`` DEBUG records per second.
+    """
+    options = dict(max_bytes=max_bytes, backups=backups, when=when)
+    discord_handler = _file_handler(
+        f'logs/discord{suffix}.log', loggers=('discord',), **options,
+        formatter=logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s'),
+    )
+    cogs_handler = _file_handler(
+        f'logs/sneakycogs{suffix}.log', loggers=('cogs', 'utils'), **options,
+        formatter=logging.Formatter('|{asctime}|{levelname}|{name}: {message}', '%Y-%m-%d %I:%M:%S %p', style='{'),
+    )
+
+    rate_limit = RateLimitFilter(debug_rate)
+    handler = DroppingQueueHandler(queue.Queue(queue_size))
+    handler.addFilter(rate_limit)
+    listener = logging.handlers.QueueListener(handler.queue, discord_handler, cogs_handler)
+
+    for name in ('discord', 'cogs', 'utils'):
+        logger = logging.getLogger(name)
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(handler)
+
+    listener.start()
+    return LogPipeline(handler, listener, rate_limit)
@@ -0,0 +1,74 @@
+"""Multi-pattern substring matching."""
+
+from collections import deque
+
+
+class AhoCorasick:
+    """Automaton finding whether any of ``patterns`` occurs in a text, in one pass over it.
+
+    Pure python steps cost more than ``str.__contains__``'s C loop, so this only pays off
+    for many patterns, see :func:`contains_any`.
+    """
+
+    __slots__ = ('_goto', '_fail', '_match')
+
+    def __init__(self, patterns):
+        goto, match = [{}], [False]
+        for pattern in patterns:
+            state = 0
+            for char in pattern:
+                following = goto[state].get(char)
+                if following is None:
+                    following = len(goto)
+                    goto[state][char] = following
+                    goto.append({})
+                    match.append(False)
+                state = following
+            match[state] = True
+
+        # breadth first, so a state's fail link is set before its children's
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in goto[state].items():
+                queue.append(following)
+                link = fail[state]
+                while link and char not in goto[link]:
+                    link = fail[link]
+                link = goto[link].get(char, 0)
+                fail[following] = link if link != following else 0
+                match[following] = match[following] or match[fail[following]]
+
+        self._goto = goto
+        self._fail = fail
+        self._match = match
+
+    def search(self, text):
+        """Whether any pattern occurs in ``text``."""
+        goto, fail, match = self._goto, self._fail, self._match
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if match[state]:
+                return True
+        return False
+
+
+# below this many patterns, one C level substring scan per pattern beats the automaton
+AUTOMATON_MIN_PATTERNS = 64
+
+
+def contains_any(patterns):
+    """A function telling whether a text contains any of ``patterns``, using the faster strategy."""
+    patterns = tuple(dict.fromkeys(pattern for pattern in patterns if pattern))
+    if not patterns:
+        return lambda text: False
+    if len(patterns) == 1:
+        pattern = patterns[0]
+        return lambda text: pattern in text
+    if len(patterns) < AUTOMATON_MIN_PATTERNS:
+        return lambda text: any(pattern in text for pattern in patterns)
+    return AhoCorasick(patterns).search
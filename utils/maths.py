@@ -0,0 +1,149 @@
+"""Symbolic math for the math commands, meant to run in the 'cpu' process pool.
+
+Expressions are checked against a whitelist before sympy parses them, and every
+computation runs under a CPU time and an address space limit.
+"""
+
+import re
+import signal
+import string
+
+try:
+    import resource
+except ImportError:  # not on windows, expressions only get the time limit there
+    resource = None
+
+OPERATIONS = ('factor', 'derive', 'integrate', 'zeroes', 'simplify', 'evaluate')
+FUNCTIONS = {
+    'sin', 'cos', 'tan', 'cot', 'sec', 'csc', 'asin', 'acos', 'atan',
+    'sinh', 'cosh', 'tanh', 'exp', 'log', 'ln', 'sqrt', 'abs', 'pi',
+}
+MAX_LENGTH = 256
+
+# a dot only ever belongs to a number, so no attribute of what sympy builds can be reached
+_ALLOWED = re.compile(r'(?:(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+)(?![0-9.])|[A-Za-z]+|[+\-*/^()])+')
+_NAME = re.compile(r'[A-Za-z]+')
+# the longest function name first, so that "asin" isn't read as a*sin
+_TOKEN = re.compile('|'.join(sorted(FUNCTIONS, key=len, reverse=True)) + '|[A-Za-z]')
+
+
+class MathError(Exception):
+    """The expression is invalid or too costly. Its message is meant for the user."""
+
+
+class _TimeLimit(BaseException):
+    # a BaseException, so sympy's own ``except Exception`` blocks don't swallow it
+    pass
+
+
+def canonical(expression):
+    """Whitelist checked form of ``expression`` with names split into functions and variables.
+
+    Raises MathError if the expression isn't allowed.
+    """
+    expression = ''.join(expression.split()).replace('**', '^')
+    if not expression:
+        raise MathError("Please, provide an expression.")
+    if len(expression) > MAX_LENGTH:
+        raise MathError(f"Expressions can be at most {MAX_LENGTH} characters long.")
+    if not _ALLOWED.fullmatch(expression):
+        raise MathError("Expressions may only contain numbers, variables, functions and `+ - * / ^ ( )`.")
+    # single letters are variables, e is euler's number, so "2xe^sinx" is 2 x e^sin x
+    return _NAME.sub(lambda match: ' '.join(_TOKEN.findall(match.group())), expression)
+
+
+def _parse(expression):
+    import sympy
+    from sympy.parsing.sympy_parser import (
+        convert_xor, implicit_multiplication_application, parse_expr, standard_transformations,
+    )
+
+    # every letter is a variable, even the ones sympy's namespace defines, like N and S
+    names = {letter: sympy.Symbol(letter) for letter in string.ascii_letters}
+    names.update(e=sympy.E, ln=sympy.log, abs=sympy.Abs, pi=sympy.pi)
+    transformations = standard_transformations + (implicit_multiplication_application, convert_xor)
+    return parse_expr(expression, local_dict=names, transformations=transformations)
+
+
+def _variable(expr):
+    symbols = sorted(expr.free_symbols, key=str)
+    names = [str(symbol) for symbol in symbols]
+    if 'x' in names:
+        return symbols[names.index('x')]
+    if symbols:
+        return symbols[0]
+    raise MathError("The expression has no variable.")
+
+
+def _compute(operation, expression):
+    import sympy
+
+    expr = _parse(expression)
+    if operation == 'factor':
+        result = sympy.factor(expr)
+    elif operation == 'derive':
+        result = sympy.diff(expr, _variable(expr))
+    elif operation == 'integrate':
+        result = sympy.integrate(expr, _variable(expr))
+    elif operation == 'zeroes':
+        return ', '.join(_format(zero) for zero in sympy.solve(expr, _variable(expr))) or 'No zeroes.'
+    elif operation == 'simplify':
+        result = sympy.simplify(expr)
+    elif operation == 'evaluate':
+        if expr.free_symbols:
+            raise MathError("Only expressions without variables can be evaluated.")
+        result = sympy.N(expr, 15)
+    else:
+        raise MathError(f"Unknown operation `{operation}`.")
+    return _format(result)
+
+
+def _format(result):
+    return str(result).replace('**', '^')
+
+
+def _address_space():
+    # VmSize of this process, first field of /proc/self/statm in pages
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError):
+        return None
+
+
+def _raise_time_limit(signum, frame):
+    raise _TimeLimit()
+
+
+def solve(operation, expression, cpu_seconds=2.0, memory=256 * 2**20):
+    """``(True, result)`` of ``operation`` on a :func:`canonical` expression, or ``(False, reason)``.
+
+    Runs for at most ``cpu_seconds`` of CPU time and may allocate ``memory`` more bytes,
+    limits that apply to the whole process, so this is meant for a pool worker.
+    """
+    import sympy  # noqa: F401, a worker's first import shouldn't count against the time limit
+
+    limit = None
+    if resource is not None:
+        used = _address_space()
+        if used is not None:
+            limit = resource.getrlimit(resource.RLIMIT_AS)
+            resource.setrlimit(resource.RLIMIT_AS, (used + memory, limit[1]))
+
+    handler = signal.signal(signal.SIGPROF, _raise_time_limit)
+    signal.setitimer(signal.ITIMER_PROF, cpu_seconds)
+    try:
+        return True, _compute(operation, expression)
+    except _TimeLimit:
+        return False, "That took too long to calculate."
+    except MemoryError:
+        return False, "That needs too much memory to calculate."
+    except MathError as e:
+        return False, str(e)
+    except Exception:
+        return False, "Unable to perform calculation."
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, handler)
+        if limit is not None:
+            resource.setrlimit(resource.RLIMIT_AS, limit)
@@ -0,0 +1,115 @@
+"""Member cache policies and on-demand guild chunking."""
+
+import asyncio
+import time
+from collections import OrderedDict
+
+import discord
+
+POLICIES = ('all', 'voice', 'active')
+
+
+def cache_options(policy, intents):
+    """Client options for a member cache policy.
+
+    - all: cache every member, but only chunk a guild when a command needs it.
+    - voice: only cache members in voice channels.
+    - active: cache members in voice, new joiners and recent message authors, up to a size cap.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown member cache policy {policy!r}, expected one of {POLICIES}")
+
+    if policy == 'all':
+        flags = discord.MemberCacheFlags.from_intents(intents)
+    elif policy == 'voice':
+        flags = discord.MemberCacheFlags.none()
+        flags.voice = True
+    else:
+        flags = discord.MemberCacheFlags.none()
+        flags.voice = True
+        flags.joined = True
+    return {'member_cache_flags': flags, 'chunk_guilds_at_startup': False}
+
+
+class MemberCache:
+    """Applies the member cache policy and gives commands full member lists when they need one."""
+
+    def __init__(self, bot, policy='all', *, max_size=50000, snapshot_ttl=300.0, max_snapshots=8):
+        self.bot = bot
+        self.policy = policy
+        self.max_size = max_size
+        self.snapshot_ttl = snapshot_ttl
+        self.max_snapshots = max_snapshots
+        self.evictions = 0
+        self._recent = OrderedDict()  # (guild_id, member_id) -> None, least recent first
+        self._snapshots = OrderedDict()  # guild_id -> (fetched at, members)
+        self._locks = {}
+
+    def touch(self, member):
+        """Marks a member as recently active, evicting the least recent ones over the size cap."""
+        guild = member.guild
+        key = (guild.id, member.id)
+        if key in self._recent:
+            self._recent.move_to_end(key)
+            return
+
+        self._recent[key] = None
+        if guild.get_member(member.id) is None:
+            # discord.py has no public api for partially caching members
+            guild._add_member(member)
+        while len(self._recent) > self.max_size:
+            self._evict(*self._recent.popitem(last=False)[0])
+
+    def _evict(self, guild_id, member_id):
+        guild = self.bot.get_guild(guild_id)
+        member = guild and guild.get_member(member_id)
+        if member is None or member.voice is not None or member.id == self.bot.user.id:
+            return
+        guild._remove_member(member)
+        self.evictions += 1
+
+    def _trim(self, guild):
+        # the joined flag has discord.py cache every member it gets, guild creates and chunks included
+        for member in guild.members:
+            if (guild.id, member.id) not in self._recent and member.voice is None and member.id != self.bot.user.id:
+                guild._remove_member(member)
+
+    async def on_message(self, message):
+        if isinstance(message.author, discord.Member):
+            self.touch(message.author)
+
+    async def on_member_join(self, member):
+        self.touch(member)
+
+    async def on_guild_join(self, guild):
+        self._trim(guild)
+
+    async def on_guild_available(self, guild):
+        self._trim(guild)
+
+    async def members(self, guild):
+        """All members of a guild, chunking it on first use.
+
+        Under the partial policies the full list isn't cached, only kept for a few minutes
+        for a handful of guilds, so the policy's memory bound holds.
+        """
+        lock = self._locks.setdefault(guild.id, asyncio.Lock())
+        async with lock:
+            if self.policy == 'all':
+                if not guild.chunked:
+                    await guild.chunk()
+                return guild.members
+
+            snapshot = self._snapshots.get(guild.id)
+            if snapshot and time.monotonic() - snapshot[0] < self.snapshot_ttl:
+                self._snapshots.move_to_end(guild.id)
+                return snapshot[1]
+
+            members = await guild.chunk(cache=False)
+            if self.policy == 'active':
+                # discord.py caches chunks regardless when the joined flag is set
+                self._trim(guild)
+            self._snapshots[guild.id] = (time.monotonic(), members)
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+            return members
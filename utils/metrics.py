@@ -0,0 +1,136 @@
+"""In-process metrics: per-command counters and latency histograms in Prometheus text format."""
+
+import bisect
+import os
+import time
+from collections import defaultdict
+
+# upper bounds (seconds) of the histogram buckets, the last one catches everything
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class Histogram:
+    """Fixed bucket histogram, cheap enough to observe on every command."""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def percentile(self, q):
+        """Estimates the ``q`` (0-1) quantile by interpolating inside its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                lower = BUCKETS[index - 1] if index else 0.0
+                upper = BUCKETS[index] if index < len(BUCKETS) - 1 else lower
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return BUCKETS[-2]
+
+    def render(self, name, **labels):
+        cumulative = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            yield f"{name}_bucket{format_labels(**labels, le=le)} {cumulative}"
+        yield f"{name}_sum{format_labels(**labels)} {self.sum}"
+        yield f"{name}_count{format_labels(**labels)} {self.count}"
+
+
+class CommandStats:
+    __slots__ = ('invocations', 'errors', 'cooldowns', 'parse', 'check', 'callback')
+
+    PHASES = ('parse', 'check', 'callback')
+
+    def __init__(self):
+        self.invocations = 0
+        self.errors = 0
+        self.cooldowns = 0
+        self.parse = Histogram()
+        self.check = Histogram()
+        self.callback = Histogram()
+
+
+class Metrics:
+    """Registry of command statistics.
+
+    Other subsystems can add a collector, a callable returning Prometheus text lines,
+    to have their own metrics exported alongside.
+    """
+
+    def __init__(self, prefix='sneakyninja'):
+        self.prefix = prefix
+        self.started = time.time()
+        self.commands = defaultdict(CommandStats)
+        self.collectors = []
+
+    def record_invoke(self, ctx, start, end):
+        """Records a finished invocation. ``start`` and ``end`` wrap ``Command.invoke``."""
+        stats = self.commands[ctx.command.qualified_name]
+        stats.invocations += 1
+        stats.parse.observe(ctx.parsed_in)
+        if ctx.checked_at is None:
+            # failed before the callback, in checks or argument conversion
+            stats.check.observe(end - start)
+        else:
+            stats.check.observe(ctx.checked_at - start)
+            stats.callback.observe(end - ctx.checked_at)
+
+    def record_error(self, ctx):
+        if ctx.command is not None:
+            self.commands[ctx.command.qualified_name].errors += 1
+
+    def record_cooldown(self, ctx):
+        if ctx.command is not None:
+            self.commands[ctx.command.qualified_name].cooldowns += 1
+
+    def render(self):
+        p = self.prefix
+        lines = []
+        for metric, attr, description in (
+            ('command_invocations_total', 'invocations', 'Command invocations.'),
+            ('command_errors_total', 'errors', 'Command errors.'),
+            ('command_cooldowns_total', 'cooldowns', 'Commands rejected by the global cooldown.'),
+        ):
+            lines.append(f"# HELP {p}_{metric} {description}")
+            lines.append(f"# TYPE {p}_{metric} counter")
+            for name, stats in self.commands.items():
+                lines.append(f"{p}_{metric}{format_labels(command=name)} {getattr(stats, attr)}")
+
+        lines.append(f"# HELP {p}_command_duration_seconds Command latency by phase.")
+        lines.append(f"# TYPE {p}_command_duration_seconds histogram")
+        for name, stats in self.commands.items():
+            for phase in CommandStats.PHASES:
+                lines.extend(getattr(stats, phase).render(f"{p}_command_duration_seconds", command=name, phase=phase))
+
+        for collector in self.collectors:
+            lines.extend(collector())
+        lines.append('')
+        return '\n'.join(lines)
+
+    def write(self, path, text=None):
+        """Atomically writes the Prometheus text to ``path``. Blocking."""
+        text = self.render() if text is None else text
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
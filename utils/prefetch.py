@@ -0,0 +1,95 @@
+"""Background prefetching of random, interchangeable API results."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+from utils.metrics import Histogram, format_labels
+
+log = logging.getLogger(__name__)
+
+
+class PrefetchBuffer:
+    """Keeps up to ``size`` ready results of ``fetch`` and refills them in the background.
+
+    ``fetch`` is a coroutine function returning a result, or None if there's none to keep.
+    At most ``concurrency`` fetches run at once and refill rounds are ``interval`` seconds
+    apart, backing off while the upstream keeps failing.
+    """
+
+    def __init__(self, name, fetch, *, size=10, concurrency=2, interval=1.0, max_backoff=300.0):
+        self.name = name
+        self.fetch = fetch
+        self.size = size
+        self.concurrency = concurrency
+        self.interval = interval
+        self.max_backoff = max_backoff
+
+        self.refill_latency = Histogram()
+        self.failures = 0
+        self.fallbacks = 0
+        self._items = deque(maxlen=size)
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._refill_loop())
+        self._wakeup.set()
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def get(self):
+        """A buffered result, or a live fetch when the buffer is empty."""
+        self._wakeup.set()
+        if self._items:
+            return self._items.popleft()
+        self.fallbacks += 1
+        return await self.fetch()
+
+    async def _fetch_one(self):
+        start = time.perf_counter()
+        try:
+            result = await self.fetch()
+        except Exception as e:
+            log.debug('Prefetch of %s failed: %r', self.name, e)
+            result = None
+        self.refill_latency.observe(time.perf_counter() - start)
+        if result is None:
+            self.failures += 1
+            return False
+        self._items.append(result)
+        return True
+
+    async def _refill_loop(self):
+        delay = self.interval
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while len(self._items) < self.size:
+                missing = min(self.concurrency, self.size - len(self._items))
+                results = await asyncio.gather(*(self._fetch_one() for _ in range(missing)))
+                # back off exponentially while every fetch of a round fails
+                delay = self.interval if any(results) else min(delay * 2, self.max_backoff)
+                await asyncio.sleep(delay)
+
+
+def metrics(buffers):
+    """Prometheus lines of several buffers, each metric's TYPE once ahead of every buffer's series."""
+    buffers = list(buffers)
+    for metric, kind, value in (
+        ('depth', 'gauge', lambda buffer: len(buffer._items)),
+        ('failures_total', 'counter', lambda buffer: buffer.failures),
+        ('fallbacks_total', 'counter', lambda buffer: buffer.fallbacks),
+    ):
+        yield f'# TYPE sneakyninja_prefetch_{metric} {kind}'
+        for buffer in buffers:
+            yield f'sneakyninja_prefetch_{metric}{format_labels(source=buffer.name)} {value(buffer)}'
+    yield '# TYPE sneakyninja_prefetch_refill_seconds histogram'
+    for buffer in buffers:
+        yield from buffer.refill_latency.render('sneakyninja_prefetch_refill_seconds', source=buffer.name)
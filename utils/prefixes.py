@@ -0,0 +1,122 @@
+"""Per-guild command prefixes, cached in memory and kept in sync through LISTEN/NOTIFY."""
+
+import asyncio
+import logging
+
+log = logging.getLogger(__name__)
+
+# Table Schema
+# ------------
+# guild_prefixes(guild_id bigint PRIMARY KEY, prefixes text[]), every change is
+# announced on the 'guild_prefixes' channel with the guild id as payload (see manage.py)
+
+
+class PrefixCache:
+    """Resolves a message's prefixes without touching the database.
+
+    An instance is the bot's ``command_prefix``. Each guild's matcher, the mention
+    prefixes followed by its own prefixes longest first, is built once and reused.
+    When the listening connection drops, it reconnects and reloads every guild's prefixes.
+    """
+
+    CHANNEL = 'guild_prefixes'
+
+    def __init__(self, default):
+        self.default = (default,)
+        self._prefixes = {}
+        self._matchers = {}
+        self._mentions = None
+        self._pool = None
+        self._listener = None
+        self._reconnecting = None
+
+    def __call__(self, bot, message):
+        guild_id = message.guild.id if message.guild is not None else None
+        matcher = self._matchers.get(guild_id)
+        if matcher is None:
+            if self._mentions is None:
+                self._mentions = (f'<@{bot.user.id}> ', f'<@!{bot.user.id}> ')
+            prefixes = self._prefixes.get(guild_id, self.default)
+            # the longest prefix has to be tried first, or '!' would shadow '!!'
+            matcher = self._matchers[guild_id] = self._mentions + tuple(sorted(prefixes, key=len, reverse=True))
+        return matcher
+
+    def get(self, guild_id):
+        return self._prefixes.get(guild_id, self.default)
+
+    async def start(self, pool):
+        """Loads every guild's prefixes in bulk and starts listening for changes."""
+        self._pool = pool
+        await self._listen()
+
+    async def _listen(self):
+        # notifications sent while not listening are lost, so everything is reloaded
+        listener = await self._pool.acquire()
+        try:
+            await listener.add_listener(self.CHANNEL, self._on_notify)
+            listener.add_termination_listener(self._on_terminate)
+            rows = await listener.fetch("""SELECT guild_id, prefixes FROM guild_prefixes""")
+        except BaseException:
+            await self._pool.release(listener)
+            raise
+        self._listener = listener
+        self._prefixes = {row['guild_id']: tuple(row['prefixes']) for row in rows}
+        self._matchers.clear()
+
+    def _on_terminate(self, connection):
+        log.warning('Lost the connection listening for prefix changes, reconnecting')
+        listener, self._listener = self._listener, None
+        self._reconnecting = asyncio.ensure_future(self._reconnect(listener))
+
+    async def _reconnect(self, listener, max_delay=60.0):
+        try:
+            await self._pool.release(listener)
+        except Exception:
+            pass
+        delay = 1.0
+        while True:
+            try:
+                await self._listen()
+            except Exception:
+                log.warning('Listening for prefix changes failed, retrying in %.0fs', delay, exc_info=True)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, max_delay)
+            else:
+                log.info('Listening for prefix changes again')
+                return
+
+    async def close(self):
+        if self._reconnecting:
+            self._reconnecting.cancel()
+            self._reconnecting = None
+        if self._listener:
+            self._listener.remove_termination_listener(self._on_terminate)
+            await self._listener.remove_listener(self.CHANNEL, self._on_notify)
+            await self._pool.release(self._listener)
+            self._listener = None
+
+    def _invalidate(self, guild_id, prefixes):
+        if prefixes:
+            self._prefixes[guild_id] = tuple(prefixes)
+        else:
+            self._prefixes.pop(guild_id, None)
+        self._matchers.pop(guild_id, None)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        asyncio.ensure_future(self.refresh(int(payload)))
+
+    async def refresh(self, guild_id):
+        prefixes = await self._pool.fetchval("""SELECT prefixes FROM guild_prefixes WHERE guild_id=$1""", guild_id)
+        self._invalidate(guild_id, prefixes)
+
+    async def set(self, guild_id, prefixes):
+        """Stores a guild's prefixes, an empty list resets them to the default."""
+        if prefixes:
+            await self._pool.execute(
+                """INSERT INTO guild_prefixes(guild_id, prefixes) VALUES($1, $2)
+                ON CONFLICT (guild_id) DO UPDATE SET prefixes = $2""", guild_id, list(prefixes)
+            )
+        else:
+            await self._pool.execute("""DELETE FROM guild_prefixes WHERE guild_id=$1""", guild_id)
+        # the notification will refresh it again, but this process shouldn't wait for it
+        self._invalidate(guild_id, prefixes)
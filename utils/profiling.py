@@ -0,0 +1,133 @@
+"""Profiling of a single command invocation, for the owner's profile command."""
+
+import asyncio
+import contextvars
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+# the awaited time per kind of the invocation being profiled, None outside of it
+_awaited = contextvars.ContextVar('awaited', default=None)
+
+
+def _timed(kind, func):
+    async def wrapper(*args, **kwargs):
+        awaited = _awaited.get()
+        if awaited is None:
+            return await func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            awaited[kind][0] += 1
+            awaited[kind][1] += time.perf_counter() - start
+    return wrapper
+
+
+class StackSampler(threading.Thread):
+    """Samples a thread's stack every ``interval`` seconds, counting collapsed stacks."""
+
+    def __init__(self, thread_id, interval=0.005):
+        super().__init__(name='stack-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{code.co_filename}:{code.co_name}')
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def collapsed(self):
+        """The samples in the collapsed format flamegraph.pl and speedscope read."""
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
+
+
+class ProfileResult:
+    __slots__ = ('wall', 'cpu', 'awaited', 'stats', 'stacks')
+
+    def __init__(self, wall, cpu, awaited, stats, stacks):
+        self.wall = wall
+        self.cpu = cpu
+        self.awaited = awaited
+        self.stats = stats
+        self.stacks = stacks
+
+    def summary(self):
+        lines = [f"wall {self.wall * 1000:.1f}ms, cpu {self.cpu * 1000:.1f}ms"]
+        for kind, (count, seconds) in self.awaited.items():
+            lines.append(f"{kind}: {count} calls, {seconds * 1000:.1f}ms awaited")
+        return '\n'.join(lines)
+
+    def table(self, top=30, sort='cumulative'):
+        stream = io.StringIO()
+        stats = pstats.Stats(self.stats, stream=stream)
+        stats.sort_stats(sort).print_stats(top)
+        return stream.getvalue()
+
+
+_lock = asyncio.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Another invocation is being profiled, profiles don't nest."""
+
+
+def is_running():
+    return _lock.locked()
+
+
+async def profile_invocation(bot, ctx, *, sample=False):
+    """Invokes ``ctx`` under cProfile and returns a :class:`ProfileResult`.
+
+    Awaits of the discord REST client and of ``bot.http_client`` made by the invocation
+    are timed separately. cProfile and the CPU time see the whole event loop thread,
+    so other commands running meanwhile show up too. Raises ProfilerBusy rather than
+    waiting when another profile is running.
+    """
+    if _lock.locked():
+        raise ProfilerBusy('a profile is already running')
+    async with _lock:
+        http, http_client = bot.http, bot.http_client
+        http.request = _timed('discord', http.request)
+        http_client.fetch = _timed('http', http_client.fetch)
+        awaited = {'discord': [0, 0.0], 'http': [0, 0.0]}
+        token = _awaited.set(awaited)
+
+        sampler = StackSampler(threading.get_ident()) if sample else None
+        profile = cProfile.Profile()
+        try:
+            if sampler:
+                sampler.start()
+            cpu, wall = time.thread_time(), time.perf_counter()
+            profile.enable()
+            try:
+                await bot.invoke(ctx)
+            finally:
+                profile.disable()
+                wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+                if sampler:
+                    sampler.stop()
+        finally:
+            _awaited.reset(token)
+            # the instance attributes shadowed the methods
+            del http.request
+            del http_client.fetch
+
+    stacks = sampler.collapsed() if sampler else None
+    return ProfileResult(wall, cpu, awaited, profile, stacks)
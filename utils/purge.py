@@ -0,0 +1,294 @@
+"""Streaming message purge, with history, filtering and deletion running as pipeline stages."""
+
+import asyncio
+import time
+
+import discord
+
+# bulk delete refuses messages older than two weeks, with a minute to spare for the request
+BULK_MAX_AGE = 14 * 24 * 60 * 60 - 60
+BULK_SIZE = 100
+
+
+def bulk_cutoff():
+    """The smallest message ID bulk delete still accepts."""
+    return int((time.time() - BULK_MAX_AGE) * 1000 - discord.utils.DISCORD_EPOCH) << 22
+
+
+class RateLimiter:
+    """Lets at most ``rate`` requests start per ``per`` seconds, across everything sharing it.
+
+    Meant to keep purges under discord's global limit, the per route limits are left to
+    discord.py. Callers are admitted in order, each reserving the next free slot.
+    """
+
+    def __init__(self, rate, per=1.0):
+        self.per = per
+        self.interval = per / rate
+        self._next = 0.0  # when the slot after the last reserved one frees up
+
+    async def acquire(self):
+        now = time.monotonic()
+        self._next = max(self._next, now) + self.interval
+        delay = self._next - self.per - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def _report(purge, progress, interval):
+    reported = None
+    while True:
+        await asyncio.sleep(interval)
+        current = (purge.scanned, purge.deleted)
+        if current != reported:
+            reported = current
+            await progress(purge)
+
+
+class Purge:
+    """Deletes the messages of ``channel`` matching ``check`` among its ``limit`` newest.
+
+    History is paged, filtered and deleted concurrently, connected by bounded queues,
+    so fetching the next page never waits for a delete and the other way around. Recent
+    messages are bulk deleted by the hundred, older ones one at a time, each on its own
+    rate limit route, which discord.py waits on per route. The messages older than two
+    weeks are read by a second history stream from the cutoff, started once the first
+    one reaches it with some of the limit left, so it runs while the bulk deletes are
+    still catching up. ``before`` and ``after`` bound the purged messages, exclusive
+    like ``history``'s. Every request also waits on ``limiter``, a :class:`RateLimiter`,
+    when one is given.
+    """
+
+    def __init__(self, channel, *, limit, check=None, before=None, after=None, limiter=None,
+                 queue_size=500, linger=1.0):
+        self.channel = channel
+        self.limit = limit
+        self.check = check
+        self.before = before
+        self.after = after
+        self.limiter = limiter
+        self.linger = linger
+        self.scanned = 0
+        self.matched = 0
+        self.deleted = 0
+        self.done = False
+        self._fetched = asyncio.Queue(queue_size)
+        self._fetched_old = asyncio.Queue(queue_size)
+        self._old_limit = 0  # what the recent stream left of the limit at the cutoff
+        self._recent_read = asyncio.Event()
+        self._bulk = asyncio.Queue(queue_size)
+        self._single = asyncio.Queue(queue_size)
+
+    def __str__(self):
+        state = 'Purged' if self.done else 'Purging...'
+        return f"{state} {self.deleted} of {self.matched} matching messages, {self.scanned} scanned."
+
+    async def run(self, progress=None, interval=5.0):
+        """Runs the purge, calling the ``progress`` coroutine function with itself every ``interval`` seconds."""
+        cutoff = bulk_cutoff()
+        split = (self.before is None or self.before.id > cutoff) and (self.after is None or self.after.id < cutoff)
+        stages = [self._fetch(cutoff if split else None), self._filter(), self._delete_bulk()]
+        if split:
+            stages += [self._fetch_old(cutoff), self._filter_old()]
+        stages.append(self._delete_single(2 if split else 1))
+        stages = [asyncio.ensure_future(stage) for stage in stages]
+        reporter = asyncio.ensure_future(_report(self, progress, interval)) if progress else None
+        try:
+            await asyncio.gather(*stages)
+        finally:
+            for task in stages:
+                task.cancel()
+            if reporter:
+                reporter.cancel()
+            self.done = True
+        return self
+
+    async def _request(self):
+        if self.limiter is not None:
+            await self.limiter.acquire()
+
+    async def _read(self, history, queue, cutoff=None):
+        # history fetches the next page once the last one is consumed, which
+        # the queue lets happen while the deletes are still catching up
+        fetched = 0
+        while True:
+            # pages are of 100 messages until the last one
+            if fetched % 100 == 0:
+                await self._request()
+            try:
+                message = await history.next()
+            except discord.NoMoreItems:
+                break
+            if self.after and message.id <= self.after.id:
+                break
+            if cutoff is not None and message.id < cutoff:
+                self._old_limit = self.limit - fetched
+                break
+            fetched += 1
+            await queue.put(message)
+        await queue.put(None)
+
+    async def _fetch(self, cutoff):
+        # the recent stream, down to the cutoff when the old stream reads the rest
+        history = self.channel.history(limit=self.limit, before=self.before, oldest_first=False)
+        try:
+            await self._read(history, self._fetched, cutoff)
+        finally:
+            self._recent_read.set()
+
+    async def _fetch_old(self, cutoff):
+        # old messages are only among the limit newest past every recent one
+        await self._recent_read.wait()
+        if not self._old_limit:
+            await self._fetched_old.put(None)
+            return
+        history = self.channel.history(limit=self._old_limit, before=discord.Object(cutoff), oldest_first=False)
+        await self._read(history, self._fetched_old)
+
+    async def _sort(self, message):
+        self.scanned += 1
+        if self.check is not None and not self.check(message):
+            return
+        self.matched += 1
+        queue = self._bulk if message.id >= bulk_cutoff() else self._single
+        await queue.put(message)
+
+    async def _filter(self):
+        while True:
+            message = await self._fetched.get()
+            if message is None:
+                break
+            await self._sort(message)
+        await self._bulk.put(None)
+        await self._single.put(None)
+
+    async def _filter_old(self):
+        while True:
+            message = await self._fetched_old.get()
+            if message is None:
+                break
+            await self._sort(message)
+        await self._single.put(None)
+
+    async def _delete_bulk(self):
+        finished = False
+        while not finished:
+            message = await self._bulk.get()
+            if message is None:
+                return
+            batch = [message]
+            # fewer, fuller requests, as long as the first message doesn't wait too long
+            deadline = time.monotonic() + self.linger
+            while len(batch) < BULK_SIZE:
+                try:
+                    message = await asyncio.wait_for(self._bulk.get(), deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                if message is None:
+                    finished = True
+                    break
+                batch.append(message)
+
+            cutoff = bulk_cutoff()
+            expired = [message for message in batch if message.id < cutoff]
+            batch = [message for message in batch if message.id >= cutoff]
+            if len(batch) > 1:
+                await self._request()
+                try:
+                    await self.channel.delete_messages(batch)
+                    self.deleted += len(batch)
+                except discord.NotFound:
+                    pass
+            else:
+                expired.extend(batch)
+            for message in expired:
+                await self._delete(message)
+
+    async def _delete_single(self, producers):
+        while producers:
+            message = await self._single.get()
+            if message is None:
+                producers -= 1
+            else:
+                await self._delete(message)
+
+    async def _delete(self, message):
+        await self._request()
+        try:
+            await message.delete()
+        except discord.NotFound:
+            return
+        self.deleted += 1
+
+
+class MultiPurge:
+    """:class:`Purge` of several channels, ``concurrency`` of them at a time.
+
+    ``kwargs`` are passed to every channel's purge, share a ``limiter`` between them to
+    stay under the global rate limit. A channel failing doesn't stop the others, its
+    error is kept in ``errors``.
+    """
+
+    def __init__(self, channels, *, concurrency=8, **kwargs):
+        self.purges = [Purge(channel, **kwargs) for channel in channels]
+        self.concurrency = concurrency
+        self.errors = {}  # channel: exception
+        self.finished = 0
+
+    @property
+    def scanned(self):
+        return sum(purge.scanned for purge in self.purges)
+
+    @property
+    def matched(self):
+        return sum(purge.matched for purge in self.purges)
+
+    @property
+    def deleted(self):
+        return sum(purge.deleted for purge in self.purges)
+
+    def __str__(self):
+        state = 'Purged' if self.finished == len(self.purges) else 'Purging...'
+        return (
+            f"{state} {self.finished}/{len(self.purges)} channels done, "
+            f"{self.deleted} of {self.matched} matching messages, {self.scanned} scanned."
+        )
+
+    def summary(self, limit=20):
+        """Per channel results, the channels with the most deleted first."""
+        purges = sorted(self.purges, key=lambda purge: (purge.channel not in self.errors, -purge.deleted))
+        lines, untouched = [], 0
+        for purge in purges:
+            error = self.errors.get(purge.channel)
+            if error is not None:
+                lines.append(f"{purge.channel.mention}: failed, {error.text or error.status}")
+            elif purge.matched:
+                lines.append(f"{purge.channel.mention}: {purge.deleted} deleted, {purge.scanned} scanned")
+            else:
+                untouched += 1
+        if len(lines) > limit:
+            lines[limit:] = [f"...and {len(lines) - limit} more channels."]
+        if untouched:
+            lines.append(f"{untouched} channels had nothing to purge.")
+        return '\n'.join([str(self), *lines])
+
+    async def run(self, progress=None, interval=5.0):
+        """Runs the purges, calling the ``progress`` coroutine function with itself every ``interval`` seconds."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(purge):
+            async with semaphore:
+                try:
+                    await purge.run()
+                except discord.HTTPException as e:
+                    self.errors[purge.channel] = e
+                finally:
+                    self.finished += 1
+
+        reporter = asyncio.ensure_future(_report(self, progress, interval)) if progress else None
+        try:
+            await asyncio.gather(*(run(purge) for purge in self.purges))
+        finally:
+            if reporter:
+                reporter.cancel()
+        return self
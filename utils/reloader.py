@@ -0,0 +1,276 @@
+"""Hot reloading of changed cogs and utils modules, in dependency order."""
+
+import ast
+import asyncio
+import ctypes
+import importlib
+import logging
+import os
+import struct
+import sys
+import time
+
+log = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# inotify(7) events of a file being written or replaced
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_EVENT = struct.Struct('iIII')
+
+
+class ReloadError(Exception):
+    """Reloading ``module`` failed, every module reloaded before it was rolled back."""
+
+    def __init__(self, module, original):
+        self.module = module
+        self.original = original
+        super().__init__(f'Reloading {module} failed, nothing was reloaded: {original!r}')
+
+
+def imported_modules(module):
+    """Names of the modules ``module``'s source imports, read with ast."""
+    path = getattr(module, '__file__', None)
+    if not path:
+        return set()
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+
+    names = set()
+    package = module.__name__ if hasattr(module, '__path__') else module.__name__.rpartition('.')[0]
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ''
+            if node.level:
+                parent = package.rsplit('.', node.level - 1)[0] if node.level > 1 else package
+                base = f'{parent}.{base}' if base else parent
+            names.add(base)
+            # from package import submodule
+            names.update(f'{base}.{alias.name}' for alias in node.names)
+    return names
+
+
+class _Inotify:
+    """Wakes an asyncio.Event when a .py file in a watched directory is written. Linux only."""
+
+    def __init__(self, loop, directories, event):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        for directory in directories:
+            if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {directory}')
+        self.loop = loop
+        self.event = event
+        loop.add_reader(self.fd, self._read)
+
+    def _read(self):
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = _IN_EVENT.unpack_from(data, offset)
+            name = data[offset + _IN_EVENT.size:offset + _IN_EVENT.size + length].rstrip(b'\0')
+            offset += _IN_EVENT.size + length
+            if name.endswith(b'.py'):
+                self.event.set()
+
+    def close(self):
+        self.loop.remove_reader(self.fd)
+        os.close(self.fd)
+
+
+class HotReloader:
+    """Reloads the changed modules of ``packages`` and every loaded module depending on them.
+
+    Extensions are reloaded through ``bot.reload_extension``, other modules with
+    importlib.reload, dependencies before their dependents. When one fails, the modules
+    reloaded before it are rolled back to their previous code, so a change is applied
+    entirely or not at all. :meth:`watch` does this whenever a file changes, woken by
+    inotify where it's available and polling every ``interval`` seconds otherwise.
+    """
+
+    def __init__(self, bot, *, packages=('cogs', 'utils'), interval=1.0, debounce=0.3):
+        self.bot = bot
+        self.packages = packages
+        self.interval = interval
+        self.debounce = debounce
+        self._mtimes = self._scan()
+        self._task = None
+
+    def _scan(self):
+        mtimes = {}
+        for package in self.packages:
+            directory = os.path.join(ROOT, package)
+            for filename in os.listdir(directory):
+                if filename.endswith('.py'):
+                    name = package if filename == '__init__.py' else f'{package}.{filename[:-3]}'
+                    mtimes[name] = os.stat(os.path.join(directory, filename)).st_mtime_ns
+        return mtimes
+
+    def _loaded(self):
+        return {
+            name: module for name, module in list(sys.modules.items())
+            if module is not None and name.partition('.')[0] in self.packages and name not in self.packages
+        }
+
+    def changed(self):
+        """Loaded modules whose file changed since they were last (re)loaded."""
+        mtimes = self._scan()
+        loaded = self._loaded()
+        return [name for name, mtime in mtimes.items() if name in loaded and self._mtimes.get(name) != mtime]
+
+    def pinned(self):
+        """Modules the bot holds instances of, directly or in a container attribute.
+
+        Reloading one would leave those instances on the old code, raising exception
+        classes the reloaded cogs no longer catch, so :meth:`reload` refuses to.
+        """
+        modules = set()
+        for value in vars(self.bot).values():
+            if isinstance(value, dict):
+                values = value.values()
+            elif isinstance(value, (list, tuple, set)):
+                values = value
+            else:
+                values = (value,)
+            modules.update(type(item).__module__ for item in values)
+        loaded = self._loaded()
+        return {name for name in modules if name in loaded and name not in self.bot.extensions}
+
+    def plan(self, names):
+        """``names`` and the loaded modules depending on them, dependencies first."""
+        loaded = self._loaded()
+        dependents = {name: set() for name in loaded}
+        for name, module in loaded.items():
+            for dependency in imported_modules(module) & loaded.keys():
+                dependents[dependency].add(name)
+
+        affected = set()
+        pending = [name for name in names if name in loaded]
+        while pending:
+            name = pending.pop()
+            if name not in affected:
+                affected.add(name)
+                pending.extend(dependents[name])
+
+        # depth first, a module comes after everything it imports
+        order, visiting = [], set()
+        imports = {name: imported_modules(loaded[name]) & affected for name in affected}
+
+        def visit(name):
+            if name in order or name in visiting:
+                return  # done, or an import cycle
+            visiting.add(name)
+            for dependency in sorted(imports[name]):
+                visit(dependency)
+            visiting.discard(name)
+            order.append(name)
+
+        for name in sorted(affected):
+            visit(name)
+        # modules that are neither an extension nor imported by one, like a lazy extension
+        # that was imported but not loaded yet, get imported fresh when they're needed
+        return [name for name in order if name in self.bot.extensions or name.startswith('utils.')]
+
+    def reload(self, names):
+        """Reloads ``names`` and their dependents. Returns ``(module, seconds)`` pairs in reload order.
+
+        Raises ReloadError after rolling back if any of them fails to compile or load, and
+        before reloading anything if one of them is :meth:`pinned`.
+        """
+        order = self.plan(names)
+        loaded = self._loaded()
+        self._mtimes.update((name, mtime) for name, mtime in self._scan().items() if name in names)
+
+        pinned = [name for name in order if name in self.pinned()]
+        if pinned:
+            error = RuntimeError(f"the bot holds instances of {', '.join(pinned)}, restart to apply the change")
+            raise ReloadError(pinned[0], error)
+
+        # syntax errors are caught before anything is touched
+        for name in order:
+            path = loaded[name].__file__
+            try:
+                with open(path, encoding='utf-8') as f:
+                    compile(f.read(), path, 'exec')
+            except (SyntaxError, OSError) as e:
+                raise ReloadError(name, e) from e
+
+        snapshots, extensions, timings = {}, [], []
+        for name in order:
+            start = time.perf_counter()
+            try:
+                if name in self.bot.extensions:
+                    previous = self.bot.extensions[name]
+                    # reverts itself when it fails
+                    self.bot.reload_extension(name)
+                    extensions.append((name, previous))
+                else:
+                    module = sys.modules[name]
+                    snapshots[name] = dict(module.__dict__)
+                    importlib.reload(module)
+            except Exception as e:
+                self._rollback(snapshots, extensions)
+                raise ReloadError(name, e) from e
+            timings.append((name, time.perf_counter() - start))
+        return timings
+
+    def _rollback(self, snapshots, extensions):
+        # new extension code unloads with the new utils, the old one loads with the old utils
+        for name, _ in reversed(extensions):
+            self.bot.unload_extension(name)
+        for name, snapshot in snapshots.items():
+            namespace = sys.modules[name].__dict__
+            namespace.clear()
+            namespace.update(snapshot)
+        for name, previous in extensions:
+            self.bot.restore_extension(name, previous)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self.watch())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def watch(self):
+        loop = asyncio.get_event_loop()
+        changed = asyncio.Event()
+        try:
+            inotify = _Inotify(loop, [os.path.join(ROOT, package) for package in self.packages], changed)
+        except (OSError, AttributeError):
+            # not linux, polling it is
+            inotify = None
+
+        try:
+            while True:
+                if inotify:
+                    await changed.wait()
+                    changed.clear()
+                    # editors write a file in several steps
+                    await asyncio.sleep(self.debounce)
+                else:
+                    await asyncio.sleep(self.interval)
+
+                names = self.changed()
+                if not names:
+                    continue
+                try:
+                    timings = self.reload(names)
+                except ReloadError as e:
+                    log.warning('%s', e, exc_info=e.original)
+                else:
+                    log.info('Reloaded %s', ', '.join(f'{name} ({seconds * 1000:.1f}ms)' for name, seconds in timings))
+        finally:
+            if inotify:
+                inotify.close()
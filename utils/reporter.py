@@ -0,0 +1,115 @@
+"""Aggregated error reporting to the logging webhook."""
+
+import hashlib
+import logging
+import os
+import traceback
+from collections import deque
+
+import discord
+
+log = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the bot's own code, as opposed to discord.py's, aiohttp's or asyncpg's
+OWN_CODE = tuple(os.path.join(ROOT, path) for path in ('cogs' + os.sep, 'utils' + os.sep, 'bot.py'))
+
+# discord's limits for a single webhook message
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+
+
+class ErrorEntry:
+    __slots__ = ('fingerprint', 'title', 'traceback', 'context', 'timestamp')
+
+    def __init__(self, fingerprint, title, traceback, context, timestamp):
+        self.fingerprint = fingerprint
+        self.title = title
+        self.traceback = traceback
+        self.context = context
+        self.timestamp = timestamp
+
+
+class ErrorReporter:
+    """Collects unexpected command errors and sends them to the webhook in summarized batches.
+
+    Errors are fingerprinted by exception type and the innermost line of the bot's own
+    code they went through, so a broken upstream produces one embed with a count instead
+    of one embed per error.
+    The full tracebacks of the last ``history`` errors are kept for lookup by fingerprint.
+    """
+
+    def __init__(self, bot, *, history=100):
+        self.bot = bot
+        self.recent = deque(maxlen=history)
+        self.totals = {}
+        self._pending = {}  # fingerprint -> [first entry, count]
+
+    @staticmethod
+    def fingerprint(error):
+        frames = traceback.extract_tb(error.__traceback__)
+        # errors raised in a library would all share its frame, whatever code of ours called it
+        own = [frame for frame in frames if os.path.abspath(frame.filename).startswith(OWN_CODE)]
+        frame = (own or frames)[-1] if frames else None
+        location = f'{frame.filename}:{frame.lineno}' if frame else ''
+        key = f'{type(error).__module__}.{type(error).__qualname__}@{location}'
+        return hashlib.sha1(key.encode()).hexdigest()[:10]
+
+    def report(self, ctx, error):
+        fingerprint = self.fingerprint(error)
+        tb = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+        cog = ctx.cog.qualified_name if ctx.cog else None
+        context = (
+            f"Author: {ctx.author} [{ctx.author.id}]\n"
+            f"Guild: {ctx.guild} [{getattr(ctx.guild, 'id', None)}]\n"
+            f"Channel: {ctx.channel} [{ctx.channel.id}]"
+        )
+        entry = ErrorEntry(fingerprint, f"`{cog}`.`{ctx.command}`", tb, context, ctx.timenow())
+
+        self.recent.append(entry)
+        self.totals[fingerprint] = self.totals.get(fingerprint, 0) + 1
+        if fingerprint in self._pending:
+            self._pending[fingerprint][1] += 1
+        else:
+            self._pending[fingerprint] = [entry, 1]
+        return fingerprint
+
+    def lookup(self, fingerprint):
+        """Most recent stored error with this fingerprint (or its prefix)."""
+        for entry in reversed(self.recent):
+            if entry.fingerprint.startswith(fingerprint):
+                return entry
+
+    def _make_embed(self, entry, count):
+        tb = entry.traceback
+        if len(tb) > 400:
+            tb = '...' + tb[-400:]  # the end of a traceback is what tells what broke
+        embed = discord.Embed(
+            title=f"{count}x Exception in {entry.title}"[:256],
+            description=f"```py\n{tb}```",
+            colour=discord.Colour.red(),
+            timestamp=entry.timestamp,
+        )
+        embed.add_field(name='First occurrence', value=entry.context)
+        embed.set_footer(text=f"fingerprint {entry.fingerprint} | total {self.totals[entry.fingerprint]}")
+        return embed
+
+    async def flush(self):
+        """Sends every pending fingerprint's summary, batching embeds into as few messages as possible."""
+        pending, self._pending = self._pending, {}
+        batch, size = [], 0
+        for entry, count in pending.values():
+            embed = self._make_embed(entry, count)
+            if batch and (len(batch) == MAX_EMBEDS or size + len(embed) > MAX_EMBED_CHARS):
+                await self._send(batch)
+                batch, size = [], 0
+            batch.append(embed)
+            size += len(embed)
+        if batch:
+            await self._send(batch)
+
+    async def _send(self, embeds):
+        try:
+            await self.bot.webhook_log(embeds=embeds, username_plus=" [Error]")
+        except discord.HTTPException as e:
+            log.error('Failed to send %d error embeds: %s', len(embeds), e)
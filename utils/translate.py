@@ -0,0 +1,166 @@
+"""Asyncio Google Translate client, batching concurrent translations into one request."""
+
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from utils.cache import normalize
+from utils.http import UpstreamError
+from utils.metrics import Histogram
+
+API_URL = 'https://translate.googleapis.com/translate_a/t'
+
+LANGUAGES = {
+    'af': 'afrikaans', 'sq': 'albanian', 'am': 'amharic', 'ar': 'arabic', 'hy': 'armenian',
+    'az': 'azerbaijani', 'eu': 'basque', 'be': 'belarusian', 'bn': 'bengali', 'bs': 'bosnian',
+    'bg': 'bulgarian', 'ca': 'catalan', 'ceb': 'cebuano', 'ny': 'chichewa', 'zh-cn': 'chinese (simplified)',
+    'zh-tw': 'chinese (traditional)', 'co': 'corsican', 'hr': 'croatian', 'cs': 'czech', 'da': 'danish',
+    'nl': 'dutch', 'en': 'english', 'eo': 'esperanto', 'et': 'estonian', 'tl': 'filipino',
+    'fi': 'finnish', 'fr': 'french', 'fy': 'frisian', 'gl': 'galician', 'ka': 'georgian',
+    'de': 'german', 'el': 'greek', 'gu': 'gujarati', 'ht': 'haitian creole', 'ha': 'hausa',
+    'haw': 'hawaiian', 'iw': 'hebrew', 'he': 'hebrew', 'hi': 'hindi', 'hmn': 'hmong',
+    'hu': 'hungarian', 'is': 'icelandic', 'ig': 'igbo', 'id': 'indonesian', 'ga': 'irish',
+    'it': 'italian', 'ja': 'japanese', 'jw': 'javanese', 'kn': 'kannada', 'kk': 'kazakh',
+    'km': 'khmer', 'ko': 'korean', 'ku': 'kurdish (kurmanji)', 'ky': 'kyrgyz', 'lo': 'lao',
+    'la': 'latin', 'lv': 'latvian', 'lt': 'lithuanian', 'lb': 'luxembourgish', 'mk': 'macedonian',
+    'mg': 'malagasy', 'ms': 'malay', 'ml': 'malayalam', 'mt': 'maltese', 'mi': 'maori',
+    'mr': 'marathi', 'mn': 'mongolian', 'my': 'myanmar (burmese)', 'ne': 'nepali', 'no': 'norwegian',
+    'or': 'odia', 'ps': 'pashto', 'fa': 'persian', 'pl': 'polish', 'pt': 'portuguese',
+    'pa': 'punjabi', 'ro': 'romanian', 'ru': 'russian', 'sm': 'samoan', 'gd': 'scots gaelic',
+    'sr': 'serbian', 'st': 'sesotho', 'sn': 'shona', 'sd': 'sindhi', 'si': 'sinhala',
+    'sk': 'slovak', 'sl': 'slovenian', 'so': 'somali', 'es': 'spanish', 'su': 'sundanese',
+    'sw': 'swahili', 'sv': 'swedish', 'tg': 'tajik', 'ta': 'tamil', 'te': 'telugu',
+    'th': 'thai', 'tr': 'turkish', 'uk': 'ukrainian', 'ur': 'urdu', 'ug': 'uyghur',
+    'uz': 'uzbek', 'vi': 'vietnamese', 'cy': 'welsh', 'xh': 'xhosa', 'yi': 'yiddish',
+    'yo': 'yoruba', 'zu': 'zulu',
+}
+LANGCODES = {name: code for code, name in LANGUAGES.items()}
+
+
+def language_code(language):
+    """The code of a language given by code or english name, ValueError if it's unknown."""
+    language = language.lower().replace('_', '-')
+    if language in LANGUAGES:
+        return language
+    if language in LANGCODES:
+        return LANGCODES[language]
+    raise ValueError('invalid destination language')
+
+
+class Translation:
+    __slots__ = ('src', 'dest', 'origin', 'text')
+
+    def __init__(self, src, dest, origin, text):
+        self.src = src
+        self.dest = dest
+        self.origin = origin
+        self.text = text
+
+
+class Translator:
+    """Translates through the bot's HTTP client and response cache.
+
+    Translations to the same language requested within ``window`` seconds of each
+    other are sent together, in one request of at most ``batch_size`` texts and
+    ``batch_chars`` characters.
+    """
+
+    def __init__(self, http_client, cache, *, api_url=API_URL, batch_size=32, batch_chars=4000, window=0.02):
+        self.http_client = http_client
+        self.cache = cache
+        self.api_url = api_url
+        self.host = urlsplit(api_url).hostname
+        self.batch_size = batch_size
+        self.batch_chars = batch_chars
+        self.window = window
+
+        self.latency = Histogram()
+        self.requests = 0
+        self.batches = 0
+        self.batched_texts = 0
+        # dest -> [(text, future)], its character count and flush timer
+        self._pending = {}
+        self._pending_chars = {}
+        self._timers = {}
+
+    async def translate(self, text, dest='en'):
+        """Auto-detects ``text``'s language and translates it to ``dest``, a code or language name."""
+        dest = language_code(dest)
+        self.requests += 1
+        start = time.perf_counter()
+        try:
+            translated, src = await self.cache.get('translate', (normalize(text), dest), lambda: self._enqueue(text, dest))
+        finally:
+            self.latency.observe(time.perf_counter() - start)
+        return Translation(src, dest, text, translated)
+
+    def _enqueue(self, text, dest):
+        future = asyncio.get_event_loop().create_future()
+        pending = self._pending.setdefault(dest, [])
+        # a text that doesn't fit goes in the next batch
+        if pending and self._pending_chars[dest] + len(text) > self.batch_chars:
+            self._flush(dest)
+            pending = self._pending.setdefault(dest, [])
+
+        pending.append((text, future))
+        self._pending_chars[dest] = self._pending_chars.get(dest, 0) + len(text)
+        if len(pending) >= self.batch_size:
+            self._flush(dest)
+        elif dest not in self._timers:
+            self._timers[dest] = asyncio.get_event_loop().call_later(self.window, self._flush, dest)
+        return future
+
+    def _flush(self, dest):
+        timer = self._timers.pop(dest, None)
+        if timer is not None:
+            timer.cancel()
+        self._pending_chars.pop(dest, None)
+        batch = self._pending.pop(dest, None)
+        if batch:
+            asyncio.ensure_future(self._send(dest, batch))
+
+    async def _send(self, dest, batch):
+        self.batches += 1
+        self.batched_texts += len(batch)
+        params = {'client': 'gtx', 'sl': 'auto', 'tl': dest}
+        try:
+            resp = await self.http_client.fetch(
+                'POST', self.api_url, params=params, data=[('q', text) for text, _ in batch]
+            )
+            if resp.status != 200:
+                raise UpstreamError(self.host, None, "Sorry, the translation failed, try again later.")
+            results = self._parse(resp.data, len(batch))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _parse(self, data, count):
+        """(translated text, source language) pairs of a response to ``count`` texts."""
+        # a single text comes back unwrapped
+        if count == 1 and data and not isinstance(data[0], list):
+            data = [data]
+        results = []
+        for item in data:
+            if isinstance(item, str):
+                results.append((item, None))
+            else:
+                results.append((item[0], item[1].lower() if len(item) > 1 else None))
+        if len(results) != count:
+            raise UpstreamError(self.host, None, "Sorry, the translation failed, try again later.")
+        return results
+
+    def metrics(self):
+        yield '# TYPE sneakyninja_translate_requests_total counter'
+        yield f'sneakyninja_translate_requests_total {self.requests}'
+        yield '# TYPE sneakyninja_translate_batches_total counter'
+        yield f'sneakyninja_translate_batches_total {self.batches}'
+        yield '# TYPE sneakyninja_translate_batched_texts_total counter'
+        yield f'sneakyninja_translate_batched_texts_total {self.batched_texts}'
+        yield '# TYPE sneakyninja_translate_duration_seconds histogram'
+        yield from self.latency.render('sneakyninja_translate_duration_seconds')
@@ -0,0 +1,70 @@
+"""Asyncio MediaWiki client, getting a page's summary in a single request."""
+
+import asyncio
+
+API_URL = 'https://en.wikipedia.org/w/api.php'
+
+
+class PageNotFound(Exception):
+    def __init__(self, topic):
+        self.topic = topic
+        super().__init__(f'No wikipedia page matches "{topic}".')
+
+
+class WikiClient:
+    """Looks up pages through the bot's HTTP client.
+
+    One ``generator=search`` query returns the best matching pages with their intro,
+    url, lead image thumbnail and disambiguation flag, which is everything the
+    ``wikipedia`` command needs.
+    """
+
+    def __init__(self, http_client, *, api_url=API_URL, candidates=6, thumbnail_size=500, concurrency=8):
+        self.http_client = http_client
+        self.api_url = api_url
+        self.candidates = candidates
+        self.thumbnail_size = thumbnail_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def _params(self, topic):
+        return {
+            'action': 'query', 'format': 'json', 'formatversion': '2', 'redirects': '1',
+            'generator': 'search', 'gsrsearch': topic, 'gsrnamespace': '0', 'gsrlimit': str(self.candidates),
+            'prop': 'extracts|info|pageimages|pageprops',
+            'exintro': '1', 'explaintext': '1', 'exlimit': str(self.candidates),
+            'inprop': 'url', 'piprop': 'thumbnail', 'pithumbsize': str(self.thumbnail_size),
+            'ppprop': 'disambiguation',
+        }
+
+    async def lookup(self, topic):
+        """The best matching page as a dict of title, url, summary and image.
+
+        If it's a disambiguation page, a dict with the ``options`` to choose from instead.
+        """
+        async with self._semaphore:
+            resp = await self.http_client.fetch('GET', self.api_url, params=self._params(topic), hedge=True)
+        if resp.status != 200:
+            raise PageNotFound(topic)
+
+        pages = sorted(resp.data.get('query', {}).get('pages', []), key=lambda page: page.get('index', 0))
+        if not pages:
+            raise PageNotFound(topic)
+
+        page = pages[0]
+        if 'disambiguation' in page.get('pageprops', {}):
+            options = [p['title'] for p in pages[1:] if 'disambiguation' not in p.get('pageprops', {})]
+            if not options:
+                # the page's own intro lists the meanings, one per line after "X may refer to:"
+                options = [line for line in page.get('extract', '').splitlines()[1:] if line.strip()]
+            return {'options': options}
+
+        return {
+            'title': page['title'],
+            'url': page['fullurl'],
+            'summary': page.get('extract', ''),
+            'image': page.get('thumbnail', {}).get('source'),
+        }
+
+    async def lookup_many(self, topics):
+        """Looks up several topics concurrently over the upstream's pooled connections."""
+        return await asyncio.gather(*(self.lookup(topic) for topic in topics), return_exceptions=True)